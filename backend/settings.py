@@ -24,6 +24,8 @@ if not DEBUG:
     SECURE_HSTS_SECONDS = 31536000  # 1 year
     SECURE_HSTS_INCLUDE_SUBDOMAINS = True
     SECURE_HSTS_PRELOAD = True
+    # Let run.py and load balancers probe readiness over plain HTTP
+    SECURE_REDIRECT_EXEMPT = [r'^api/health/$']
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -38,18 +40,26 @@ INSTALLED_APPS = [
     'shop',
     'booking',
     'subscribers',
+    'core',
+    'tasks',
+    'newsletter',
+    'telemetry',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',  # No-op unless REQUEST_METRICS_ENABLED
+    'core.middleware.QueryLogMiddleware',  # No-op unless SLOW_QUERY_LOG_ENABLED
     'corsheaders.middleware.CorsMiddleware',
+    'core.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PrecompressedStaticMiddleware',  # Short-circuits /static/ and /assets/
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django.middleware.gzip.GZipMiddleware',  # Compression for responses
+    'core.middleware.CompressionMiddleware',  # Size/type-aware gzip or brotli
 ]
 
 # Security Headers
@@ -82,6 +92,42 @@ DATABASES = {
     }
 }
 
+# Optional read replica for catalogue reads. To try it locally, point
+# REPLICA_DATABASE_PATH at a second SQLite file and run
+# `python manage.py sync_replica` to copy the primary into it.
+if os.environ.get('REPLICA_DATABASE_PATH'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['REPLICA_DATABASE_PATH'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+DATABASE_REPLICA_ALIAS = 'replica'
+
+# Models whose reads may be served by the replica. Orders, bookings and
+# coupons are deliberately absent: they are read right after being written.
+REPLICA_READ_MODELS = [
+    'portfolio.Category',
+    'portfolio.Project',
+    'portfolio.ProjectImage',
+    'portfolio.Credit',
+    'portfolio.Equipment',
+    'portfolio.ProjectEquipment',
+    'portfolio.Service',
+    'portfolio.Testimonial',
+    'portfolio.Award',
+    'shop.ProductCategory',
+    'shop.Product',
+    'shop.ProductFeature',
+    'shop.ProductImage',
+    'shop.ProductReview',
+    'booking.BookingService',
+]
+
+# After a write, keep the same client on the primary for this many seconds
+REPLICA_PIN_SECONDS = 15
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -96,11 +142,30 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Vite's fingerprinted bundle is collected into its own directory, the only
+# one served from SPA_ASSETS_URL with immutable caching
+SPA_ASSETS_DIR = 'assets'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
-    BASE_DIR / 'frontend' / 'dist' / 'assets',
+    (SPA_ASSETS_DIR, BASE_DIR / 'frontend' / 'dist' / 'assets'),
 ]
 
+# collectstatic fingerprints every file and writes .gz (and .br, if the
+# brotli package is installed) next to it; PrecompressedStaticMiddleware
+# serves the best match for Accept-Encoding with far-future caching
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+# index.html from the Vite build loads its bundle from here (STATIC_ROOT/SPA_ASSETS_DIR)
+SPA_ASSETS_URL = '/assets/'
+# Cache lifetime for static files requested by their unhashed name
+STATIC_UNHASHED_MAX_AGE = 300
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -143,13 +208,22 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    # Sliding-window counters in the shared 'throttle' cache; anonymous
+    # requests are charged per scope (see core.throttling)
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'core.throttling.ScopedSlidingWindowThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/hour',  # Anonymous users: 100 requests per hour
-        'user': '1000/hour',  # Authenticated users: 1000 requests per hour
+        'user': '1000/hour',  # Authenticated users, all requests
+        'read': '600/hour',  # Anonymous GETs, mostly served from cache
+        'write': '60/hour',  # Anonymous writes without a specific scope
+        'orders': '20/hour',
+        'bookings': '10/hour',
+        'reviews': '10/hour',
+        'contact': '10/hour',
+        'newsletter': '10/hour',
+        'telemetry': '300/hour',  # Beacons, a few per page view
+        'coupons': '30/hour',  # Coupon validation; also limits code guessing
     },
 }
 
@@ -161,8 +235,126 @@ CACHES = {
         'OPTIONS': {
             'MAX_ENTRIES': 1000,
         }
-    }
+    },
+    # Rate-limit counters. Must be shared by every worker for limits to hold,
+    # so use Redis in production; LocMem (per process) is only for development.
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'kodeen-throttle',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        }
+    },
 }
+if os.environ.get('REDIS_URL'):
+    CACHES['throttle'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+        'KEY_PREFIX': 'throttle',
+    }
+THROTTLE_CACHE_ALIAS = 'throttle'
 
 # Cache timeout for API responses (in seconds)
 API_CACHE_TIMEOUT = 300  # 5 minutes
+
+# Request instrumentation (opt-in). Histograms are served to staff users at
+# /api/_metrics in Prometheus text format.
+REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS', 'False') == 'True'
+# Fraction of requests to run under cProfile; the slowest are kept on disk
+REQUEST_PROFILE_SAMPLE_RATE = float(os.environ.get('REQUEST_PROFILE_SAMPLE_RATE', '0'))
+REQUEST_PROFILE_DIR = BASE_DIR / 'profiles'
+REQUEST_PROFILE_KEEP = 20
+
+# Slow-query log and N+1 detector (opt-in, works with DEBUG off).
+# Summarise the log with `python manage.py querylog`.
+SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG', 'False') == 'True'
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '100'))
+# Flag a request when the same query shape runs this many times
+N_PLUS_ONE_THRESHOLD = 5
+SLOW_QUERY_LOG_FILE = BASE_DIR / 'logs' / 'queries.log'
+
+# Responsive image variants and placeholders, generated after upload by the task worker and
+# backfilled with `python manage.py build_image_variants`
+IMAGE_VARIANT_WIDTHS = [320, 640, 960, 1280, 1920]
+IMAGE_VARIANT_FORMATS = ['webp', 'jpeg']
+IMAGE_VARIANT_QUALITY = 80
+# Long side of the inline blur-up placeholder, in pixels
+IMAGE_PLACEHOLDER_SIZE = 16
+# Processes used by the build_image_variants backfill command
+IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', '2'))
+# False builds variants inline during the save instead of queueing a task (used by the tests)
+IMAGE_VARIANTS_ASYNC = True
+
+# Background tasks (tasks app): queued in the database, run by
+# `python manage.py taskworker`
+TASKS_CONCURRENCY = int(os.environ.get('TASKS_CONCURRENCY', '4'))
+TASKS_POLL_INTERVAL = 1.0  # Seconds between polls when the queue is empty
+TASKS_MAX_ATTEMPTS = 5
+# Retry n waits TASKS_RETRY_BACKOFF * 2**(n-1) seconds (±20%), at most TASKS_RETRY_BACKOFF_MAX
+TASKS_RETRY_BACKOFF = 30
+TASKS_RETRY_BACKOFF_MAX = 3600
+# Running tasks not finished after this long are assumed lost and requeued
+TASKS_LOCK_TIMEOUT = 600
+
+# Outgoing email, sent from background tasks
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'False') == 'True'
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'Kodeen Hunter <noreply@localhost>')
+# Public site address, used for links in emails
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:5173')
+# Backend address, for emailed links that go straight to the API (downloads);
+# the frontend and the API may be served from different hosts
+API_URL = os.environ.get('API_URL', 'http://localhost:8000')
+# Admin changelists built on core.admin.PerformanceModelAdmin: past this many
+# rows counts are estimated (unfiltered) or cached (filtered)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+ADMIN_COUNT_CACHE_TIMEOUT = 60
+ADMIN_DATE_HIERARCHY_CACHE_TIMEOUT = 300
+# Signed order download links stay valid this long (seconds)
+DOWNLOAD_TOKEN_MAX_AGE = 7 * 24 * 3600
+# Stock reserved at checkout for physical products is given back if the
+# order is still unpaid after this long (seconds)
+STOCK_RESERVATION_TIMEOUT = 30 * 60
+# Trending projects (portfolio.trending): a view's weight halves every
+# TRENDING_HALF_LIFE_HOURS; hourly view buckets are kept for
+# TRENDING_RETENTION_DAYS and the boards rebuilt at most every
+# TRENDING_REFRESH_INTERVAL seconds
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_RETENTION_DAYS = 30
+TRENDING_REFRESH_INTERVAL = 600
+TRENDING_SIZE = 24
+# Booking reminders go out this long before the session
+BOOKING_REMINDER_HOURS = 24
+
+# Newsletter campaigns (newsletter app)
+NEWSLETTER_BATCH_SIZE = 100  # Recipients per send_messages() call and checkpoint
+NEWSLETTER_SEND_RATE = float(os.environ.get('NEWSLETTER_SEND_RATE', '10'))  # Messages per second, 0 = unlimited
+NEWSLETTER_MESSAGES_PER_CONNECTION = 1000  # Reconnect after this many; most SMTP servers cap a session
+NEWSLETTER_DEFAULT_NAME = 'there'  # {{ name }} for subscribers without one
+NEWSLETTER_LEASE_SECONDS = 300  # A sender silent this long is presumed dead and the campaign can be resumed
+# Subscriber lists uploaded in the admin wait here for the task worker; it
+# must be shared with the web workers and is not served
+SUBSCRIBER_IMPORT_DIR = os.environ.get('SUBSCRIBER_IMPORT_DIR', str(BASE_DIR / 'imports'))
+
+# Client telemetry (telemetry app). Beacons are appended to files in the
+# spool directory, which every web worker must share, and loaded into the
+# database by a background flush at most this often.
+TELEMETRY_SPOOL_DIR = os.environ.get('TELEMETRY_SPOOL_DIR', str(BASE_DIR / 'telemetry_spool'))
+TELEMETRY_FLUSH_INTERVAL = 60  # Seconds
+TELEMETRY_MAX_BODY_BYTES = 64 * 1024
+TELEMETRY_MAX_EVENTS = 50  # Per beacon; the rest are dropped
+TELEMETRY_RETENTION_DAYS = 14  # Raw samples and events; rollups are kept
+
+# Response compression (CompressionMiddleware). Small bodies cost more to
+# compress than they save; brotli is used when the brotli package is installed.
+# Compare CPU per request with `python manage.py benchmark_compression`.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI = True
+# Per-process memory for compressed copies of cache_page responses
+COMPRESSION_CACHE_MAX_BYTES = 16 * 1024 * 1024
+# COMPRESSION_CONTENT_TYPES overrides the compressible types; the default
+# list is core.compression.DEFAULT_CONTENT_TYPES.
@@ -6,8 +6,10 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
-from django.http import HttpResponse
+from django.db import connection
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.http import require_GET
+from core.views import metrics_view
 
 @require_GET
 def robots_txt(request):
@@ -24,11 +26,20 @@ def robots_txt(request):
     return HttpResponse("\n".join(lines), content_type="text/plain")
 
 @require_GET
-def sitemap_xml(request):
-    """Generate sitemap.xml dynamically"""
+def health_check(request):
+    """Readiness probe: the app is loaded and the database answers"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Exception:
+        return JsonResponse({'status': 'unavailable'}, status=503)
+    return JsonResponse({'status': 'ok'})
+
+@require_GET
+async def sitemap_xml(request):
+    """Generate sitemap.xml dynamically (async ORM, no worker thread held)"""
     from portfolio.models import Project
     from shop.models import Product
-    from datetime import datetime
     
     urls = [
         {'loc': '/', 'priority': '1.0', 'changefreq': 'weekly'},
@@ -39,21 +50,23 @@ def sitemap_xml(request):
     ]
     
     # Add portfolio projects
-    for project in Project.objects.filter(featured=True):
+    projects = Project.objects.filter(featured=True).values_list('slug', 'updated_at')
+    async for slug, updated_at in projects:
         urls.append({
-            'loc': f'/portfolio/{project.slug}',
+            'loc': f'/portfolio/{slug}',
             'priority': '0.7',
             'changefreq': 'monthly',
-            'lastmod': project.updated_at.strftime('%Y-%m-%d')
+            'lastmod': updated_at.strftime('%Y-%m-%d')
         })
     
     # Add shop products
-    for product in Product.objects.all():
+    products = Product.objects.values_list('slug', 'updated_at')
+    async for slug, updated_at in products:
         urls.append({
-            'loc': f'/shop/{product.slug}',
+            'loc': f'/shop/{slug}',
             'priority': '0.7',
             'changefreq': 'weekly',
-            'lastmod': product.updated_at.strftime('%Y-%m-%d')
+            'lastmod': updated_at.strftime('%Y-%m-%d')
         })
     
     xml_lines = ['<?xml version="1.0" encoding="UTF-8"?>']
@@ -78,6 +91,9 @@ urlpatterns = [
     path('api/shop/', include('shop.urls')),
     path('api/booking/', include('booking.urls')),
     path('api/newsletter/', include('subscribers.urls')),
+    path('api/telemetry/', include('telemetry.urls')),
+    path('api/health/', health_check, name='health-check'),
+    path('api/_metrics', metrics_view, name='metrics'),
     path('robots.txt', robots_txt),
     path('sitemap.xml', sitemap_xml),
 ]
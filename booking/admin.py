@@ -1,6 +1,11 @@
 from django.contrib import admin
 from django.utils import timezone
+from core.admin import PerformanceModelAdmin
+from core.exports import export_actions
+from .exports import BookingExport
 from .models import BookingService, Booking, BookingAvailability
+from .signals import bookings_changed
+from .tasks import schedule_reminder, schedule_reminders
 
 
 @admin.register(BookingService)
@@ -24,12 +29,12 @@ class BookingServiceAdmin(admin.ModelAdmin):
 
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(PerformanceModelAdmin):
     list_display = ['booking_number', 'customer_name', 'service', 'booking_date', 'booking_time', 'status', 'deposit_paid']
     list_filter = ['status', 'deposit_paid', 'booking_date', 'service']
     search_fields = ['booking_number', 'customer_name', 'customer_email', 'customer_phone']
     readonly_fields = ['booking_number', 'created_at', 'updated_at', 'confirmed_at']
-    actions = ['mark_as_confirmed', 'mark_as_completed', 'mark_as_cancelled']
+    actions = ['mark_as_confirmed', 'mark_as_completed', 'mark_as_cancelled', *export_actions(BookingExport())]
     date_hierarchy = 'booking_date'
     
     fieldsets = (
@@ -54,23 +59,42 @@ class BookingAdmin(admin.ModelAdmin):
         }),
     )
     
+    def save_model(self, request, obj, form, change):
+        # Confirming in the change form schedules the reminder, like the action
+        confirming = obj.status == 'confirmed' and (not change or 'status' in form.changed_data)
+        if confirming and obj.confirmed_at is None:
+            obj.confirmed_at = timezone.now()
+        super().save_model(request, obj, form, change)
+        if confirming and obj.is_upcoming():
+            schedule_reminder(obj)
+
     def mark_as_confirmed(self, request, queryset):
-        updated = queryset.filter(status='pending').update(
+        pending = list(queryset.filter(status='pending').only('pk', 'booking_date', 'booking_time'))
+        updated = Booking.objects.filter(pk__in=[b.pk for b in pending], status='pending').update(
             status='confirmed',
             confirmed_at=timezone.now()
         )
+        schedule_reminders(booking for booking in pending if booking.is_upcoming())
         self.message_user(request, f'{updated} booking(s) confirmed.')
     mark_as_confirmed.short_description = 'Mark selected bookings as confirmed'
     
     def mark_as_completed(self, request, queryset):
-        updated = queryset.update(status='completed')
+        updated = self.set_status(queryset, 'completed')
         self.message_user(request, f'{updated} booking(s) marked as completed.')
     mark_as_completed.short_description = 'Mark selected bookings as completed'
     
     def mark_as_cancelled(self, request, queryset):
-        updated = queryset.update(status='cancelled')
+        updated = self.set_status(queryset, 'cancelled')
         self.message_user(request, f'{updated} booking(s) cancelled.')
     mark_as_cancelled.short_description = 'Cancel selected bookings'
+    
+    def set_status(self, queryset, new_status):
+        """One UPDATE, then invalidate cached slots for the dates it touched"""
+        changed = queryset.exclude(status=new_status)
+        dates = set(changed.values_list('booking_date', flat=True).distinct())
+        updated = changed.update(status=new_status)
+        bookings_changed.send(sender=Booking, dates=dates)
+        return updated
 
 
 @admin.register(BookingAvailability)
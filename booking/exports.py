@@ -0,0 +1,25 @@
+from core.exports import Export
+
+from .models import Booking
+
+
+class BookingExport(Export):
+    name = 'bookings'
+    model = Booking
+    date_field = 'booking_date'
+    columns = [
+        ('booking_number', 'booking_number'),
+        ('service', 'service__name'),
+        ('booking_date', 'booking_date'),
+        ('booking_time', 'booking_time'),
+        ('duration_hours', 'duration_hours'),
+        ('status', 'status'),
+        ('customer_name', 'customer_name'),
+        ('customer_email', 'customer_email'),
+        ('customer_phone', 'customer_phone'),
+        ('location', 'location'),
+        ('price', 'price'),
+        ('deposit_paid', 'deposit_paid'),
+        ('created_at', 'created_at'),
+        ('confirmed_at', 'confirmed_at'),
+    ]
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from core.db_router import use_primary
 from .models import BookingService, Booking, BookingAvailability
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -42,11 +43,13 @@ class BookingSerializer(serializers.ModelSerializer):
             )
             end_datetime = booking_datetime + timedelta(hours=float(duration))
             
-            # Find overlapping bookings
-            overlapping = Booking.objects.filter(
-                booking_date=booking_date,
-                status__in=['pending', 'confirmed']
-            ).exclude(id=self.instance.id if self.instance else None)
+            # Find overlapping bookings (on the primary: a slot booked a
+            # moment ago may not have reached the replica yet)
+            with use_primary():
+                overlapping = list(Booking.objects.filter(
+                    booking_date=booking_date,
+                    status__in=['pending', 'confirmed']
+                ).exclude(id=self.instance.id if self.instance else None))
             
             for booking in overlapping:
                 existing_start = timezone.make_aware(
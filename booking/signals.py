@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent with dates=[...] whenever bookings on those dates are created, changed
+# or removed, including by bulk updates that bypass post_save
+bookings_changed = Signal()
@@ -0,0 +1,74 @@
+"""
+Cache for BookingViewSet.available_slots.
+
+Entries are keyed by date, service duration and a per-date version. Any
+change to bookings on a date (bookings_changed) bumps that date's version,
+which orphans every cached variant for it in a single cache write, without
+having to know which durations were cached. Editing availability rules
+bumps a global version instead, since a weekday rule affects every date.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .models import Booking, BookingAvailability
+from .signals import bookings_changed
+
+
+def timeout():
+    return getattr(settings, 'API_CACHE_TIMEOUT', 300)
+
+
+GLOBAL_VERSION_KEY = 'booking-slots-version'
+
+
+def version_key(day):
+    return f'booking-slots-version:{day.isoformat()}'
+
+
+def cache_key(day, duration_hours):
+    versions = cache.get_many([GLOBAL_VERSION_KEY, version_key(day)])
+    version = f"{versions.get(GLOBAL_VERSION_KEY, 0)}.{versions.get(version_key(day), 0)}"
+    return f'booking-slots:{day.isoformat()}:{duration_hours}:{version}'
+
+
+def invalidate(dates):
+    # Outlive the entries so an expired version can't resurrect old ones
+    cache.set_many({version_key(day): time.time_ns() for day in set(dates)}, timeout=timeout() * 2)
+
+
+def invalidate_all():
+    cache.set(GLOBAL_VERSION_KEY, time.time_ns(), timeout=timeout() * 2)
+
+
+def _on_bookings_changed(sender, dates, **kwargs):
+    invalidate(dates)
+
+
+def _remember_date(sender, instance, **kwargs):
+    # So moving a booking to another day also refreshes the day it left
+    instance._loaded_booking_date = instance.__dict__.get('booking_date')
+
+
+def _on_booking_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    dates = {instance.booking_date, getattr(instance, '_loaded_booking_date', None)} - {None}
+    bookings_changed.send(sender=Booking, dates=dates)
+    instance._loaded_booking_date = instance.booking_date
+
+
+def _on_availability_saved(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate_all()
+
+
+def connect():
+    bookings_changed.connect(_on_bookings_changed, dispatch_uid='booking-slot-cache')
+    post_init.connect(_remember_date, sender=Booking, dispatch_uid='booking-loaded')
+    post_save.connect(_on_booking_saved, sender=Booking, dispatch_uid='booking-saved')
+    post_delete.connect(_on_booking_saved, sender=Booking, dispatch_uid='booking-deleted')
+    post_save.connect(_on_availability_saved, sender=BookingAvailability, dispatch_uid='booking-availability-saved')
+    post_delete.connect(_on_availability_saved, sender=BookingAvailability, dispatch_uid='booking-availability-deleted')
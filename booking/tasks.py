@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.utils import timezone
+
+from tasks.queue import task
+
+from .models import Booking
+
+
+def booking_details(booking):
+    service = booking.service.name if booking.service else 'Session'
+    lines = [
+        f"  {service}",
+        f"  {booking.booking_date:%A %d %B %Y} at {booking.booking_time:%H:%M}",
+        f"  {booking.duration_hours} hours",
+    ]
+    if booking.location:
+        lines.append(f"  {booking.location}")
+    return lines
+
+
+def reminder_at(booking):
+    """When the reminder for ``booking`` is due"""
+    starts = timezone.make_aware(datetime.combine(booking.booking_date, booking.booking_time))
+    return starts - timedelta(hours=settings.BOOKING_REMINDER_HOURS)
+
+
+def schedule_reminder(booking):
+    send_booking_reminder.schedule(max(reminder_at(booking), timezone.now()), booking.pk)
+
+
+def schedule_reminders(bookings):
+    """schedule_reminder() for many bookings, as one INSERT"""
+    now = timezone.now()
+    send_booking_reminder.schedule_many((max(reminder_at(booking), now), [booking.pk]) for booking in bookings)
+
+
+@task
+def send_booking_confirmation(booking_id):
+    """Acknowledge a new booking request"""
+    booking = Booking.objects.select_related('service').filter(pk=booking_id).first()
+    if booking is None:
+        return
+    lines = [
+        f"Hi {booking.customer_name},",
+        "",
+        f"We've received your booking request {booking.booking_number}:",
+        "",
+        *booking_details(booking),
+        "",
+        "We'll be in touch shortly to confirm the details.",
+    ]
+    send_mail(
+        f"Booking request received {booking.booking_number}",
+        "\n".join(lines),
+        settings.DEFAULT_FROM_EMAIL,
+        [booking.customer_email],
+    )
+
+
+@task
+def send_booking_reminder(booking_id):
+    """Remind the customer of a confirmed booking. Scheduled when the booking is confirmed."""
+    booking = Booking.objects.select_related('service').filter(pk=booking_id).first()
+    # The booking may have been cancelled or moved since the reminder was queued
+    if booking is None or booking.status != 'confirmed' or not booking.is_upcoming():
+        return
+    if reminder_at(booking) - timezone.now() > timedelta(hours=1):
+        # Moved to a later date: wait for the new reminder time
+        schedule_reminder(booking)
+        return
+    lines = [
+        f"Hi {booking.customer_name},",
+        "",
+        "A reminder of your upcoming booking:",
+        "",
+        *booking_details(booking),
+        "",
+        "See you soon!",
+    ]
+    send_mail(
+        f"Reminder: your booking {booking.booking_number}",
+        "\n".join(lines),
+        settings.DEFAULT_FROM_EMAIL,
+        [booking.customer_email],
+    )
@@ -1,10 +1,15 @@
-from django.test import TestCase
+from django.contrib.admin.sites import AdminSite
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from datetime import datetime, timedelta
 from decimal import Decimal
-from .models import BookingService, Booking
+from .admin import BookingAdmin
+from .models import BookingService, Booking, BookingAvailability
 
 
 class BookingServiceModelTest(TestCase):
@@ -99,3 +104,80 @@ class BookingAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('available_slots', response.data)
         self.assertIsInstance(response.data['available_slots'], list)
+
+
+class SlotCacheTest(APITestCase):
+    """Test cached available slots and set-based status actions"""
+
+    def setUp(self):
+        cache.clear()
+        self.day = (datetime.now() + timedelta(days=10)).date()
+        self.url = reverse('booking-available-slots')
+
+    def tearDown(self):
+        cache.clear()
+
+    def book(self, hour, day=None):
+        return Booking.objects.create(
+            customer_name='John Doe', customer_email='john@example.com', customer_phone='555',
+            booking_date=day or self.day, booking_time=f'{hour:02d}:00', duration_hours=Decimal('1.0'),
+            price=Decimal('100.00')
+        )
+
+    def available(self):
+        response = self.client.get(self.url, {'date': self.day.isoformat()})
+        return {slot['time'][:5] for slot in response.data if slot['available']}
+
+    def cancel(self, queryset):
+        admin = BookingAdmin(Booking, AdminSite())
+        admin.message_user = lambda *args, **kwargs: None
+        with CaptureQueriesContext(connection) as queries:
+            admin.mark_as_cancelled(RequestFactory().post('/'), queryset)
+        return len(queries)
+
+    def test_slots_cached(self):
+        """Test a repeated request is served from the cache"""
+        self.available()
+        with self.assertNumQueries(0):
+            self.available()
+
+    def test_new_booking_invalidates(self):
+        """Test creating a booking takes its slot out of the cached list"""
+        self.assertIn('10:00', self.available())
+        self.book(10)
+        self.assertNotIn('10:00', self.available())
+
+    def test_bulk_cancel_invalidates(self):
+        """Test the set-based cancel action frees the slots in the cache"""
+        self.book(10)
+        self.book(11)
+        self.assertNotIn('10:00', self.available())
+        self.cancel(Booking.objects.all())
+        self.assertEqual(Booking.objects.filter(status='cancelled').count(), 2)
+        self.assertTrue({'10:00', '11:00'} <= self.available())
+
+    def test_moving_booking_refreshes_old_date(self):
+        """Test moving a booking to another day frees its old slot"""
+        booking = self.book(10)
+        self.assertNotIn('10:00', self.available())
+        booking.booking_date = self.day + timedelta(days=1)
+        booking.save()
+        self.assertIn('10:00', self.available())
+
+    def test_availability_change_invalidates(self):
+        """Test editing availability rules refreshes every cached date"""
+        self.assertIn('09:00', self.available())
+        BookingAvailability.objects.create(weekday=self.day.weekday(), start_time='12:00', end_time='14:00')
+        # Two-hour default duration: only 12:00-14:00 fits
+        self.assertEqual(self.available(), {'12:00'})
+
+    def test_cancel_constant_queries(self):
+        """Test cancelling costs the same queries for 2 or 30 bookings"""
+        for hour in range(2):
+            self.book(9 + hour)
+        few = self.cancel(Booking.objects.all())
+        Booking.objects.all().delete()
+        for i in range(30):
+            self.book(9 + i % 8, day=self.day + timedelta(days=i % 3))
+        many = self.cancel(Booking.objects.all())
+        self.assertEqual(few, many)
@@ -1,12 +1,15 @@
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.core.cache import cache
 from django.utils import timezone
 from django.views.decorators.cache import cache_page
 from django.utils.decorators import method_decorator
 from django.conf import settings
 from datetime import datetime, timedelta, time
 from .models import BookingService, Booking, BookingAvailability
+from . import slots
+from .tasks import send_booking_confirmation
 from .serializers import (
     BookingServiceSerializer,
     BookingSerializer,
@@ -32,6 +35,7 @@ class BookingViewSet(viewsets.ModelViewSet):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
     lookup_field = 'booking_number'
+    throttle_scope = 'bookings'
     
     def get_queryset(self):
         queryset = Booking.objects.all()
@@ -52,7 +56,7 @@ class BookingViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             booking = serializer.save()
-            # TODO: Send confirmation email here
+            send_booking_confirmation.delay(booking.pk)
             return Response(
                 {
                     'message': 'Booking request submitted successfully! You will receive a confirmation email shortly.',
@@ -91,6 +95,11 @@ class BookingViewSet(viewsets.ModelViewSet):
             except BookingService.DoesNotExist:
                 pass
         
+        key = slots.cache_key(target_date, duration_hours)
+        cached = cache.get(key)
+        if cached is not None:
+            return Response(cached)
+        
         # Get availability rules for this day
         weekday = target_date.weekday()
         availability_rules = BookingAvailability.objects.filter(
@@ -108,6 +117,13 @@ class BookingViewSet(viewsets.ModelViewSet):
                 })()
             ]
         
+        booked_times = set(
+            Booking.objects.filter(
+                booking_date=target_date,
+                status__in=['pending', 'confirmed']
+            ).values_list('booking_time', flat=True)
+        )
+        
         # Generate time slots
         available_slots = []
         for rule in availability_rules:
@@ -117,22 +133,16 @@ class BookingViewSet(viewsets.ModelViewSet):
             while current_time + timedelta(hours=duration_hours) <= end_time:
                 slot_time = current_time.time()
                 
-                # Check if slot is already booked
-                is_booked = Booking.objects.filter(
-                    booking_date=target_date,
-                    booking_time=slot_time,
-                    status__in=['pending', 'confirmed']
-                ).exists()
-                
                 available_slots.append({
                     'date': target_date,
                     'time': slot_time,
-                    'available': not is_booked
+                    'available': slot_time not in booked_times
                 })
                 
                 current_time += timedelta(hours=1)  # 1-hour intervals
         
         serializer = AvailableSlotSerializer(available_slots, many=True)
+        cache.set(key, serializer.data, slots.timeout())
         return Response(serializer.data)
 
 
@@ -0,0 +1,97 @@
+"""
+Primary/replica database routing.
+
+Catalogue reads (portfolio, shop catalogue, services, testimonials) go to the
+replica alias when one is configured. Everything else - writes, orders,
+bookings, coupons - stays on the primary. Once a request has written, or is
+running inside a transaction, it is pinned to the primary so it never reads
+its own writes back from a lagging replica.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+PRIMARY_DB = 'default'
+
+# Per-request routing state. A ContextVar keeps it isolated between threads
+# and between concurrent async requests.
+_pinned = contextvars.ContextVar('db_pinned_to_primary', default=False)
+_wrote = contextvars.ContextVar('db_wrote_in_request', default=False)
+
+
+def replica_alias():
+    return getattr(settings, 'DATABASE_REPLICA_ALIAS', 'replica')
+
+
+def replica_configured():
+    """Return True if a replica alias exists in DATABASES"""
+    return replica_alias() in settings.DATABASES
+
+
+def pin_to_primary():
+    """Route all further reads in this request to the primary"""
+    _pinned.set(True)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+def has_written():
+    return _wrote.get()
+
+
+def reset_state():
+    """Clear pinning state at the start and end of each request"""
+    _pinned.set(False)
+    _wrote.set(False)
+
+
+@contextmanager
+def use_primary():
+    """Temporarily force reads to the primary (e.g. read-after-write paths)"""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Send catalogue reads to the replica and everything else to the primary"""
+
+    def _replica_models(self):
+        return set(getattr(settings, 'REPLICA_READ_MODELS', []))
+
+    def db_for_read(self, model, **hints):
+        if not replica_configured() or is_pinned():
+            return PRIMARY_DB
+        if connections[PRIMARY_DB].in_atomic_block:
+            # Reads inside a transaction must see that transaction's writes
+            return PRIMARY_DB
+        if model._meta.label in self._replica_models():
+            return replica_alias()
+        return PRIMARY_DB
+
+    def db_for_write(self, model, **hints):
+        # Sticky primary: once this request writes, later reads follow it
+        _wrote.set(True)
+        _pinned.set(True)
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so objects from either
+        # alias may be related to each other.
+        aliases = {PRIMARY_DB, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Schema changes only ever run on the primary and reach the replica
+        # through replication (or `manage.py sync_replica` locally).
+        if db == replica_alias():
+            return False
+        return None
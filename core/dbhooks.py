@@ -0,0 +1,67 @@
+"""
+Process-wide database query hook.
+
+Every connection gets one execute wrapper (see ``connection.execute_wrapper``)
+that reports each query to the listeners registered for the current request.
+Listeners live in a ContextVar rather than on the connection, because under
+ASGI the async ORM runs queries on a worker thread with its own connection,
+while the ContextVar follows the request into that thread.
+
+Nothing is installed unless an instrumentation feature asks for it, so the
+cost with all instrumentation off is zero.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_listeners = contextvars.ContextVar('db_query_listeners', default=())
+_installed = False
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    listeners = _listeners.get()
+    if not listeners:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        for listener in listeners:
+            listener(sql, params, many, duration, context)
+
+
+def _add_wrapper(connection):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _add_wrapper(connection)
+
+
+def install():
+    """Attach the query hook to current and future connections (idempotent)"""
+    global _installed
+    for connection in connections.all():
+        _add_wrapper(connection)
+    # Each new thread gets its own connection objects; catch those as they open
+    if not _installed:
+        connection_created.connect(_on_connection_created, dispatch_uid='core.dbhooks')
+        _installed = True
+
+
+@contextmanager
+def listen(callback):
+    """
+    Call ``callback(sql, params, many, duration, context)`` for every query
+    run in the current context until the block exits.
+    """
+    token = _listeners.set(_listeners.get() + (callback,))
+    try:
+        yield
+    finally:
+        _listeners.reset(token)
@@ -0,0 +1,94 @@
+"""
+Facet counts for list filters, cached per filter combination.
+
+Each facet is counted over the list filtered by every active filter except
+its own, so picking a category narrows the year and tag counts but still
+shows how many items the other categories hold. value_counts() is one
+grouped query per facet; tag_counts() handles comma-separated tag strings,
+which can't be grouped in SQL, with one query over that column.
+
+Results are cached under a hash of the filter parameters plus a version.
+Saving or deleting a watched model bumps the version, orphaning every
+cached combination with one cache write (the booking slot cache works the
+same way). Bulk updates bypass the signals and must call invalidate().
+"""
+import hashlib
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+
+
+def timeout():
+    return getattr(settings, 'API_CACHE_TIMEOUT', 300)
+
+
+def value_counts(queryset, field, label=None):
+    """[{'value', 'count'}] (and 'label') for ``field`` in ``queryset``, most common first"""
+    fields = [field, label] if label else [field]
+    rows = (
+        queryset.exclude(**{f'{field}__isnull': True})
+        .order_by()
+        .values(*fields)
+        .annotate(count=Count('pk'))
+    )
+    counts = [
+        {'value': row[field], **({'label': row[label]} if label else {}), 'count': row['count']}
+        for row in rows
+    ]
+    counts.sort(key=lambda row: (-row['count'], str(row['value'])))
+    return counts
+
+
+def tag_counts(queryset, field='tags'):
+    """[{'value', 'count'}] for the comma-separated tags in ``field``, most common first"""
+    counts = Counter()
+    for tags in queryset.order_by().values_list(field, flat=True):
+        counts.update({tag.strip() for tag in (tags or '').split(',') if tag.strip()})
+    return [{'value': tag, 'count': count} for tag, count in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))]
+
+
+class FacetCache:
+    """Versioned cache of facet counts for one list endpoint"""
+
+    def __init__(self, name, params):
+        self.name = name
+        # Only these query parameters change the counts
+        self.params = tuple(sorted(params))
+
+    @property
+    def version_key(self):
+        return f'facets-version:{self.name}'
+
+    def key(self, query_params):
+        filters = [(name, query_params.get(name, '')) for name in self.params]
+        digest = hashlib.md5(repr(filters).encode()).hexdigest()
+        return f'facets:{self.name}:{cache.get(self.version_key, 0)}:{digest}'
+
+    def get_or_set(self, query_params, compute):
+        key = self.key(query_params)
+        counts = cache.get(key)
+        if counts is None:
+            counts = compute()
+            cache.set(key, counts, timeout())
+        return counts
+
+    def invalidate(self):
+        # Outlive the entries so an expired version can't resurrect old ones
+        cache.set(self.version_key, time.time_ns(), timeout=timeout() * 2)
+
+    def watch(self, model, ignore=()):
+        """Invalidate whenever ``model`` is saved or deleted, except saves of only ``ignore`` fields"""
+        ignore = frozenset(ignore)
+
+        def on_change(sender, raw=False, update_fields=None, **kwargs):
+            if raw or (update_fields and ignore.issuperset(update_fields)):
+                return
+            self.invalidate()
+
+        uid = f'facets-{self.name}-{model._meta.label_lower}'
+        post_save.connect(on_change, sender=model, weak=False, dispatch_uid=f'{uid}-saved')
+        post_delete.connect(on_change, sender=model, weak=False, dispatch_uid=f'{uid}-deleted')
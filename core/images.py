@@ -0,0 +1,172 @@
+"""
+Responsive image derivatives for uploaded media.
+
+Each registered image field gets a sibling JSONField named
+``<field>_variants`` holding the resized WebP/JPEG files generated from the
+current upload::
+
+    {"source": "shop/products/x.jpg", "width": 2400, "height": 1600,
+     "placeholder": "data:image/webp;base64,...",
+     "formats": {"webp": {"320": "variants/shop/products/x/320w.webp", ...},
+                 "jpeg": {...}}}
+
+``placeholder`` is a tiny inline preview the client can show, blurred, at
+the intrinsic size while the real image loads.
+
+Variants are built by the task worker (see the tasks app) once the saving
+transaction commits, so admin saves return immediately. ``source`` records which upload the
+variants belong to; a save that doesn't change the file does no work.
+"""
+import base64
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_save
+
+# (model, field name) pairs registered by each app's AppConfig.ready()
+REGISTRY = []
+
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def variant_widths():
+    return sorted(getattr(settings, 'IMAGE_VARIANT_WIDTHS', [320, 640, 960, 1280, 1920]))
+
+
+def variant_formats():
+    return list(getattr(settings, 'IMAGE_VARIANT_FORMATS', ['webp', 'jpeg']))
+
+
+def variant_name(source_name, width, fmt):
+    stem, _ = os.path.splitext(source_name)
+    ext = 'jpg' if fmt == 'jpeg' else fmt
+    return f'variants/{stem}/{width}w.{ext}'
+
+
+def is_current(variants, source_name):
+    """True if ``variants`` were built from ``source_name`` with the current settings"""
+    if not variants or variants.get('source') != source_name or 'placeholder' not in variants:
+        return False
+    formats = variants.get('formats', {})
+    return all(fmt in formats for fmt in variant_formats())
+
+
+def generate_variants(source_name):
+    """
+    Build every width/format for one stored image. Only touches storage,
+    never the database, so it can also run in a process pool.
+    """
+    from PIL import Image, ImageOps
+
+    quality = getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+    with default_storage.open(source_name, 'rb') as handle:
+        image = Image.open(handle)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    src_width, src_height = image.size
+    max_width = max(variant_widths())
+    widths = [w for w in variant_widths() if w < src_width]
+    if src_width <= max_width:
+        widths.append(src_width)
+
+    formats = {}
+    for fmt in variant_formats():
+        base = image.convert('RGB') if fmt == 'jpeg' or image.mode not in ('RGB', 'RGBA') else image
+        formats[fmt] = {}
+        for width in widths:
+            height = max(1, round(src_height * width / src_width))
+            resized = base.resize((width, height), Image.LANCZOS) if width != src_width else base
+            buffer = io.BytesIO()
+            resized.save(buffer, PIL_FORMATS[fmt], quality=quality, optimize=True)
+            name = variant_name(source_name, width, fmt)
+            # Fixed names, so a rebuild replaces files instead of adding suffixes
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            formats[fmt][str(width)] = default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    return {
+        'source': source_name,
+        'width': src_width,
+        'height': src_height,
+        'placeholder': make_placeholder(image),
+        'formats': formats,
+    }
+
+
+def make_placeholder(image):
+    """A few-hundred-byte WebP data URI, at most PLACEHOLDER_SIZE px on its long side"""
+    from PIL import Image
+
+    size = getattr(settings, 'IMAGE_PLACEHOLDER_SIZE', 16)
+    preview = image.convert('RGB')
+    preview.thumbnail((size, size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    preview.save(buffer, 'WEBP', quality=40)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def store_result(model, pk, field_name, source_name, variants):
+    """Save variants unless the image was replaced while they were being built"""
+    model._default_manager.filter(pk=pk, **{field_name: source_name}).update(
+        **{variants_field(field_name): variants}
+    )
+
+
+def schedule(model, pk, field_name, source_name):
+    """Generate variants for one image off the request path"""
+    if not getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+        store_result(model, pk, field_name, source_name, generate_variants(source_name))
+        return
+
+    from .tasks import build_image_variants
+    build_image_variants.delay(model._meta.label, pk, field_name, source_name)
+
+
+def _on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for model, field_name in REGISTRY:
+        if not isinstance(instance, model):
+            continue
+        source_name = getattr(instance, field_name).name or ''
+        current = getattr(instance, variants_field(field_name)) or {}
+        if not source_name:
+            if current:
+                model._default_manager.filter(pk=instance.pk).update(**{variants_field(field_name): {}})
+            continue
+        if is_current(current, source_name):
+            continue
+        transaction.on_commit(
+            lambda m=model, pk=instance.pk, f=field_name, s=source_name: schedule(m, pk, f, s)
+        )
+
+
+def register_variant_field(model, field_name):
+    """Build variants for ``model.<field_name>`` whenever a new file is saved"""
+    REGISTRY.append((model, field_name))
+    post_save.connect(_on_save, sender=model, dispatch_uid=f'image-variants-{model._meta.label}')
+
+
+def placeholder(variants):
+    """{'src': data URI, 'width': ..., 'height': ...} or None if not generated yet"""
+    if not variants or not variants.get('placeholder'):
+        return None
+    return {'src': variants['placeholder'], 'width': variants['width'], 'height': variants['height']}
+
+
+def srcset(variants, build_url):
+    """{'webp': 'url 320w, url 640w', ...} for a variants dict"""
+    result = {}
+    for fmt, by_width in (variants or {}).get('formats', {}).items():
+        entries = sorted(by_width.items(), key=lambda item: int(item[0]))
+        result[fmt] = ', '.join(f'{build_url(name)} {width}w' for width, name in entries)
+    return result
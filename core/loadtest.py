@@ -0,0 +1,290 @@
+"""
+Scenario-based load generator used by `manage.py loadtest`.
+
+Each virtual user is an asyncio task that repeatedly picks a scenario by
+weight and runs its steps. Steps go through a small client adapter, so the
+same scenarios run against Django's in-process AsyncClient or a real server
+over HTTP (httpx).
+"""
+import asyncio
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+
+from . import dbhooks
+from .benchmarking import summarize
+
+LOADTEST_EMAIL_DOMAIN = 'loadtest.invalid'
+
+
+class StepFailed(Exception):
+    pass
+
+
+class InProcessClient:
+    """Adapter over django.test.AsyncClient"""
+
+    def __init__(self, remote_addr):
+        from django.test import AsyncClient
+        # Report view errors as 500s like a real server would; raising them
+        # would also leak into other users' concurrent requests
+        self.client = AsyncClient(raise_request_exception=False, REMOTE_ADDR=remote_addr)
+
+    async def get(self, path, params=None):
+        response = await self.client.get(path, params or {})
+        return response.status_code, _json(response)
+
+    async def post(self, path, payload):
+        response = await self.client.post(path, payload, content_type='application/json')
+        return response.status_code, _json(response)
+
+    async def close(self):
+        pass
+
+
+class HTTPClient:
+    """Adapter over httpx.AsyncClient for a running server"""
+
+    def __init__(self, base_url, timeout):
+        import httpx
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=timeout)
+
+    async def get(self, path, params=None):
+        response = await self.client.get(path, params=params)
+        return response.status_code, _json(response)
+
+    async def post(self, path, payload):
+        response = await self.client.post(path, json=payload)
+        return response.status_code, _json(response)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def _json(response):
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def _results(data):
+    """Unwrap a paginated DRF list response"""
+    if isinstance(data, dict):
+        return data.get('results', [])
+    return data or []
+
+
+class Session:
+    """One virtual user's view of the API, recording every request it makes"""
+
+    def __init__(self, client, recorder):
+        self.client = client
+        self.recorder = recorder
+
+    async def get(self, path, params=None, expect=(200,)):
+        return await self._timed(self.client.get(path, params), expect)
+
+    async def post(self, path, payload, expect=(200, 201)):
+        return await self._timed(self.client.post(path, payload), expect)
+
+    async def _timed(self, request, expect):
+        start = time.perf_counter()
+        try:
+            status, data = await request
+        except Exception as exc:
+            self.recorder.request(time.perf_counter() - start, 'exception', ok=False)
+            raise StepFailed(repr(exc))
+        self.recorder.request(time.perf_counter() - start, status, ok=status in expect)
+        if status not in expect:
+            raise StepFailed(f'HTTP {status}')
+        return data
+
+
+# Scenarios --------------------------------------------------------------
+
+async def browse_portfolio(session, ctx):
+    await session.get('/api/portfolio/categories/')
+    await session.get('/api/portfolio/projects/featured/')
+    await session.get('/api/portfolio/projects/', {'page': random.randint(1, ctx['project_pages'])})
+
+
+async def view_project(session, ctx):
+    if not ctx['project_slugs']:
+        raise StepFailed('no projects')
+    slug = random.choice(ctx['project_slugs'])
+    await session.get(f'/api/portfolio/projects/{slug}/')
+
+
+async def shop_browse(session, ctx):
+    await session.get('/api/shop/categories/')
+    await session.get('/api/shop/products/')
+    if ctx['products']:
+        product = random.choice(ctx['products'])
+        await session.get(f"/api/shop/products/{product['slug']}/")
+
+
+async def checkout_with_coupon(session, ctx):
+    if not ctx['products']:
+        raise StepFailed('no products')
+    products = random.sample(ctx['products'], k=min(len(ctx['products']), random.randint(1, 3)))
+    items = [
+        {'product': p['id'], 'product_name': p['name'], 'price': p['current_price'], 'quantity': 1}
+        for p in products
+    ]
+    subtotal = sum(float(item['price']) for item in items)
+    payload = {
+        'customer_name': 'Load Test',
+        'customer_email': f'order-{uuid.uuid4().hex[:12]}@{LOADTEST_EMAIL_DOMAIN}',
+        'items': items,
+    }
+    if ctx['coupon']:
+        await session.post('/api/shop/coupons/validate/', {'code': ctx['coupon'], 'subtotal': subtotal},
+                           expect=(200, 400))
+        payload['coupon_code'] = ctx['coupon']
+    await session.post('/api/shop/orders/', payload, expect=(201,))
+
+
+async def check_availability_then_book(session, ctx):
+    if not ctx['services']:
+        raise StepFailed('no booking services')
+    service = random.choice(ctx['services'])
+    day = date.today() + timedelta(days=random.randint(1, 365))
+    slots = await session.get('/api/booking/bookings/available_slots/',
+                              {'date': day.isoformat(), 'service': service['id']})
+    open_slots = [slot for slot in (slots or []) if slot.get('available')]
+    if not open_slots:
+        return
+    slot = random.choice(open_slots)
+    await session.post('/api/booking/bookings/', {
+        'service': service['id'],
+        'customer_name': 'Load Test',
+        'customer_email': f'booking-{uuid.uuid4().hex[:12]}@{LOADTEST_EMAIL_DOMAIN}',
+        'customer_phone': '+10000000000',
+        'booking_date': day.isoformat(),
+        'booking_time': slot['time'],
+        'duration_hours': service['duration_hours'],
+        'price': service['price'],
+    }, expect=(201,))
+
+
+SCENARIOS = {
+    'browse_portfolio': browse_portfolio,
+    'view_project': view_project,
+    'shop_browse': shop_browse,
+    'checkout_with_coupon': checkout_with_coupon,
+    'book_session': check_availability_then_book,
+}
+
+DEFAULT_MIX = {
+    'browse_portfolio': 35,
+    'view_project': 25,
+    'shop_browse': 25,
+    'checkout_with_coupon': 8,
+    'book_session': 7,
+}
+
+
+# Recording --------------------------------------------------------------
+
+class ScenarioRecorder:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.iterations = 0
+        self.failures = Counter()
+        self.errors = 0
+        self.db_queries = 0
+        self.db_time = 0.0
+
+    def request(self, duration, status, ok=True):
+        self.latencies.append(duration)
+        self.statuses[str(status)] += 1
+        if not ok:
+            self.errors += 1
+
+    def query(self, sql, params, many, duration, context):
+        self.db_queries += 1
+        self.db_time += duration
+
+    def report(self, elapsed, count_queries):
+        result = summarize(self.latencies, elapsed, errors=self.errors)
+        result.update({
+            'iterations': self.iterations,
+            'failed_iterations': sum(self.failures.values()),
+            'failures': dict(self.failures.most_common(5)),
+            'statuses': dict(self.statuses),
+            'db_queries': self.db_queries if count_queries else None,
+            'db_queries_per_iteration': (
+                round(self.db_queries / self.iterations, 2) if count_queries and self.iterations else None
+            ),
+            'db_time_ms': round(self.db_time * 1000, 2) if count_queries else None,
+        })
+        return result
+
+
+async def discover(client, coupon):
+    """Fetch the ids and slugs the scenarios need from the API itself"""
+    _, projects = await client.get('/api/portfolio/projects/')
+    _, products = await client.get('/api/shop/products/')
+    _, services = await client.get('/api/booking/services/')
+    count = projects.get('count', 0) if isinstance(projects, dict) else len(projects or [])
+    return {
+        'project_slugs': [p['slug'] for p in _results(projects)],
+        'project_pages': max(1, -(-count // 12)),
+        'products': _results(products),
+        'services': _results(services),
+        'coupon': coupon,
+    }
+
+
+async def run(make_client, mix, users, duration=None, iterations=None, coupon=None, count_queries=False):
+    """Run the scenario mix and return (per-scenario recorders, elapsed seconds)"""
+    if count_queries:
+        dbhooks.install()
+
+    setup_client = make_client(0)
+    try:
+        ctx = await discover(setup_client, coupon)
+    finally:
+        await setup_client.close()
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    recorders = {name: ScenarioRecorder() for name in names}
+    remaining = [iterations] if iterations else None
+    deadline = time.perf_counter() + duration if duration else None
+
+    def should_continue():
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+        if remaining is not None:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+        return True
+
+    async def virtual_user(index):
+        client = make_client(index)
+        try:
+            while should_continue():
+                name = random.choices(names, weights)[0]
+                recorder = recorders[name]
+                session = Session(client, recorder)
+                recorder.iterations += 1
+                try:
+                    if count_queries:
+                        with dbhooks.listen(recorder.query):
+                            await SCENARIOS[name](session, ctx)
+                    else:
+                        await SCENARIOS[name](session, ctx)
+                except StepFailed as exc:
+                    recorder.failures[str(exc)] += 1
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user(i + 1) for i in range(users)))
+    return recorders, time.perf_counter() - start
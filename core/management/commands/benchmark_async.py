@@ -0,0 +1,69 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+
+from core.benchmarking import summarize
+
+DEFAULT_PATHS = ['/sitemap.xml', '/api/health/']
+
+
+class Command(BaseCommand):
+    help = 'Compare requests/sec and p99 latency of the WSGI and ASGI handlers in-process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS,
+                            help='Paths to request (default: sitemap and health check)')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per handler per path')
+        parser.add_argument('--concurrency', type=int, default=200)
+
+    def handle(self, *args, **options):
+        total, concurrency = options['requests'], options['concurrency']
+
+        header = f"{'path':<40} {'handler':<6} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for path in options['paths']:
+            for name, runner in (('wsgi', self.run_wsgi), ('asgi', self.run_asgi)):
+                result = runner(path, total, concurrency)
+                self.stdout.write(
+                    f"{path:<40} {name:<6} {result['rps']:>9} {result['p50_ms']:>9} "
+                    f"{result['p99_ms']:>9} {result['errors']:>7}"
+                )
+
+    def run_wsgi(self, path, total, concurrency):
+        """Thread-per-request, like gunicorn's gthread workers"""
+        def one(_):
+            client = Client()
+            start = time.perf_counter()
+            response = client.get(path)
+            return time.perf_counter() - start, response.status_code >= 400
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(total)))
+        return self._summarize(results, time.perf_counter() - start)
+
+    def run_asgi(self, path, total, concurrency):
+        """Coroutine-per-request on one event loop, like a uvicorn worker"""
+        async def run():
+            client = AsyncClient()
+            gate = asyncio.Semaphore(concurrency)
+
+            async def one():
+                async with gate:
+                    start = time.perf_counter()
+                    response = await client.get(path)
+                    return time.perf_counter() - start, response.status_code >= 400
+
+            start = time.perf_counter()
+            results = await asyncio.gather(*(one() for _ in range(total)))
+            return results, time.perf_counter() - start
+
+        results, elapsed = asyncio.run(run())
+        return self._summarize(results, elapsed)
+
+    def _summarize(self, results, elapsed):
+        return summarize([r[0] for r in results], elapsed, errors=sum(1 for r in results if r[1]))
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import FileResponse, HttpResponse
+from django.middleware.gzip import GZipMiddleware
+from django.test import Client, RequestFactory
+
+from core.middleware import CompressionMiddleware
+
+DEFAULT_PATHS = [
+    '/api/health/',
+    '/api/portfolio/projects/',
+    '/api/portfolio/projects/popular/',  # cache_page
+    '/api/shop/products/',
+    '/sitemap.xml',
+]
+ACCEPT_ENCODING = 'gzip, deflate, br'
+
+
+class Command(BaseCommand):
+    help = 'Compare CPU time per request of GZipMiddleware and CompressionMiddleware on real responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS,
+                            help='Paths whose responses are used as payloads')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per payload per middleware')
+        parser.add_argument('--file-size', type=int, default=1024 * 1024,
+                            help='Size of the synthetic file download payload in bytes (0 to skip)')
+
+    def handle(self, *args, **options):
+        payloads = [self.capture(path) for path in options['paths']]
+        download = None
+        if options['file_size']:
+            download = tempfile.NamedTemporaryFile(suffix='.zip', delete=False)
+            download.write(os.urandom(options['file_size']))
+            download.close()
+            payloads.append(('(file download)', None, download.name))
+
+        header = f"{'payload':<32} {'bytes':>9} {'middleware':<12} {'cpu us/req':>11} {'bytes out':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        factory = RequestFactory()
+        try:
+            for label, source, path in payloads:
+                for name, middleware_class in (('gzip', GZipMiddleware), ('adaptive', CompressionMiddleware)):
+                    cpu, size_in, size_out = self.measure(
+                        middleware_class, factory, source, path, options['requests']
+                    )
+                    self.stdout.write(
+                        f'{label:<32} {size_in:>9} {name:<12} {cpu * 1e6:>11.1f} {size_out:>10}'
+                    )
+        finally:
+            if download:
+                os.unlink(download.name)
+        self.stdout.write('\nCPU time covers the middleware only (process time, all threads of this process).')
+
+    def capture(self, path):
+        """Fetch a path once, uncompressed, to use its body and caching headers as a payload"""
+        response = Client().get(path)
+        return path, response, None
+
+    def build(self, source, path):
+        if path:
+            return FileResponse(open(path, 'rb'), as_attachment=True)
+        response = HttpResponse(source.content, content_type=source['Content-Type'], status=source.status_code)
+        for name in ('Cache-Control', 'Expires', 'ETag'):
+            if source.has_header(name):
+                response[name] = source[name]
+        return response
+
+    def measure(self, middleware_class, factory, source, path, total):
+        request = factory.get('/', HTTP_ACCEPT_ENCODING=ACCEPT_ENCODING)
+        size_out = 0
+        elapsed = 0.0
+        current = [None]
+        # One instance for the whole run, as in a server process
+        middleware = middleware_class(lambda request: current[0])
+        for _ in range(total):
+            current[0] = self.build(source, path)
+            start = time.process_time()
+            response = middleware(request)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed += time.process_time() - start
+            if hasattr(response, 'close'):
+                response.close()
+            size_out = len(body)
+        size_in = os.path.getsize(path) if path else len(source.content)
+        return elapsed / total, size_in, size_out
@@ -0,0 +1,65 @@
+import pickle
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.throttling import AnonRateThrottle
+
+from core.throttling import ScopedSlidingWindowThrottle, throttle_cache
+
+UNLIMITED = '100000000/day'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request overhead and per-client storage of DRF's AnonRateThrottle "
+        'and the sliding-window throttle as a client\'s request history grows'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depths', default='10,100,1000,5000',
+                            help='Requests already made by the client in the current window')
+        parser.add_argument('--requests', type=int, default=500, help='Timed requests per measurement')
+
+    def handle(self, *args, **options):
+        depths = [int(value) for value in options['depths'].split(',')]
+        candidates = [
+            ('drf-anon', AnonRateThrottle, {'anon': UNLIMITED}, caches['default']),
+            ('sliding', ScopedSlidingWindowThrottle, {'read': UNLIMITED}, throttle_cache()),
+        ]
+        request = Request(RequestFactory().get('/', REMOTE_ADDR='10.9.8.7'))
+
+        header = f"{'history':>8} {'throttle':<10} {'us/req':>9} {'bytes/client':>13}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for depth in depths:
+            for name, throttle_class, rates, cache in candidates:
+                cache.clear()
+                with mock.patch.object(throttle_class, 'THROTTLE_RATES', rates):
+                    for _ in range(depth):
+                        self.hit(throttle_class, request)
+                    start = time.perf_counter()
+                    for _ in range(options['requests']):
+                        throttle = self.hit(throttle_class, request)
+                    elapsed = (time.perf_counter() - start) / options['requests']
+                stored = self.stored_bytes(throttle, cache)
+                self.stdout.write(f'{depth:>8} {name:<10} {elapsed * 1e6:>9.1f} {stored:>13}')
+                cache.clear()
+
+    def hit(self, throttle_class, request):
+        # DRF builds fresh throttle instances for every request
+        throttle = throttle_class()
+        throttle.allow_request(request, None)
+        return throttle
+
+    def stored_bytes(self, throttle, cache):
+        """Pickled size of everything kept for this client"""
+        if isinstance(throttle, ScopedSlidingWindowThrottle):
+            window = int(throttle.now // throttle.duration)
+            keys = [f'{throttle.key}:{window - 1}', f'{throttle.key}:{window}']
+        else:
+            keys = [throttle.key]
+        return sum(len(pickle.dumps(value)) for value in cache.get_many(keys).values())
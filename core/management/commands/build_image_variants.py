@@ -0,0 +1,88 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import images
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate responsive WebP/JPEG variants and placeholders for existing uploads. Safe to interrupt: '
+        'images whose variants are already current are skipped on the next run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2))
+        parser.add_argument('--model', action='append', dest='models',
+                            help='Limit to a model label, e.g. shop.Product (repeatable)')
+        parser.add_argument('--force', action='store_true', help='Rebuild variants that are already current')
+
+    def handle(self, *args, **options):
+        targets = images.REGISTRY
+        if options['models']:
+            wanted = {label.lower() for label in options['models']}
+            targets = [(model, field) for model, field in targets if model._meta.label_lower in wanted]
+            if not targets:
+                choices = ', '.join(sorted({model._meta.label for model, _ in images.REGISTRY}))
+                raise CommandError(f'No image fields registered for that model. Choose from: {choices}')
+
+        # Workers are forked; don't hand them our open database connections
+        connections.close_all()
+        totals = {'built': 0, 'skipped': 0, 'failed': 0}
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for model, field_name in targets:
+                counts = self.process(pool, options['workers'] * 4, model, field_name, options['force'])
+                self.stdout.write(
+                    f"{model._meta.label}.{field_name}: {counts['built']} built, "
+                    f"{counts['skipped']} already current, {counts['failed']} failed"
+                )
+                for key in totals:
+                    totals[key] += counts[key]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {totals['built']} built, {totals['skipped']} skipped, {totals['failed']} failed"
+        ))
+
+    def process(self, pool, window, model, field_name, force):
+        counts = {'built': 0, 'skipped': 0, 'failed': 0}
+        queryset = (
+            model._default_manager.exclude(**{field_name: ''})
+            .order_by('pk')
+            .values_list('pk', field_name, images.variants_field(field_name))
+        )
+        pending = {}
+
+        def collect(done):
+            for future in done:
+                pk, source_name = pending.pop(future)
+                try:
+                    variants = future.result()
+                except Exception as exc:
+                    counts['failed'] += 1
+                    self.stderr.write(f'{model._meta.label} {pk}: {source_name}: {exc}')
+                    continue
+                # Stored per image, so an interrupted run resumes where it stopped
+                images.store_result(model, pk, field_name, source_name, variants)
+                counts['built'] += 1
+
+        # Keyset pages rather than one open cursor, since results are written
+        # back to the same table while we walk it
+        last_pk = None
+        while True:
+            page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            rows = list(page[:500])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            for pk, source_name, variants in rows:
+                if not force and images.is_current(variants, source_name):
+                    counts['skipped'] += 1
+                    continue
+                pending[pool.submit(images.generate_variants, source_name)] = (pk, source_name)
+                if len(pending) >= window:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+        collect(wait(pending).done)
+        return counts
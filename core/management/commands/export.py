@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.exports import BookingExport
+from core.exports import FORMATS, parse_date
+from shop.exports import OrderExport
+from subscribers.exports import SubscriberExport
+
+EXPORTS = {export.name: export for export in (OrderExport(), BookingExport(), SubscriberExport())}
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream orders (with items), bookings or subscribers to CSV or JSON Lines. '
+        'Memory use does not grow with the number of rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', '-o', default='-', help='File to write, or - for stdout (default)')
+        parser.add_argument('--since', help='First date to include, YYYY-MM-DD')
+        parser.add_argument('--until', help='Last date to include, YYYY-MM-DD')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        export = EXPORTS[options['dataset']]
+        try:
+            since = parse_date(options['since']) if options['since'] else None
+            until = parse_date(options['until']) if options['until'] else None
+        except ValueError:
+            raise CommandError('Dates must be YYYY-MM-DD')
+
+        queryset = export.filter_dates(export.queryset(), since, until)
+        chunks = export.stream(queryset, options['format'], options['chunk_size'])
+        started = time.monotonic()
+        if options['output'] == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+        self.stdout.write(f"Wrote {options['output']} in {time.monotonic() - started:.1f}s")
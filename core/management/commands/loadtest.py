@@ -0,0 +1,141 @@
+import asyncio
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import loadtest
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in loadtest.SCENARIOS:
+            raise CommandError(f"Unknown scenario '{name}'. Choose from: {', '.join(loadtest.SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Command(BaseCommand):
+    help = 'Drive a realistic scenario mix against the API and report latency, errors and DB queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server (default: in-process AsyncClient)')
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=None, help='Seconds to run')
+        parser.add_argument('--iterations', type=int, default=None,
+                            help='Total scenario runs (default 500 if --duration is not given)')
+        parser.add_argument('--mix', type=parse_mix, default=dict(loadtest.DEFAULT_MIX),
+                            help='Scenario weights, e.g. browse_portfolio=50,checkout_with_coupon=5')
+        parser.add_argument('--coupon', default='LOADTEST',
+                            help='Coupon code used by checkout_with_coupon (created in-process if missing, '
+                                 'and deleted again after the run)')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Per-request timeout (--url only)')
+        parser.add_argument('--keep-throttling', action='store_true',
+                            help='Apply DRF rate limits in-process (off by default so they do not dominate)')
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Delete orders and bookings created by the run afterwards (in-process only)')
+        parser.add_argument('--json', dest='json_path',
+                            help="Write the full report as JSON to this file ('-' for stdout)")
+
+    def handle(self, *args, **options):
+        if not options['duration'] and not options['iterations']:
+            options['iterations'] = 500
+        mix = {name: weight for name, weight in options['mix'].items() if weight > 0}
+        in_process = not options['url']
+
+        created_coupon = None
+        if in_process:
+            created_coupon = self.ensure_coupon(options['coupon'])
+            make_client = lambda i: loadtest.InProcessClient(remote_addr=f'10.0.{i // 250}.{i % 250 + 1}')
+        else:
+            try:
+                import httpx  # noqa: F401
+            except ImportError:
+                raise CommandError('--url needs httpx: pip install httpx')
+            base_url = options['url'].rstrip('/')
+            make_client = lambda i: loadtest.HTTPClient(base_url, options['timeout'])
+
+        throttle_patch = None
+        if in_process and not options['keep_throttling']:
+            throttle_patch = mock.patch('rest_framework.views.APIView.check_throttles')
+            throttle_patch.start()
+        try:
+            recorders, elapsed = asyncio.run(loadtest.run(
+                make_client, mix, options['users'],
+                duration=options['duration'],
+                iterations=options['iterations'],
+                coupon=options['coupon'],
+                count_queries=in_process,
+            ))
+        finally:
+            if throttle_patch:
+                throttle_patch.stop()
+            if created_coupon:
+                # Never leave a working discount code behind on a real database
+                created_coupon.delete()
+            if in_process and options['cleanup']:
+                self.cleanup()
+
+        report = {
+            'target': options['url'] or 'in-process',
+            'users': options['users'],
+            'elapsed_s': round(elapsed, 3),
+            'mix': mix,
+            'scenarios': {name: recorder.report(elapsed, in_process) for name, recorder in recorders.items()},
+        }
+        all_latencies = [lat for r in recorders.values() for lat in r.latencies]
+        all_errors = sum(s['errors'] for s in report['scenarios'].values())
+        report['total'] = loadtest.summarize(all_latencies, elapsed, errors=all_errors)
+
+        if options['json_path'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        if options['json_path']:
+            with open(options['json_path'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+        self.print_table(report)
+
+    def print_table(self, report):
+        header = (f"{'scenario':<22} {'iters':>6} {'reqs':>7} {'rps':>8} {'p50':>8} {'p95':>8} "
+                  f"{'p99':>8} {'err%':>6} {'queries':>8} {'q/iter':>7}")
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        rows = list(report['scenarios'].items()) + [('TOTAL', report['total'])]
+        for name, row in rows:
+            queries = row.get('db_queries')
+            per_iter = row.get('db_queries_per_iteration')
+            self.stdout.write(
+                f"{name:<22} {row.get('iterations', ''):>6} {row['requests']:>7} {row['rps']:>8} "
+                f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} "
+                f"{row['error_rate'] * 100:>6.1f} {'' if queries is None else queries:>8} "
+                f"{'' if per_iter is None else per_iter:>7}"
+            )
+        self.stdout.write(f"\nLatencies in ms; {report['users']} users over {report['elapsed_s']}s.")
+
+    def ensure_coupon(self, code):
+        """The coupon for checkout_with_coupon, if this run had to create it"""
+        from shop.models import Coupon
+        if not code:
+            return None
+        now = timezone.now()
+        # Valid for a day only, in case the run is killed before it is deleted
+        coupon, created = Coupon.objects.get_or_create(code=code.upper(), defaults={
+            'discount_type': 'percentage',
+            'discount_value': 10,
+            'valid_from': now - timedelta(days=1),
+            'valid_until': now + timedelta(days=1),
+        })
+        return coupon if created else None
+
+    def cleanup(self):
+        from booking.models import Booking
+        from shop.models import Order
+        suffix = f'@{loadtest.LOADTEST_EMAIL_DOMAIN}'
+        orders, _ = Order.objects.filter(customer_email__endswith=suffix).delete()
+        bookings, _ = Booking.objects.filter(customer_email__endswith=suffix).delete()
+        self.stderr.write(f'Cleaned up {orders} order rows and {bookings} booking rows.')
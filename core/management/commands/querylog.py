@@ -0,0 +1,61 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Summarise the slow-query / N+1 log into the top offenders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None, help='Log file (default: SLOW_QUERY_LOG_FILE)')
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--kind', choices=['slow', 'n_plus_one'], default=None)
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+
+    def handle(self, *args, **options):
+        path = options['file'] or settings.SLOW_QUERY_LOG_FILE
+        try:
+            handle = open(path, encoding='utf-8')
+        except FileNotFoundError:
+            raise CommandError(f'No query log at {path}. Run with SLOW_QUERY_LOG=True first.')
+
+        groups = defaultdict(lambda: {'events': 0, 'queries': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        with handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if options['kind'] and record.get('kind') != options['kind']:
+                    continue
+                key = (record['kind'], record['view'], record['shape'])
+                group = groups[key]
+                group['events'] += 1
+                group['queries'] += record.get('count', 1)
+                group['total_ms'] += record['duration_ms']
+                group['max_ms'] = max(group['max_ms'], record['duration_ms'])
+                group['stack'] = record.get('stack') or group.get('stack')
+
+        rows = sorted(groups.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:options['top']]
+
+        if options['json']:
+            summary = [
+                {'kind': kind, 'view': view, 'shape': shape, **{k: v for k, v in group.items()}}
+                for (kind, view, shape), group in rows
+            ]
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+
+        if not rows:
+            self.stdout.write('No matching records.')
+            return
+        for (kind, view, shape), group in rows:
+            self.stdout.write(self.style.WARNING(
+                f"[{kind}] {view}: {group['events']} event(s), {group['queries']} queries, "
+                f"{group['total_ms']:.1f} ms total, {group['max_ms']:.1f} ms max"
+            ))
+            self.stdout.write(f'    {shape[:300]}')
+            for frame in (group.get('stack') or [])[-3:]:
+                self.stdout.write(f'      at {frame}')
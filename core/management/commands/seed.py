@@ -0,0 +1,361 @@
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from booking.models import Booking, BookingService
+from portfolio.models import Category, Project
+from shop.models import Coupon, DailySalesRollup, Order, OrderItem, Product, ProductCategory, ProductRanking
+from shop.rankings import refresh as refresh_rankings
+from shop.sales import rebuild as rebuild_sales_rollups
+from subscribers.models import Subscriber
+
+# Row counts at --scale 1
+BASE_COUNTS = {
+    'projects': 100_000,
+    'products': 2_000,
+    'orders': 1_000_000,
+    'bookings': 500_000,
+    'subscribers': 1_000_000,
+}
+
+PROJECT_CATEGORIES = ['Commercial', 'Music Video', 'Documentary', 'Wedding', 'Corporate', 'Short Film',
+                      'Event', 'Real Estate', 'Fashion', 'Travel', 'Sports', 'Aerial']
+TAGS = ['commercial', 'music video', 'drone', 'aerial', 'color grading', 'interview', 'brand film',
+        'slow motion', 'night', 'studio', 'outdoor', 'anamorphic', '4k', 'documentary', 'fashion',
+        'automotive', 'food', 'travel', 'wedding', 'event', 'sports', 'timelapse', 'hyperlapse']
+PRODUCT_CATEGORIES = ['LUTs', 'Presets', 'Templates', 'Sound Effects', 'Overlays', 'Merchandise']
+SERVICES = [('Wedding Film', 8, 2500), ('Music Video', 10, 3500), ('Corporate Video', 4, 1500),
+            ('Event Coverage', 6, 1800), ('Photo Session', 2, 400), ('Consultation', 1, 100)]
+FIRST_NAMES = ['Ava', 'Ben', 'Chloe', 'David', 'Emma', 'Felix', 'Grace', 'Hugo', 'Isla', 'Jack',
+               'Kai', 'Lena', 'Mia', 'Noah', 'Olivia', 'Paul', 'Quinn', 'Ruby', 'Sam', 'Tara']
+LAST_NAMES = ['Adams', 'Brown', 'Clark', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Hughes', 'Ito',
+              'Jones', 'Khan', 'Lopez', 'Miller', 'Nguyen', 'Okafor', 'Patel', 'Reyes', 'Smith']
+
+
+@contextmanager
+def historic_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values we generate"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def next_id(model):
+    return (model.objects.aggregate(m=Max('pk'))['m'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = 'Generate deterministic, internally consistent synthetic data at scale for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=0.01,
+                            help='Multiplier on the base counts (1 = 100k projects, 1M orders, '
+                                 '500k bookings, 1M subscribers)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; same seed, same data')
+        parser.add_argument('--end-date', default=None,
+                            help='Latest generated date, YYYY-MM-DD (default today). Fix it for '
+                                 'byte-identical runs on different days.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--only', nargs='+', choices=list(BASE_COUNTS), default=list(BASE_COUNTS))
+        parser.add_argument('--flush', action='store_true', help='Delete existing rows in the seeded tables first')
+
+    def handle(self, *args, **options):
+        self.scale = options['scale']
+        self.seed = options['seed']
+        self.batch_size = options['batch_size']
+        if options['end_date']:
+            try:
+                end = datetime.strptime(options['end_date'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('--end-date must be YYYY-MM-DD')
+        else:
+            end = datetime.now(dt_timezone.utc).replace(tzinfo=None)
+        self.end = datetime.combine(end.date(), dt_time(23, 59), tzinfo=dt_timezone.utc)
+
+        only = options['only']
+        if options['flush']:
+            self.flush(only)
+
+        started = time.perf_counter()
+        for name in BASE_COUNTS:
+            if name in only:
+                getattr(self, f'seed_{name}')(self.count(name))
+        self.stdout.write(self.style.SUCCESS(f'Seeding finished in {time.perf_counter() - started:.1f}s'))
+
+    def count(self, name):
+        return max(1, int(BASE_COUNTS[name] * self.scale))
+
+    def rng(self, name):
+        # One stream per dataset so --only doesn't change the other datasets
+        return random.Random(f'{self.seed}-{name}')
+
+    def random_datetime(self, rng, days_back):
+        return self.end - timedelta(seconds=rng.randint(0, days_back * 86400))
+
+    def flush(self, only):
+        targets = {
+            'orders': [ProductRanking, DailySalesRollup, OrderItem, Order, Coupon],
+            'bookings': [Booking],
+            'subscribers': [Subscriber],
+            'projects': [Project],
+            'products': [Product],
+        }
+        for name in only:
+            for model in targets[name]:
+                deleted, _ = model.objects.all().delete()
+                self.stdout.write(f'Flushed {model._meta.label}: {deleted} rows')
+
+    def insert(self, label, total, rows, write):
+        """Write generated rows in batches, one transaction per batch"""
+        started = time.perf_counter()
+        batch, done = [], 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                with transaction.atomic():
+                    write(batch)
+                done += len(batch)
+                batch = []
+                if done % (self.batch_size * 20) == 0:
+                    self.stdout.write(f'  {label}: {done}/{total}')
+        if batch:
+            with transaction.atomic():
+                write(batch)
+            done += len(batch)
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed else done
+        self.stdout.write(f'{label}: {done} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)')
+
+    def person_name(self, rng):
+        return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+    # Datasets ---------------------------------------------------------------
+
+    def seed_projects(self, total):
+        rng = self.rng('projects')
+        categories = [
+            Category.objects.get_or_create(slug=f'seed-{n.lower().replace(" ", "-")}',
+                                           defaults={'name': n, 'order': i})[0]
+            for i, n in enumerate(PROJECT_CATEGORIES)
+        ]
+        start = next_id(Project)
+        first_year = self.end.year - 10
+
+        def rows():
+            for pk in range(start, start + total):
+                created = self.random_datetime(rng, 10 * 365)
+                yield Project(
+                    pk=pk,
+                    title=f'Seed Project {pk}',
+                    slug=f'seed-project-{pk}',
+                    category=rng.choice(categories),
+                    client=f'{rng.choice(LAST_NAMES)} {rng.choice(["Studios", "Records", "Media", "Group"])}',
+                    year=rng.randint(first_year, self.end.year),
+                    duration=f'{rng.randint(0, 9)}:{rng.randint(0, 59):02d}',
+                    description='Synthetic project generated for benchmarking.',
+                    thumbnail_url=f'https://picsum.photos/seed/{pk}/800/450',
+                    featured=rng.random() < 0.02,
+                    order=rng.randint(0, 100),
+                    view_count=int(rng.paretovariate(1.2) * 10),
+                    tags=', '.join(rng.sample(TAGS, k=rng.randint(1, 5))),
+                    created_at=created,
+                    updated_at=created,
+                )
+
+        with historic_timestamps(Project):
+            self.insert('projects', total, rows(), lambda b: Project.objects.bulk_create(b))
+
+    def seed_products(self, total):
+        rng = self.rng('products')
+        categories = [
+            ProductCategory.objects.get_or_create(slug=f'seed-{n.lower().replace(" ", "-")}',
+                                                  defaults={'name': n, 'order': i})[0]
+            for i, n in enumerate(PRODUCT_CATEGORIES)
+        ]
+        start = next_id(Product)
+
+        def rows():
+            for pk in range(start, start + total):
+                category = rng.choice(categories)
+                price = Decimal(rng.choice([9, 19, 29, 39, 49, 79, 99])) - Decimal('0.01')
+                on_sale = rng.random() < 0.15
+                created = self.random_datetime(rng, 5 * 365)
+                is_digital = category.name != 'Merchandise'
+                yield Product(
+                    pk=pk,
+                    name=f'{category.name} Pack {pk}',
+                    slug=f'seed-product-{pk}',
+                    category=category,
+                    price=price,
+                    sale_price=(price * Decimal('0.8')).quantize(Decimal('0.01')) if on_sale else None,
+                    description='Synthetic product generated for benchmarking.',
+                    short_description=f'{category.name} for creators',
+                    image=f'shop/products/seed-{pk}.jpg',
+                    file=f'shop/downloads/seed-{pk}.zip' if is_digital else '',
+                    is_digital=is_digital,
+                    featured=rng.random() < 0.05,
+                    stock=0 if is_digital else rng.randint(0, 500),
+                    created_at=created,
+                    updated_at=created,
+                )
+
+        with historic_timestamps(Product):
+            self.insert('products', total, rows(), lambda b: Product.objects.bulk_create(b))
+
+    def seed_orders(self, total):
+        rng = self.rng('orders')
+        products = list(Product.objects.values_list('id', 'name', 'price', 'sale_price'))
+        if not products:
+            self.seed_products(self.count('products'))
+            products = list(Product.objects.values_list('id', 'name', 'price', 'sale_price'))
+
+        now = self.end
+        coupons = []
+        coupon_start = next_id(Coupon)
+        for pk in range(coupon_start, coupon_start + 20):
+            coupons.append(Coupon(
+                pk=pk, code=f'SEED{pk}', discount_type=rng.choice(['percentage', 'fixed']),
+                discount_value=Decimal(rng.choice([5, 10, 15, 20])),
+                valid_from=now - timedelta(days=3 * 365), valid_until=now + timedelta(days=365),
+            ))
+        Coupon.objects.bulk_create(coupons)
+
+        order_start = next_id(Order)
+        item_id = [next_id(OrderItem)]
+        coupon_uses = Counter()
+        statuses = [('completed', 'paid')] * 85 + [('pending', 'pending')] * 8 + \
+                   [('cancelled', 'failed')] * 4 + [('refunded', 'refunded')] * 3
+
+        def rows():
+            for pk in range(order_start, order_start + total):
+                created = self.random_datetime(rng, 3 * 365)
+                items = []
+                subtotal = Decimal('0')
+                for product_id, name, price, sale_price in rng.sample(products, k=min(len(products), rng.choice([1, 1, 1, 2, 2, 3, 4]))):
+                    unit = sale_price or price
+                    quantity = 1 if rng.random() < 0.9 else rng.randint(2, 3)
+                    subtotal += unit * quantity
+                    items.append(OrderItem(pk=item_id[0], order_id=pk, product_id=product_id,
+                                           product_name=name, price=unit, quantity=quantity))
+                    item_id[0] += 1
+                coupon = rng.choice(coupons) if rng.random() < 0.12 else None
+                discount = Decimal('0')
+                if coupon:
+                    coupon_uses[coupon.pk] += 1
+                    if coupon.discount_type == 'percentage':
+                        discount = (subtotal * coupon.discount_value / 100).quantize(Decimal('0.01'))
+                    else:
+                        discount = min(coupon.discount_value, subtotal)
+                order_status, payment_status = rng.choice(statuses)
+                order = Order(
+                    pk=pk,
+                    order_number=f'SEED{pk:010d}',
+                    customer_name=self.person_name(rng),
+                    customer_email=f'customer{rng.randint(1, max(total // 3, 1))}@example.com',
+                    status=order_status,
+                    payment_status=payment_status,
+                    payment_method='Stripe' if payment_status != 'pending' else '',
+                    subtotal=subtotal,
+                    discount=discount,
+                    total=subtotal - discount,
+                    coupon=coupon,
+                    download_count=rng.randint(0, 3) if payment_status == 'paid' else 0,
+                    created_at=created,
+                    updated_at=created,
+                )
+                yield order, items
+
+        def write(batch):
+            Order.objects.bulk_create([order for order, _ in batch])
+            OrderItem.objects.bulk_create([item for _, items in batch for item in items])
+
+        with historic_timestamps(Order):
+            self.insert('orders', total, rows(), write)
+        for coupon_id, uses in coupon_uses.items():
+            Coupon.objects.filter(pk=coupon_id).update(times_used=uses)
+        # bulk_create skips the signals that keep the rollups current
+        started = time.perf_counter()
+        written = sum(rows for *_, rows in rebuild_sales_rollups())
+        refresh_rankings()
+        self.stdout.write(f'sales rollups: {written} rows in {time.perf_counter() - started:.1f}s')
+
+    def seed_bookings(self, total):
+        rng = self.rng('bookings')
+        services = []
+        for i, (name, hours, price) in enumerate(SERVICES):
+            service, _ = BookingService.objects.get_or_create(
+                slug=f'seed-{name.lower().replace(" ", "-")}',
+                defaults={'name': name, 'description': f'{name} (synthetic)', 'order': i,
+                          'duration_hours': Decimal(hours), 'price': Decimal(price)},
+            )
+            services.append(service)
+        start = next_id(Booking)
+        today = self.end.date()
+
+        def rows():
+            for pk in range(start, start + total):
+                service = rng.choice(services)
+                booking_date = today + timedelta(days=rng.randint(-3 * 365, 365))
+                if booking_date < today:
+                    booking_status = 'completed' if rng.random() < 0.9 else 'cancelled'
+                else:
+                    booking_status = rng.choice(['pending', 'confirmed', 'confirmed'])
+                created = datetime.combine(booking_date, dt_time(12), tzinfo=dt_timezone.utc) \
+                    - timedelta(days=rng.randint(1, 60))
+                yield Booking(
+                    pk=pk,
+                    booking_number=f'BKSEED{pk:010d}',
+                    service=service,
+                    customer_name=self.person_name(rng),
+                    customer_email=f'client{rng.randint(1, max(total // 2, 1))}@example.com',
+                    customer_phone=f'+1555{rng.randint(0, 9999999):07d}',
+                    booking_date=booking_date,
+                    booking_time=dt_time(rng.randint(8, 17)),
+                    duration_hours=service.duration_hours,
+                    status=booking_status,
+                    price=service.price,
+                    deposit_paid=booking_status in ('confirmed', 'completed'),
+                    created_at=created,
+                    updated_at=created,
+                    confirmed_at=created if booking_status in ('confirmed', 'completed') else None,
+                )
+
+        with historic_timestamps(Booking):
+            self.insert('bookings', total, rows(), lambda b: Booking.objects.bulk_create(b))
+
+    def seed_subscribers(self, total):
+        rng = self.rng('subscribers')
+        start = next_id(Subscriber)
+        sources = ['website'] * 7 + ['footer', 'checkout', 'import']
+
+        def rows():
+            for pk in range(start, start + total):
+                subscribed = self.random_datetime(rng, 5 * 365)
+                active = rng.random() < 0.92
+                yield Subscriber(
+                    pk=pk,
+                    email=f'subscriber{pk}@example.com',
+                    name=self.person_name(rng) if rng.random() < 0.6 else '',
+                    is_active=active,
+                    subscribed_at=subscribed,
+                    unsubscribed_at=None if active else subscribed + timedelta(days=rng.randint(1, 365)),
+                    source=rng.choice(sources),
+                )
+
+        self.insert('subscribers', total, rows(), lambda b: Subscriber.objects.bulk_create(b))
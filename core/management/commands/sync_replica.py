@@ -0,0 +1,34 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.db_router import PRIMARY_DB, replica_alias, replica_configured
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the replica file (local replica testing)'
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError(
+                'No replica database configured. Set REPLICA_DATABASE_PATH to a second SQLite file.'
+            )
+
+        primary = connections[PRIMARY_DB].settings_dict
+        replica = connections[replica_alias()].settings_dict
+        for db in (primary, replica):
+            if db['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError('sync_replica only supports SQLite; use real replication elsewhere.')
+
+        # The online backup API gives a consistent snapshot even while the
+        # dev server is writing to the primary.
+        source = sqlite3.connect(str(primary['NAME']))
+        target = sqlite3.connect(str(replica['NAME']))
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Copied {primary['NAME']} -> {replica['NAME']}"))
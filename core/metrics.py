@@ -0,0 +1,145 @@
+"""
+In-memory request metrics exposed in Prometheus text format.
+
+Metrics are per process: under gunicorn each worker keeps its own
+histograms, so scrape every worker or run a single worker when profiling.
+"""
+import bisect
+import cProfile
+import heapq
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_le(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+class Histogram:
+    """A labelled Prometheus-style histogram with fixed bucket bounds"""
+
+    def __init__(self, name, documentation, buckets, labelnames=('route', 'method')):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self.labelnames = labelnames
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts, then sum and count
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{_format_le(bound)}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {series[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{label_text}}} {series[-1]}')
+        return '\n'.join(lines)
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Wall time per request, including middleware.', LATENCY_BUCKETS)
+DB_QUERY_COUNT = Histogram(
+    'http_request_db_queries', 'Database queries executed per request.', QUERY_COUNT_BUCKETS)
+DB_QUERY_DURATION = Histogram(
+    'http_request_db_duration_seconds', 'Time spent in database queries per request.', LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Response body size as sent (after compression).', SIZE_BUCKETS)
+
+HISTOGRAMS = [REQUEST_DURATION, DB_QUERY_COUNT, DB_QUERY_DURATION, RESPONSE_SIZE]
+
+
+def render_metrics():
+    return '\n'.join(h.render() for h in HISTOGRAMS) + '\n'
+
+
+def reset_metrics():
+    for histogram in HISTOGRAMS:
+        histogram.reset()
+
+
+class QueryStats:
+    """Collects query count and time for one request (a dbhooks listener)"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, sql, params, many, duration, context):
+        self.count += 1
+        self.duration += duration
+
+
+class SlowRequestProfiler:
+    """
+    Keep cProfile dumps for the slowest sampled requests.
+
+    Only the ``keep`` slowest profiles seen by this process are kept on disk;
+    a new profile is written only if it beats the fastest one retained.
+    """
+
+    def __init__(self, directory, keep=20):
+        self.directory = Path(directory)
+        self.keep = keep
+        self._slowest = []  # min-heap of (duration, path)
+        self._lock = threading.Lock()
+
+    def start(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active in this process
+            return None
+        return profile
+
+    def finish(self, profile, route, duration):
+        """Dump a finished (disabled) profile if it is among the slowest"""
+        with self._lock:
+            if len(self._slowest) >= self.keep and duration <= self._slowest[0][0]:
+                return None
+            self.directory.mkdir(parents=True, exist_ok=True)
+            slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', route).strip('_') or 'root'
+            path = self.directory / f'{slug}-{duration * 1000:.0f}ms-{time.time_ns()}.prof'
+            profile.dump_stats(path)
+            heapq.heappush(self._slowest, (duration, str(path)))
+            if len(self._slowest) > self.keep:
+                _, evicted = heapq.heappop(self._slowest)
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
+            return path
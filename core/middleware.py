@@ -0,0 +1,315 @@
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+from . import compression, db_router, dbhooks, metrics, querylog
+from .staticfiles import StaticFileServer
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaPinningMiddleware:
+    """
+    Pin requests to the primary database when they need fresh data.
+
+    Unsafe methods (POST, PUT, PATCH, DELETE) always use the primary. After a
+    request writes, a short-lived cookie pins the same client's following
+    requests to the primary too, so a redirect or refetch right after a write
+    doesn't read stale rows from the replica.
+    """
+    cookie_name = 'primary_pin'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 15)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        self.process_request(request)
+        try:
+            return self.process_response(request, self.get_response(request))
+        finally:
+            db_router.reset_state()
+
+    async def __acall__(self, request):
+        self.process_request(request)
+        try:
+            return self.process_response(request, await self.get_response(request))
+        finally:
+            db_router.reset_state()
+
+    def process_request(self, request):
+        db_router.reset_state()
+        if request.method not in SAFE_METHODS or self.cookie_name in request.COOKIES:
+            db_router.pin_to_primary()
+
+    def process_response(self, request, response):
+        if db_router.has_written() and request.method not in SAFE_METHODS:
+            response.set_cookie(
+                self.cookie_name, '1',
+                max_age=self.pin_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Record per-route wall time, query count, query time and response size.
+
+    Opt-in via REQUEST_METRICS_ENABLED; when off, Django drops the middleware
+    at startup so it costs nothing per request. With
+    REQUEST_PROFILE_SAMPLE_RATE > 0 a random sample of (sync) requests is run
+    under cProfile and the slowest are dumped to REQUEST_PROFILE_DIR.
+    Place it first in MIDDLEWARE so the timing covers every other middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_PROFILE_SAMPLE_RATE', 0)
+        self.profiler = None
+        if self.sample_rate > 0:
+            self.profiler = metrics.SlowRequestProfiler(
+                settings.REQUEST_PROFILE_DIR,
+                keep=getattr(settings, 'REQUEST_PROFILE_KEEP', 20),
+            )
+        dbhooks.install()
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = metrics.QueryStats()
+        profile = None
+        if self.profiler and random.random() < self.sample_rate:
+            profile = self.profiler.start()
+        start = time.perf_counter()
+        try:
+            with dbhooks.listen(stats):
+                response = self.get_response(request)
+        finally:
+            if profile is not None:
+                profile.disable()
+        duration = time.perf_counter() - start
+        route = self._record(request, response, duration, stats)
+        if profile is not None:
+            self.profiler.finish(profile, route, duration)
+        return response
+
+    async def __acall__(self, request):
+        # cProfile only sees the current thread, so async requests (whose
+        # ORM work runs on another thread) are measured but not profiled.
+        stats = metrics.QueryStats()
+        start = time.perf_counter()
+        with dbhooks.listen(stats):
+            response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    def _record(self, request, response, duration, stats):
+        match = request.resolver_match
+        route = (match.view_name or match.route) if match else 'unmatched'
+        labels = (route, request.method)
+        metrics.REQUEST_DURATION.observe(labels, duration)
+        metrics.DB_QUERY_COUNT.observe(labels, stats.count)
+        metrics.DB_QUERY_DURATION.observe(labels, stats.duration)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.observe(labels, len(response.content))
+        return route
+
+
+class QueryLogMiddleware:
+    """
+    Log slow queries and N+1 query patterns per request.
+
+    Opt-in via SLOW_QUERY_LOG_ENABLED (dropped at startup otherwise). Works
+    without DEBUG, since it hooks query execution rather than reading
+    connection.queries.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SLOW_QUERY_LOG_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        dbhooks.install()
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        inspector = querylog.QueryInspector(request)
+        with dbhooks.listen(inspector):
+            response = self.get_response(request)
+        inspector.finish()
+        return response
+
+    async def __acall__(self, request):
+        inspector = querylog.QueryInspector(request)
+        with dbhooks.listen(inspector):
+            response = await self.get_response(request)
+        inspector.finish()
+        return response
+
+
+class PrecompressedStaticMiddleware:
+    """
+    Serve collected static files and the SPA's /assets/ bundle (collected
+    into STATIC_ROOT/SPA_ASSETS_DIR) straight from STATIC_ROOT, using the
+    .br/.gz files written at collectstatic time.
+
+    Place it right after SecurityMiddleware: matching requests return before
+    sessions, CSRF or GZipMiddleware run, so no compression happens per request.
+    Anything not found in STATIC_ROOT falls through to the rest of the stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'STATIC_PRECOMPRESSED_SERVE', True) or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        prefixes = [(settings.STATIC_URL, '', False)]
+        spa_assets_url = getattr(settings, 'SPA_ASSETS_URL', None)
+        if spa_assets_url:
+            # Only Vite's build output, whose names it fingerprints itself
+            prefixes.append((spa_assets_url, getattr(settings, 'SPA_ASSETS_DIR', 'assets'), True))
+        self.server = StaticFileServer(
+            settings.STATIC_ROOT,
+            prefixes,
+            max_age=getattr(settings, 'STATIC_UNHASHED_MAX_AGE', 300),
+        )
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.find_response(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.find_response(request) or await self.get_response(request)
+
+    def find_response(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        match = self.server.match(request.path_info)
+        if match is None:
+            return None
+        name, immutable = match
+        path = self.server.resolve(name)
+        if path is None:
+            return None
+        return self.server.serve(request, path, name, immutable)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses where it pays off; a drop-in for GZipMiddleware.
+
+    Skips bodies under COMPRESSION_MIN_SIZE, content types outside
+    COMPRESSION_CONTENT_TYPES, file downloads and anything already encoded.
+    Offers brotli when the brotli package is installed and
+    COMPRESSION_BROTLI is on. Shared-cacheable bodies (cache_page output) are
+    compressed once and reused until they expire; see core.compression.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.content_types = compression.content_types()
+        self.brotli = compression.brotli_enabled()
+        self.body_cache = compression.CompressedBodyCache(
+            getattr(settings, 'COMPRESSION_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+        )
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        # Size first: most API responses are below it, and nothing else
+        # (headers, content type, Accept-Encoding) needs to be looked at
+        body = None if response.streaming else response.content
+        if body is not None and len(body) < self.min_size:
+            return response
+        if not compression.is_compressible(response, self.content_types):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accept_encoding = request.headers.get('Accept-Encoding', '')
+        if response.streaming:
+            # Streams are gzipped chunk by chunk; nothing to cache
+            if compression.choose_encoding(accept_encoding, allow_brotli=False) is None:
+                return response
+            self.compress_stream(response)
+            encoding = 'gzip'
+        else:
+            encoding = compression.choose_encoding(accept_encoding, self.brotli)
+            if encoding is None:
+                return response
+            ttl = compression.shared_cache_ttl(response)
+            if ttl:
+                compressed = self.body_cache.compress(body, encoding, ttl)
+            else:
+                compressed = compression.compress(body, encoding)
+            if encoding == 'gzip':
+                compressed = compression.pad_gzip(compressed)
+            if len(compressed) >= len(body):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The body is no longer byte-for-byte what a strong ETag promised
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def compress_stream(self, response):
+        max_random_bytes = compression.MAX_RANDOM_BYTES
+        if response.is_async:
+            original = response.streaming_content
+
+            async def compressed():
+                async for chunk in original:
+                    yield compress_string(chunk, max_random_bytes=max_random_bytes)
+
+            response.streaming_content = compressed()
+        else:
+            response.streaming_content = compress_sequence(
+                response.streaming_content, max_random_bytes=max_random_bytes
+            )
+        response.headers.pop('Content-Length', None)
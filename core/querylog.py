@@ -0,0 +1,123 @@
+"""
+Slow-query log and N+1 detection.
+
+A QueryInspector is attached to each request (see QueryLogMiddleware). It
+logs any query slower than SLOW_QUERY_THRESHOLD_MS, and at the end of the
+request flags query shapes repeated N_PLUS_ONE_THRESHOLD or more times - the
+signature of a serializer or loop issuing one query per row. Records are
+appended as JSON lines to SLOW_QUERY_LOG_FILE; `manage.py querylog`
+summarises them.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+
+logger = logging.getLogger('core.querylog')
+
+_write_lock = threading.Lock()
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*(?:%s|\?|NULL)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+# Frames from these files are instrumentation, not the code that ran the query
+_SKIP_FRAMES = ('core/dbhooks.py', 'core/querylog.py', 'core/middleware.py')
+
+
+def normalize_sql(sql):
+    """Reduce a query to its shape so repeats with different values match"""
+    shape = _STRING_LITERAL.sub('?', sql)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _IN_LIST.sub('IN (...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+def capture_stack(limit=8):
+    """The innermost project frames (not Django or library code) of the current stack"""
+    base = str(settings.BASE_DIR) + os.sep
+    frames = []
+    for frame in traceback.extract_stack():
+        filename = frame.filename
+        if not filename.startswith(base) or 'site-packages' in filename:
+            continue
+        relative = filename[len(base):]
+        if relative.replace(os.sep, '/').endswith(_SKIP_FRAMES):
+            continue
+        frames.append(f'{relative}:{frame.lineno} in {frame.name}')
+    return frames[-limit:]
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    name = (match.view_name or match.route) if match else request.path
+    return f'{request.method} {name}'
+
+
+def write_record(record):
+    path = settings.SLOW_QUERY_LOG_FILE
+    line = json.dumps(record, default=str)
+    with _write_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as handle:
+            handle.write(line + '\n')
+
+
+class QueryInspector:
+    """dbhooks listener that collects slow queries and repeated shapes for one request"""
+
+    def __init__(self, request, threshold_ms=None, repeat_threshold=None):
+        self.request = request
+        self.threshold = (threshold_ms if threshold_ms is not None
+                          else getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100)) / 1000
+        self.repeat_threshold = (repeat_threshold if repeat_threshold is not None
+                                 else getattr(settings, 'N_PLUS_ONE_THRESHOLD', 5))
+        # shape -> [count, total seconds, sample sql, stack at first repeat]
+        self.shapes = {}
+
+    def __call__(self, sql, params, many, duration, context):
+        shape = normalize_sql(sql)
+        entry = self.shapes.get(shape)
+        if entry is None:
+            entry = self.shapes[shape] = [0, 0.0, sql, None]
+        entry[0] += 1
+        entry[1] += duration
+        if entry[0] == self.repeat_threshold:
+            entry[3] = capture_stack()
+
+        if duration >= self.threshold:
+            view = view_label(self.request)
+            logger.warning('Slow query (%.1f ms) in %s: %s', duration * 1000, view, sql[:200])
+            write_record({
+                'kind': 'slow',
+                'ts': time.time(),
+                'view': view,
+                'duration_ms': round(duration * 1000, 3),
+                'shape': shape,
+                'sql': sql,
+                'stack': capture_stack(),
+            })
+
+    def finish(self):
+        """Log every shape repeated often enough to look like an N+1"""
+        view = view_label(self.request)
+        for shape, (count, total, sql, stack) in self.shapes.items():
+            if count < self.repeat_threshold:
+                continue
+            logger.warning('Possible N+1 in %s: %d x %s', view, count, sql[:200])
+            write_record({
+                'kind': 'n_plus_one',
+                'ts': time.time(),
+                'view': view,
+                'count': count,
+                'duration_ms': round(total * 1000, 3),
+                'shape': shape,
+                'sql': sql,
+                'stack': stack,
+            })
@@ -0,0 +1,33 @@
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+from . import images
+
+
+def build_srcset(variants, request=None):
+    """``{'webp': 'url 320w, ...', 'jpeg': ...}`` for a ``<field>_variants`` dict"""
+    def build_url(name):
+        url = default_storage.url(name)
+        return request.build_absolute_uri(url) if request else url
+
+    return images.srcset(variants, build_url)
+
+
+class PlaceholderField(serializers.ReadOnlyField):
+    """
+    Renders the inline preview and intrinsic size from an ``<field>_variants``
+    dict, or None until the variants have been generated.
+    """
+
+    def to_representation(self, value):
+        return images.placeholder(value)
+
+
+class SrcsetField(serializers.ReadOnlyField):
+    """
+    Renders an ``<field>_variants`` dict ready for <source srcset>.
+    Empty until the variants have been generated.
+    """
+
+    def to_representation(self, value):
+        return build_srcset(value, self.context.get('request'))
@@ -0,0 +1,187 @@
+"""
+Fingerprinted, precompressed static files.
+
+``collectstatic`` with CompressedManifestStaticFilesStorage writes hashed
+copies of every file (``app.3f2a9c.js``) plus ``.gz`` and, when the optional
+``brotli`` package is installed, ``.br`` siblings for text assets. At request
+time StaticFileServer only picks the best existing file for the client's
+Accept-Encoding, so serving never compresses anything.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.json', '.html', '.svg', '.txt', '.xml',
+    '.ico', '.wasm', '.ttf', '.otf', '.eot', '.webmanifest',
+}
+# Encodings in order of preference, with the suffix of their precompressed file
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def compress_file(path):
+    """Write path.gz / path.br next to ``path`` when they are worth keeping"""
+    with open(path, 'rb') as handle:
+        data = handle.read()
+    written = []
+    candidates = [('.gz', lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        candidates.append(('.br', lambda: brotli.compress(data, quality=11)))
+    for suffix, compress in candidates:
+        compressed = compress()
+        # Skip encodings that barely help; the client just gets the original
+        if len(compressed) < len(data) * 0.95:
+            with open(path + suffix, 'wb') as handle:
+                handle.write(compressed)
+            written.append(path + suffix)
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also precompresses what it collects"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                names.add(name)
+                if hashed_name:
+                    names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                for compressed in compress_file(self.path(name)):
+                    yield name, os.path.relpath(compressed, self.location), True
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # collectstatic hasn't run yet (tests, fresh checkout): fall back
+            # to the plain name rather than breaking every page that uses {% static %}
+            if self.hashed_files:
+                raise
+            return name
+
+
+def parse_accept_encoding(header):
+    """{'gzip': 1.0, 'br': 0.5, ...} from an Accept-Encoding header"""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        match = re.search(r'q=([0-9.]+)', params)
+        try:
+            accepted[coding] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            accepted[coding] = 0.0
+    return accepted
+
+
+class StaticFileServer:
+    """
+    Serve files from STATIC_ROOT under one or more URL prefixes.
+
+    Each prefix maps to a directory under the root. Names listed in the
+    staticfiles manifest are fingerprinted and get a one-year immutable
+    Cache-Control, as does everything under prefixes flagged immutable,
+    which must only map to directories of fingerprinted files (Vite's build
+    output). Everything else gets ``max_age``.
+    """
+
+    def __init__(self, root, prefixes, max_age=300):
+        self.root = str(root)
+        # [(url prefix, directory under root, immutable)]
+        self.prefixes = prefixes
+        self.max_age = max_age
+        self.hashed_names = self.load_hashed_names()
+
+    def load_hashed_names(self):
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        return set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def match(self, path):
+        """(file name relative to root, immutable) for a URL path, or None"""
+        for prefix, directory, immutable in self.prefixes:
+            if path.startswith(prefix):
+                name = posixpath.normpath(path[len(prefix):])
+                # Stay inside the prefix's directory
+                if not path[len(prefix):] or name.startswith(('..', '/')):
+                    return None
+                return (posixpath.join(directory, name) if directory else name), immutable
+        return None
+
+    def resolve(self, name):
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        return path if os.path.isfile(path) else None
+
+    def serve(self, request, path, name, immutable):
+        accepted = parse_accept_encoding(request.headers.get('Accept-Encoding', ''))
+        chosen, encoding, has_variants = path, None, False
+        for coding, suffix in ENCODINGS:
+            if not os.path.isfile(path + suffix):
+                continue
+            has_variants = True
+            if encoding is None and accepted.get(coding, accepted.get('*', 0)) > 0:
+                chosen, encoding = path + suffix, coding
+
+        stat = os.stat(chosen)
+        etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'
+        if immutable or name in self.hashed_names:
+            cache_control = IMMUTABLE
+        else:
+            cache_control = f'public, max-age={self.max_age}'
+
+        if_none_match = request.headers.get('If-None-Match')
+        if (if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]) or (
+            not if_none_match
+            and not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime)
+        ):
+            response = HttpResponseNotModified()
+        elif request.method == 'HEAD':
+            response = HttpResponse(content_type=self.content_type(name))
+            response['Content-Length'] = stat.st_size
+        else:
+            response = FileResponse(open(chosen, 'rb'), content_type=self.content_type(name))
+            response.headers.pop('Content-Disposition', None)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = cache_control
+        if encoding:
+            response['Content-Encoding'] = encoding
+        if has_variants:
+            response['Vary'] = 'Accept-Encoding'
+        return response
+
+    @staticmethod
+    def content_type(name):
+        content_type, _ = mimetypes.guess_type(name)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'image/svg+xml'):
+            content_type += '; charset=utf-8'
+        return content_type
@@ -0,0 +1,15 @@
+from django.apps import apps
+
+from tasks.queue import task
+
+from .images import generate_variants, store_result
+
+
+@task(priority=10)
+def build_image_variants(model_label, pk, field_name, source_name):
+    """Generate responsive variants for one uploaded image"""
+    model = apps.get_model(model_label)
+    # Skip the work if the image was replaced or removed since this was queued
+    if not model._default_manager.filter(pk=pk, **{field_name: source_name}).exists():
+        return
+    store_result(model, pk, field_name, source_name, generate_variants(source_name))
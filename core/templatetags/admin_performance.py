@@ -0,0 +1,37 @@
+import hashlib
+
+from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.cache import cache
+from django.utils.translation import get_language
+
+register = template.Library()
+
+
+def cached_date_hierarchy(cl):
+    """Django's date_hierarchy context, cached per model, filters and language"""
+    get_timeout = getattr(cl.model_admin, 'get_date_hierarchy_cache_timeout', None)
+    timeout = get_timeout() if get_timeout else 0
+    if not timeout:
+        return date_hierarchy(cl)
+    query_string = cl.get_query_string(remove=[PAGE_VAR])
+    digest = hashlib.md5(f'{get_language()}:{query_string}'.encode()).hexdigest()
+    key = f'admin-date-hierarchy:{cl.opts.label_lower}:{digest}'
+    context = cache.get(key)
+    if context is None:
+        context = date_hierarchy(cl)
+        cache.set(key, context, timeout)
+    return context
+
+
+@register.tag(name='cached_date_hierarchy')
+def cached_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser,
+        token,
+        func=cached_date_hierarchy,
+        template_name='date_hierarchy.html',
+        takes_context=False,
+    )
@@ -0,0 +1,781 @@
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from portfolio.models import Project
+from shop.models import Coupon, Order, Product
+from . import compression, db_router, metrics
+from .db_router import PrimaryReplicaRouter, use_primary
+from .middleware import ReplicaPinningMiddleware
+from .querylog import normalize_sql
+from .throttling import ScopedSlidingWindowThrottle, throttle_cache
+
+
+@mock.patch('core.db_router.replica_configured', return_value=True)
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    """Test read/write routing decisions"""
+
+    def setUp(self):
+        db_router.reset_state()
+        self.router = PrimaryReplicaRouter()
+
+    def tearDown(self):
+        db_router.reset_state()
+
+    def test_catalogue_reads_go_to_replica(self, _):
+        self.assertEqual(self.router.db_for_read(Project), 'replica')
+
+    def test_read_after_write_models_stay_on_primary(self, _):
+        self.assertEqual(self.router.db_for_read(Order), 'default')
+        self.assertEqual(self.router.db_for_read(Coupon), 'default')
+
+    def test_writes_pin_request_to_primary(self, _):
+        self.assertEqual(self.router.db_for_write(Project), 'default')
+        self.assertEqual(self.router.db_for_read(Project), 'default')
+
+    def test_use_primary_is_scoped(self, _):
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Project), 'default')
+        self.assertEqual(self.router.db_for_read(Project), 'replica')
+
+    def test_no_migrations_on_replica(self, _):
+        self.assertFalse(self.router.allow_migrate('replica', 'portfolio'))
+        self.assertIsNone(self.router.allow_migrate('default', 'portfolio'))
+
+
+class PrimaryReplicaFallbackTest(SimpleTestCase):
+    """Without a replica configured everything uses the primary"""
+
+    @mock.patch('core.db_router.replica_configured', return_value=False)
+    def test_reads_use_default(self, _):
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(Project), 'default')
+
+
+class ReplicaPinningMiddlewareTest(TestCase):
+    """Test sticky-primary cookie handling"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_write_request_sets_pin_cookie(self):
+        def view(request):
+            self.assertTrue(db_router.is_pinned())
+            Coupon.objects.filter(code='NOPE').update(is_active=False)
+            return HttpResponse('ok')
+
+        response = ReplicaPinningMiddleware(view)(self.factory.post('/'))
+        self.assertIn('primary_pin', response.cookies)
+        self.assertFalse(db_router.is_pinned())
+
+    def test_read_request_is_not_pinned(self):
+        def view(request):
+            self.assertFalse(db_router.is_pinned())
+            return HttpResponse('ok')
+
+        response = ReplicaPinningMiddleware(view)(self.factory.get('/'))
+        self.assertNotIn('primary_pin', response.cookies)
+
+    def test_pin_cookie_pins_following_reads(self):
+        def view(request):
+            self.assertTrue(db_router.is_pinned())
+            return HttpResponse('ok')
+
+        request = self.factory.get('/')
+        request.COOKIES['primary_pin'] = '1'
+        ReplicaPinningMiddleware(view)(request)
+
+
+class HealthCheckTest(TestCase):
+    """Test the readiness endpoint used by run.py"""
+
+    def test_health_check(self):
+        response = self.client.get('/api/health/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+
+class SitemapTest(TestCase):
+    """Test the async sitemap view"""
+
+    def test_sitemap_lists_products(self):
+        from shop.models import Product
+        Product.objects.create(name='LUTs', slug='luts', description='x', price=1)
+        response = self.client.get('/sitemap.xml')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'/shop/luts', response.content)
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True)
+class RequestMetricsTest(TestCase):
+    """Test per-route histograms and the staff-only metrics endpoint"""
+
+    def setUp(self):
+        metrics.reset_metrics()
+
+    def test_requests_are_recorded(self):
+        self.client.get('/api/portfolio/projects/')
+        text = metrics.render_metrics()
+        self.assertIn('http_request_duration_seconds_count{route="project-list",method="GET"} 1', text)
+        self.assertIn('http_request_db_queries_bucket{route="project-list",method="GET",le="+Inf"} 1', text)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.assertEqual(self.client.get('/api/_metrics').status_code, 403)
+
+        staff = User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get('/api/_metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE http_request_duration_seconds histogram', response.content)
+
+    def test_slow_request_profiles_are_capped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = metrics.SlowRequestProfiler(directory, keep=2)
+            for duration in (0.1, 0.3, 0.2, 0.05):
+                profile = profiler.start()
+                profile.disable()
+                profiler.finish(profile, 'project-list', duration)
+            kept = sorted(os.listdir(directory))
+            self.assertEqual(len(kept), 2)
+            self.assertTrue(any('-300ms-' in name for name in kept))
+            self.assertTrue(any('-200ms-' in name for name in kept))
+
+
+class QueryLogTest(TestCase):
+    """Test the slow-query log and N+1 detector"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.tmp.name, 'queries.log')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?',
+        )
+
+    def test_n_plus_one_is_flagged_and_summarised(self):
+        for i in range(6):
+            Product.objects.create(name=f'P{i}', slug=f'p{i}', description='x', price=1)
+
+        with self.settings(SLOW_QUERY_LOG_ENABLED=True, SLOW_QUERY_LOG_FILE=self.log_file,
+                           SLOW_QUERY_THRESHOLD_MS=10_000, N_PLUS_ONE_THRESHOLD=5):
+            with self.assertLogs('core.querylog', level='WARNING'):
+                self.client.get('/api/shop/products/')
+
+        with open(self.log_file) as handle:
+            records = [json.loads(line) for line in handle]
+        self.assertTrue(records)
+        self.assertEqual({r['kind'] for r in records}, {'n_plus_one'})
+        self.assertEqual(records[0]['view'], 'GET product-list')
+        self.assertGreaterEqual(records[0]['count'], 5)
+        self.assertTrue(any('shop/serializers.py' in frame for frame in records[0]['stack']))
+
+        out = StringIO()
+        call_command('querylog', file=self.log_file, json=True, stdout=out)
+        summary = json.loads(out.getvalue())
+        self.assertEqual(summary[0]['kind'], 'n_plus_one')
+
+    def test_slow_queries_are_logged(self):
+        with self.settings(SLOW_QUERY_LOG_ENABLED=True, SLOW_QUERY_LOG_FILE=self.log_file,
+                           SLOW_QUERY_THRESHOLD_MS=0):
+            with self.assertLogs('core.querylog', level='WARNING'):
+                self.client.get('/api/portfolio/projects/')
+
+        with open(self.log_file) as handle:
+            kinds = [json.loads(line)['kind'] for line in handle]
+        self.assertIn('slow', kinds)
+
+
+class LoadTestCommandTest(TransactionTestCase):
+    """Smoke test the in-process load test harness"""
+
+    def test_loadtest_reports_every_scenario(self):
+        from booking.models import BookingService
+        from portfolio.models import Category
+        category = Category.objects.create(name='Music', slug='music')
+        Project.objects.create(title='P', slug='p', description='x', year=2024, category=category)
+        Product.objects.create(name='LUTs', slug='luts', description='x', price=10)
+        BookingService.objects.create(name='Shoot', slug='shoot', description='x',
+                                      duration_hours=2, price=100)
+
+        out = StringIO()
+        call_command('loadtest', users=3, iterations=40, cleanup=True, json_path='-',
+                     stdout=out, stderr=StringIO())
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(set(report['scenarios']), {
+            'browse_portfolio', 'view_project', 'shop_browse', 'checkout_with_coupon', 'book_session',
+        })
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertGreater(report['total']['requests'], 40)
+        for scenario in report['scenarios'].values():
+            self.assertIn('p99_ms', scenario)
+            self.assertIsNotNone(scenario['db_queries'])
+        # The coupon the run created is gone again
+        self.assertFalse(Coupon.objects.filter(code='LOADTEST').exists())
+
+
+class SeedCommandTest(TestCase):
+    """Test the synthetic data generator"""
+
+    def seed(self):
+        call_command('seed', scale=0.0005, seed=7, end_date='2025-06-30', flush=True,
+                     batch_size=100, stdout=StringIO())
+
+    def test_seed_is_consistent_and_deterministic(self):
+        from booking.models import Booking
+        from shop.models import OrderItem
+        from subscribers.models import Subscriber
+
+        self.seed()
+        self.assertEqual(Project.objects.count(), 50)
+        self.assertEqual(Order.objects.count(), 500)
+        self.assertEqual(Booking.objects.count(), 250)
+        self.assertEqual(Subscriber.objects.count(), 500)
+        self.assertFalse(Order.objects.filter(items__isnull=True).exists())
+        order = Order.objects.order_by('pk').first()
+        self.assertEqual(order.subtotal, sum(item.total for item in order.items.all()))
+        self.assertEqual(order.total, order.subtotal - order.discount)
+
+        first = list(OrderItem.objects.order_by('pk').values_list('product_name', 'price', 'quantity'))
+        self.seed()
+        second = list(OrderItem.objects.order_by('pk').values_list('product_name', 'price', 'quantity'))
+        self.assertEqual(first, second)
+
+
+def make_image(name='photo.jpg', size=(800, 600)):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 80, 40)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ImageVariantsTest(TestCase):
+    """Test responsive image variant generation"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root, IMAGE_VARIANTS_ASYNC=False,
+                                     IMAGE_VARIANT_WIDTHS=[320, 640, 1920])
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def create_product(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(name='Print', slug='print', description='A print',
+                                          price=10, image=make_image())
+
+    def test_variants_built_after_upload(self):
+        from django.core.files.storage import default_storage
+
+        product = self.create_product()
+        product.refresh_from_db()
+        variants = product.image_variants
+        self.assertEqual(variants['source'], product.image.name)
+        self.assertEqual((variants['width'], variants['height']), (800, 600))
+        # No upscaling: the original width stands in for the larger sizes
+        self.assertEqual(sorted(variants['formats']['webp'], key=int), ['320', '640', '800'])
+        for name in variants['formats']['jpeg'].values():
+            self.assertTrue(default_storage.exists(name))
+
+    def test_unchanged_image_is_not_reprocessed(self):
+        product = self.create_product()
+        product.refresh_from_db()
+        with mock.patch('core.images.generate_variants') as generate:
+            with self.captureOnCommitCallbacks(execute=True):
+                product.name = 'Renamed'
+                product.save()
+        generate.assert_not_called()
+
+    def test_serializer_exposes_srcset(self):
+        from shop.serializers import ProductListSerializer
+
+        product = self.create_product()
+        product.refresh_from_db()
+        data = ProductListSerializer(product).data
+        self.assertEqual(set(data['image_srcset']), {'webp', 'jpeg'})
+        self.assertIn('320w', data['image_srcset']['webp'])
+        self.assertTrue(data['image_srcset']['webp'].endswith('800w'))
+
+    def test_backfill_command_is_resumable(self):
+        product = self.create_product()
+        Product.objects.filter(pk=product.pk).update(image_variants={})
+
+        out = StringIO()
+        call_command('build_image_variants', model=['shop.Product'], workers=1, stdout=out)
+        self.assertIn('shop.Product.image: 1 built, 0 already current', out.getvalue())
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants['source'], product.image.name)
+
+        out = StringIO()
+        call_command('build_image_variants', model=['shop.Product'], workers=1, stdout=out)
+        self.assertIn('0 built, 1 already current', out.getvalue())
+
+    def test_placeholder_in_list_payloads(self):
+        from portfolio.models import Testimonial
+        from portfolio.serializers import TestimonialSerializer
+        from shop.serializers import ProductListSerializer
+
+        product = self.create_product()
+        product.refresh_from_db()
+        placeholder = ProductListSerializer(product).data['image_placeholder']
+        self.assertEqual((placeholder['width'], placeholder['height']), (800, 600))
+        self.assertTrue(placeholder['src'].startswith('data:image/webp;base64,'))
+        self.assertLess(len(placeholder['src']), 1000)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            testimonial = Testimonial.objects.create(client_name='Ada', testimonial='Great',
+                                                     client_photo=make_image('ada.jpg', (300, 400)))
+        testimonial.refresh_from_db()
+        data = TestimonialSerializer(testimonial).data
+        self.assertEqual(data['client_photo_placeholder']['height'], 400)
+
+    def test_placeholder_is_null_until_generated(self):
+        from shop.serializers import ProductListSerializer
+
+        with mock.patch('core.images.schedule') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                product = Product.objects.create(name='Print', slug='print', description='A print',
+                                                 price=10, image=make_image())
+        schedule.assert_called_once()
+        self.assertIsNone(ProductListSerializer(product).data['image_placeholder'])
+
+
+class PrecompressedStaticTest(TestCase):
+    """Test fingerprinted, precompressed static file serving"""
+
+    script = b'console.log("kodeen");\n' * 200
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        source = tempfile.mkdtemp()
+        static_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, source, ignore_errors=True)
+        cls.addClassCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        with open(os.path.join(source, 'app.js'), 'wb') as handle:
+            handle.write(cls.script)
+        with open(os.path.join(source, 'logo.png'), 'wb') as handle:
+            handle.write(os.urandom(2048))
+        vite_build = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, vite_build, ignore_errors=True)
+        with open(os.path.join(vite_build, 'index-B2x9Qk1a.js'), 'wb') as handle:
+            handle.write(cls.script)
+        override = override_settings(
+            STATIC_ROOT=static_root,
+            STATICFILES_DIRS=[source, ('assets', vite_build)],
+            SPA_ASSETS_DIR='assets',
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        )
+        override.enable()
+        cls.addClassCleanup(override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        cls.hashed_js = staticfiles_storage.stored_name('app.js')
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_collectstatic_writes_compressed_variants(self):
+        from django.conf import settings
+
+        self.assertNotEqual(self.hashed_js, 'app.js')
+        self.assertTrue(os.path.exists(os.path.join(settings.STATIC_ROOT, self.hashed_js + '.gz')))
+        # Incompressible files aren't given a useless .gz
+        self.assertFalse(os.path.exists(os.path.join(settings.STATIC_ROOT, 'logo.png.gz')))
+
+    def test_serves_gzip_with_immutable_caching(self):
+        import gzip
+
+        response = self.client.get(f'/static/{self.hashed_js}', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(response['Content-Type'].startswith('text/javascript'))
+        self.assertEqual(gzip.decompress(self.body(response)), self.script)
+
+    def test_identity_when_client_does_not_accept_gzip(self):
+        response = self.client.get(f'/static/{self.hashed_js}', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(self.body(response), self.script)
+
+    def test_unhashed_names_get_short_cache(self):
+        response = self.client.get('/static/app.js', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=300')
+
+    def test_spa_assets_are_immutable_and_confined_to_the_build(self):
+        # Vite names the files in its build directory by content hash already
+        response = self.client.get('/assets/index-B2x9Qk1a.js', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        # The rest of STATIC_ROOT isn't reachable there, let alone cached for a year
+        self.assertEqual(self.client.get('/assets/app.js').status_code, 404)
+        self.assertEqual(self.client.get('/assets/../app.js').status_code, 404)
+        response = self.client.get('/static/assets/index-B2x9Qk1a.js')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=300')
+
+    def test_conditional_request(self):
+        first = self.client.get(f'/static/{self.hashed_js}', HTTP_ACCEPT_ENCODING='gzip')
+        response = self.client.get(f'/static/{self.hashed_js}', HTTP_ACCEPT_ENCODING='gzip',
+                                   HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_file_falls_through(self):
+        self.assertEqual(self.client.get('/static/missing.js').status_code, 404)
+        self.assertEqual(self.client.get('/static/../settings.py').status_code, 404)
+
+
+class CompressionMiddlewareTest(SimpleTestCase):
+    """Test the adaptive compression policy"""
+
+    body = json.dumps({'results': [{'title': f'Project {i}', 'tags': 'music video'} for i in range(100)]})
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def process(self, response, accept='gzip, deflate'):
+        from .middleware import CompressionMiddleware
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_large_json_is_gzipped(self):
+        import gzip
+
+        response = self.process(HttpResponse(self.body, content_type='application/json'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content).decode(), self.body)
+
+    def test_small_body_left_alone(self):
+        response = self.process(HttpResponse('{"status": "ok"}', content_type='application/json'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+
+    def test_content_type_not_in_allowlist(self):
+        response = self.process(HttpResponse(b'\x00' * 4096, content_type='image/png'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_file_downloads_are_not_compressed(self):
+        from django.http import FileResponse
+
+        response = self.process(FileResponse(BytesIO(self.body.encode()), content_type='text/plain'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_identity_for_clients_without_gzip(self):
+        response = self.process(HttpResponse(self.body, content_type='application/json'), accept='')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_streaming_text_is_gzipped(self):
+        import gzip
+        from django.http import StreamingHttpResponse
+
+        response = self.process(StreamingHttpResponse((f'row,{i}\n' for i in range(500)), content_type='text/csv'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertTrue(content.startswith('row,0\n'))
+
+    def test_cacheable_body_compressed_once(self):
+        import gzip
+        from .middleware import CompressionMiddleware
+
+        def cached_page(request):
+            response = HttpResponse(self.body, content_type='application/json')
+            response['Cache-Control'] = 'max-age=300'
+            return response
+
+        middleware = CompressionMiddleware(cached_page)
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        with mock.patch('core.compression.compress', wraps=compression.compress) as compress:
+            first = middleware(request)
+            second = middleware(request)
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(gzip.decompress(first.content), gzip.decompress(second.content))
+
+        # Private responses are compressed per request
+        with mock.patch('core.compression.compress', wraps=compression.compress) as compress:
+            middleware = CompressionMiddleware(lambda request: HttpResponse(self.body, content_type='application/json'))
+            middleware(request)
+            middleware(request)
+        self.assertEqual(compress.call_count, 2)
+
+
+@mock.patch.object(ScopedSlidingWindowThrottle, 'THROTTLE_RATES', {'read': '100/min', 'orders': '3/min'})
+class SlidingWindowThrottleTest(SimpleTestCase):
+    """Test the shared sliding-window throttle"""
+
+    class OrderView:
+        throttle_scope = 'orders'
+
+    def setUp(self):
+        throttle_cache().clear()
+        self.now = 6000.0  # start of a one-minute window
+        self.factory = RequestFactory()
+
+    def allow(self, method='post'):
+        from rest_framework.request import Request
+
+        throttle = ScopedSlidingWindowThrottle()
+        throttle.timer = lambda: self.now
+        request = Request(getattr(self.factory, method)('/', REMOTE_ADDR='10.1.2.3'))
+        return throttle, throttle.allow_request(request, self.OrderView())
+
+    def test_write_scope_limit(self):
+        for _ in range(3):
+            self.assertTrue(self.allow()[1])
+        throttle, allowed = self.allow()
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 80.0)
+        # Reads are charged to their own scope
+        self.assertTrue(self.allow('get')[1])
+
+    def test_window_slides(self):
+        for _ in range(3):
+            self.allow()
+        # Halfway through the next window the old requests count for half
+        self.now += 90
+        self.assertTrue(self.allow()[1])
+        self.assertTrue(self.allow()[1])
+        throttle, allowed = self.allow()
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 10.0)
+
+    def test_state_is_two_counters(self):
+        for _ in range(3):
+            self.allow()
+        throttle, _ = self.allow('get')
+        self.assertEqual(throttle_cache().get(f'{throttle.key}:100'), 1)
+        self.assertEqual(throttle_cache().get('throttle_orders_10.1.2.3:100'), 3)
+
+
+@mock.patch.object(ScopedSlidingWindowThrottle, 'THROTTLE_RATES', {'read': '100/hour', 'contact': '2/hour'})
+class ThrottleScopeAPITest(TestCase):
+    """Test per-scope rates on real endpoints"""
+
+    def setUp(self):
+        throttle_cache().clear()
+
+    def test_contact_posts_throttled_before_reads(self):
+        payload = {'name': 'Ada', 'email': 'ada@example.com', 'project_type': 'other', 'message': 'Hi'}
+        statuses = [self.client.post('/api/portfolio/contact/', payload).status_code for _ in range(3)]
+        self.assertNotEqual(statuses[1], 429)
+        self.assertEqual(statuses[2], 429)
+        self.assertEqual(self.client.get('/api/portfolio/categories/').status_code, 200)
+
+    def test_reviews_scope_on_the_review_action_only(self):
+        from shop.models import ProductCategory
+        from shop.views import ProductViewSet
+        category = ProductCategory.objects.create(name='LUTs', slug='luts')
+        Product.objects.create(name='Pack', slug='pack', description='-', price=10, category=category)
+        self.assertIsNone(ProductViewSet.throttle_scope)
+        payload = {'customer_name': 'Ada', 'rating': 5, 'title': 'Great', 'review': 'Nice'}
+        with mock.patch.dict(ScopedSlidingWindowThrottle.THROTTLE_RATES, {'reviews': '1/hour'}):
+            statuses = [self.client.post('/api/shop/products/pack/review/', payload).status_code for _ in range(2)]
+        self.assertEqual(statuses, [201, 429])
+
+
+class ExportTest(TestCase):
+    """Test streaming CSV/JSONL exports"""
+
+    def setUp(self):
+        from decimal import Decimal
+        from shop.models import OrderItem
+        from subscribers.models import Subscriber
+        for number, day in (('ORD-A', '2025-01-10'), ('ORD-B', '2025-02-10'), ('ORD-C', '2025-03-10')):
+            order = Order.objects.create(
+                order_number=number, customer_name='Ann', customer_email='ann@example.com',
+                subtotal=Decimal('30.00'), total=Decimal('30.00'),
+            )
+            Order.objects.filter(pk=order.pk).update(created_at=f'{day}T12:00:00Z')
+            if number != 'ORD-C':
+                OrderItem.objects.create(order=order, product_name='LUT Pack', price=Decimal('10.00'))
+                OrderItem.objects.create(order=order, product_name='Presets', price=Decimal('20.00'))
+        Subscriber.objects.create(email='sub@example.com', name='Sub')
+
+    def export(self, *args, **options):
+        out = StringIO()
+        call_command('export', *args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_orders_csv_one_row_per_item(self):
+        """Test order CSV rows repeat the order for each item, and keep item-less orders"""
+        import csv
+        rows = list(csv.DictReader(StringIO(self.export('orders'))))
+        self.assertEqual([(r['order_number'], r['item_product']) for r in rows],
+                         [('ORD-A', 'LUT Pack'), ('ORD-A', 'Presets'), ('ORD-B', 'LUT Pack'),
+                          ('ORD-B', 'Presets'), ('ORD-C', '')])
+        self.assertEqual(rows[0]['total'], '30.00')
+
+    def test_orders_jsonl_nests_items(self):
+        """Test order JSON lines carry their items"""
+        lines = [json.loads(line) for line in self.export('orders', format='jsonl').splitlines()]
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0]['items'], [
+            {'product': 'LUT Pack', 'price': '10.00', 'quantity': 1},
+            {'product': 'Presets', 'price': '20.00', 'quantity': 1},
+        ])
+        self.assertEqual(lines[2]['items'], [])
+
+    def test_date_range(self):
+        """Test --since/--until include whole days at both ends"""
+        output = self.export('orders', format='jsonl', since='2025-02-10', until='2025-03-10')
+        self.assertEqual([json.loads(line)['order_number'] for line in output.splitlines()], ['ORD-B', 'ORD-C'])
+
+    def test_item_queries_per_chunk(self):
+        """Test items are fetched once per chunk of orders, not per order"""
+        from shop.exports import OrderExport
+        export = OrderExport()
+        # One cursor over orders, one item query per chunk of two
+        with self.assertNumQueries(1 + 2):
+            ''.join(export.stream(Order.objects.all(), 'csv', chunk_size=2))
+
+    def test_subscribers_and_bookings(self):
+        """Test the other datasets export"""
+        self.assertIn('sub@example.com,Sub,True', self.export('subscribers'))
+        self.assertTrue(self.export('bookings').startswith('booking_number,service,booking_date'))
+
+    def test_admin_action_streams(self):
+        """Test the admin export action returns a streaming download"""
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(admin_user)
+        response = self.client.post('/admin/shop/order/', {
+            'action': 'export_csv',
+            '_selected_action': list(Order.objects.values_list('pk', flat=True)),
+        })
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="orders-', response['Content-Disposition'])
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('ORD-A'), 2)
+
+
+class AdminPerformanceTest(TestCase):
+    """Test changelists built on core.admin.PerformanceModelAdmin"""
+
+    URLS = [
+        '/admin/shop/order/',
+        '/admin/shop/productreview/',
+        '/admin/booking/booking/',
+        '/admin/subscribers/subscriber/',
+        '/admin/portfolio/testimonial/',
+        '/admin/portfolio/award/',
+    ]
+
+    def setUp(self):
+        from decimal import Decimal
+        from booking.models import BookingService
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        self.project = Project.objects.create(title='Reel', slug='reel', year=2024, description='Test')
+        self.product = Product.objects.create(name='LUT Pack', slug='lut-pack', description='Test', price=Decimal('10.00'))
+        self.service = BookingService.objects.create(
+            name='Shoot', slug='shoot', description='Test', duration_hours=Decimal('2.0'), price=Decimal('100.00')
+        )
+        self.added = 0
+
+    def add_rows(self, count):
+        from datetime import date, time
+        from decimal import Decimal
+        from booking.models import Booking
+        from portfolio.models import Award, Testimonial
+        from shop.models import ProductReview
+        from subscribers.models import Subscriber
+        for i in range(self.added, self.added + count):
+            Order.objects.create(order_number=f'ORD{i}', customer_name='Ann', customer_email='ann@example.com',
+                                 subtotal=Decimal('10.00'), total=Decimal('10.00'))
+            ProductReview.objects.create(product=self.product, customer_name='Ann', customer_email='ann@example.com',
+                                         rating=5, title='Great', review='Great')
+            Booking.objects.create(service=self.service, customer_name='Ann', customer_email='ann@example.com',
+                                   customer_phone='555', booking_date=date(2025, 1 + i % 12, 1 + i % 28),
+                                   booking_time=time(10), duration_hours=Decimal('2.0'), price=Decimal('100.00'))
+            Subscriber.objects.create(email=f'user{i}@example.com')
+            Testimonial.objects.create(client_name='Ann', testimonial='Great', project=self.project)
+            Award.objects.create(title=f'Award {i}', organization='Festival', year=2024, project=self.project)
+        self.added += count
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries]
+
+    def test_constant_queries_per_page(self):
+        """Test a changelist page costs the same number of queries at 2 rows and 10"""
+        self.add_rows(2)
+        few = {}
+        for url in self.URLS:
+            cache.clear()
+            few[url] = len(self.get(url)[1])
+        self.add_rows(8)
+        for url in self.URLS:
+            cache.clear()
+            with self.subTest(url=url):
+                self.assertEqual(len(self.get(url)[1]), few[url])
+
+    def test_nullable_foreign_keys_joined(self):
+        """Test nullable foreign keys in list_display are selected with the rows"""
+        from portfolio.admin import TestimonialAdmin
+        from portfolio.models import Testimonial
+        from django.contrib.admin.sites import site
+        model_admin = site._registry[Testimonial]
+        self.assertIsInstance(model_admin, TestimonialAdmin)
+        self.assertEqual(model_admin.get_list_select_related(RequestFactory().get('/')), ['project'])
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=5)
+    def test_estimated_count_past_threshold(self):
+        """Test large unfiltered changelists skip COUNT(*) and filtered counts are cached"""
+        from subscribers.models import Subscriber
+        self.add_rows(10)
+        Subscriber.objects.filter(email='user0@example.com').delete()
+        top = Subscriber.objects.order_by('-pk').values_list('pk', flat=True)[0]
+
+        response, queries = self.get('/admin/subscribers/subscriber/')
+        self.assertEqual(response.context['cl'].result_count, top)
+        self.assertFalse([sql for sql in queries if 'COUNT(' in sql and 'subscribers_subscriber' in sql])
+
+        response, _ = self.get('/admin/subscribers/subscriber/?is_active__exact=1')
+        self.assertEqual(response.context['cl'].result_count, 9)
+        response, queries = self.get('/admin/subscribers/subscriber/?is_active__exact=1')
+        self.assertEqual(response.context['cl'].result_count, 9)
+        self.assertFalse([sql for sql in queries if 'COUNT(' in sql])
+
+    def test_small_tables_counted_exactly(self):
+        """Test counts below the threshold are exact"""
+        from subscribers.models import Subscriber
+        self.add_rows(3)
+        Subscriber.objects.filter(email='user0@example.com').delete()
+        response, _ = self.get('/admin/subscribers/subscriber/')
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_date_hierarchy_cached(self):
+        """Test the date hierarchy buckets are computed once per filter combination"""
+        self.add_rows(3)
+        response, queries = self.get('/admin/booking/booking/')
+        self.assertTrue([sql for sql in queries if 'MIN(' in sql])
+        self.assertContains(response, '>January 2025</a>')
+
+        response, queries = self.get('/admin/booking/booking/')
+        self.assertFalse([sql for sql in queries if 'MIN(' in sql or 'django_date_trunc' in sql])
+        self.assertContains(response, '>January 2025</a>')
+
+        _, queries = self.get('/admin/booking/booking/?status__exact=pending')
+        self.assertTrue([sql for sql in queries if 'MIN(' in sql])
@@ -0,0 +1,111 @@
+"""
+DRF throttles backed by a shared cache with an O(1) sliding-window counter.
+
+DRF's SimpleRateThrottle stores every request timestamp in a list per
+client and rewrites the whole list on each request, in whichever cache is
+the default (per-process LocMemCache here, so limits multiplied by the
+worker count). These throttles keep two integers per client and scope, the
+counts for the current and previous fixed window, and estimate the sliding
+window as ``previous * (1 - elapsed_fraction) + current``. Each request is
+one get_many and one atomic incr against THROTTLE_CACHE_ALIAS, which should
+point at a store shared by all workers (Redis in production).
+"""
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def throttle_cache():
+    return caches[getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default')]
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """Base class: subclasses set ``scope`` and implement get_cache_key()"""
+
+    def __init__(self):
+        # Rates are resolved per request in allow_request(), since the
+        # scope can depend on the request
+        self.cache = throttle_cache()
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+        if self.scope is None:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        current_key = f'{self.key}:{window}'
+        previous_key = f'{self.key}:{window - 1}'
+        counts = self.cache.get_many([previous_key, current_key])
+        self.previous = counts.get(previous_key, 0)
+        self.current = counts.get(current_key, 0)
+        self.elapsed = (self.now % self.duration) / self.duration
+
+        if self.previous * (1 - self.elapsed) + self.current >= self.num_requests:
+            return self.throttle_failure()
+
+        try:
+            self.cache.incr(current_key)
+        except ValueError:
+            # First request in this window. add() is atomic, so if another
+            # worker created the key first we fall back to incr()
+            if not self.cache.add(current_key, 1, timeout=self.duration * 2):
+                self.cache.incr(current_key)
+        return self.throttle_success()
+
+    def get_scope(self, request, view):
+        return self.scope
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        """Seconds until the weighted count drops below the limit"""
+        if self.current >= self.num_requests:
+            # Nothing from the previous window left to age out; wait for the
+            # next window, where today's count becomes the decaying one
+            remaining = self.duration * (1 - self.elapsed)
+            excess = self.current - self.num_requests + 1
+            return remaining + self.duration * excess / self.current
+        fraction = 1 - (self.num_requests - self.current) / self.previous
+        return max(fraction - self.elapsed, 0) * self.duration
+
+
+class ScopedSlidingWindowThrottle(SlidingWindowRateThrottle):
+    """
+    One throttle for the whole API, charged per scope:
+
+    * authenticated users share the ``user`` rate for everything;
+    * anonymous safe requests (cheap, mostly cached GETs) use ``read``;
+    * anonymous writes use the view's ``throttle_scope`` (``orders``,
+      ``bookings``, ``reviews``, ``contact``...) or ``write``.
+
+    Scopes without a rate in DEFAULT_THROTTLE_RATES are not throttled.
+    """
+
+    def get_scope(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return 'user'
+        if request.method in SAFE_METHODS:
+            return 'read'
+        return getattr(view, 'throttle_scope', None) or 'write'
+
+    def get_rate(self):
+        return self.THROTTLE_RATES.get(self.scope)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'u{request.user.pk}'
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
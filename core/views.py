@@ -0,0 +1,14 @@
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+
+from .metrics import render_metrics
+
+
+@never_cache
+@require_GET
+def metrics_view(request):
+    """Prometheus text exposition of this process's request histograms (staff only)"""
+    if not (request.user.is_active and request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
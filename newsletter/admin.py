@@ -1,3 +1,39 @@
 from django.contrib import admin
+from django.db import transaction
+from .models import Campaign
+from .tasks import deliver_campaign
 
-# Register your models here.
+
+@admin.register(Campaign)
+class CampaignAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'status', 'sent_count', 'failed_count', 'skipped_count', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['subject']
+    readonly_fields = ['status', 'last_subscriber_id', 'in_flight_through', 'sender', 'lease_expires_at',
+                       'sent_count', 'failed_count', 'skipped_count', 'started_at', 'finished_at']
+    actions = ['send_campaigns']
+
+    fieldsets = (
+        (None, {
+            'fields': ('subject', 'body_text', 'body_html')
+        }),
+        ('Delivery', {
+            'fields': ('status', 'sent_count', 'failed_count', 'skipped_count', 'started_at', 'finished_at')
+        }),
+        ('Checkpoint', {
+            'fields': ('last_subscriber_id', 'in_flight_through', 'sender', 'lease_expires_at'),
+            'classes': ('collapse',)
+        }),
+    )
+
+    def send_campaigns(self, request, queryset):
+        """Queue draft campaigns for delivery by the task worker"""
+        queued = 0
+        with transaction.atomic():
+            for pk in queryset.filter(status='draft').values_list('pk', flat=True):
+                # Only the action that flips the draft queues a task
+                if Campaign.objects.filter(pk=pk, status='draft').update(status='queued'):
+                    deliver_campaign.delay(pk)
+                    queued += 1
+        self.message_user(request, f'{queued} campaign(s) queued for sending.')
+    send_campaigns.short_description = 'Send selected campaigns'
@@ -0,0 +1,58 @@
+import time
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+
+from newsletter.models import Campaign
+from newsletter.sending import CampaignBusy, send_campaign
+
+LOCMEM_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class Command(BaseCommand):
+    help = (
+        'Send a newsletter campaign in this process, or resume one that was interrupted. '
+        'Normally campaigns are sent by the task worker (admin action "Send selected campaigns").'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign', type=int, help='Campaign id')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--rate', type=float, default=None, help='Messages per second (0 for no limit)')
+        parser.add_argument('--email-backend', default=None,
+                            help=f'Override EMAIL_BACKEND, e.g. {LOCMEM_BACKEND} for a dry run')
+
+    def handle(self, *args, **options):
+        try:
+            campaign = Campaign.objects.get(pk=options['campaign'])
+        except Campaign.DoesNotExist:
+            raise CommandError(f"Campaign {options['campaign']} does not exist")
+        if campaign.status == 'sent':
+            raise CommandError(f'Campaign {campaign.pk} has already been sent')
+
+        backend = options['email_backend']
+        connection = get_connection(backend) if backend else None
+        started = time.monotonic()
+
+        def progress(current):
+            if backend == LOCMEM_BACKEND:
+                # locmem keeps every message; drop them so large dry runs stay in constant memory
+                mail.outbox.clear()
+            if options['verbosity'] < 2:
+                return
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'  {current.sent_count} sent, {current.failed_count} failed '
+                f'(through subscriber {current.last_subscriber_id}, {current.sent_count / max(elapsed, 1e-9):.0f}/s)'
+            )
+
+        try:
+            campaign = send_campaign(campaign.pk, batch_size=options['batch_size'], rate=options['rate'],
+                                     connection=connection, on_batch=progress)
+        except CampaignBusy as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(
+            f'Campaign {campaign.pk}: {campaign.sent_count} sent, {campaign.failed_count} failed, '
+            f'{campaign.skipped_count} skipped in {time.monotonic() - started:.1f}s'
+        )
@@ -1,3 +1,43 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class Campaign(models.Model):
+    """A newsletter email sent to every active subscriber"""
+    STATUS_CHOICES = [
+        ('draft', 'Draft'),
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+    ]
+
+    subject = models.CharField(max_length=200)
+    body_text = models.TextField(help_text="Django template. {{ name }}, {{ email }} and {{ unsubscribe_url }} are filled in per recipient.")
+    body_html = models.TextField(blank=True, help_text="Optional HTML version, same variables as the text body")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
+
+    # Progress. Recipients are sent in subscriber id order; every id up to
+    # last_subscriber_id has been handled. in_flight_through is set while a
+    # batch is being handed to the mail server, so a crash mid-batch is
+    # detected on resume and that batch is not sent twice.
+    last_subscriber_id = models.BigIntegerField(default=0)
+    in_flight_through = models.BigIntegerField(null=True, blank=True)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0, help_text="Recipients in a batch interrupted by a crash, not retried")
+
+    # Ownership. A sender claims the campaign with a conditional UPDATE and
+    # renews the lease at every checkpoint; only one sender can hold it, and
+    # another may resume once the lease runs out.
+    sender = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.subject} ({self.get_status_display()})"
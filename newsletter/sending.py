@@ -0,0 +1,223 @@
+"""
+Campaign delivery.
+
+Recipients are read in keyset pages of active subscribers (id order), so
+memory stays flat however large the list is and someone who unsubscribes
+mid-send is not mailed. The subject and bodies are rendered once per
+campaign; per-recipient values are spliced into the rendered text, which
+makes building a message a string join rather than a template render. One
+mail connection is reused across batches (reopened every
+NEWSLETTER_MESSAGES_PER_CONNECTION messages) and sending is paced to
+NEWSLETTER_SEND_RATE messages per second.
+
+Progress is checkpointed after every batch. Before a batch goes to the mail
+server its last subscriber id is recorded as in flight; if the process dies
+before the batch is confirmed, the next run skips those recipients (and
+counts them in ``skipped_count``) rather than risk mailing them twice.
+
+A send first claims the campaign: a conditional UPDATE moves it from draft
+or queued (or sending, when the previous sender's lease has run out) to
+sending under this sender's name. Every checkpoint renews the lease and
+only succeeds while this sender still holds it, so a second task or a
+`manage.py send_campaign` next to the worker gets CampaignBusy instead of
+mailing everyone again.
+"""
+import logging
+import os
+import re
+import socket
+import time
+import uuid
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.template import engines
+from django.utils import timezone
+from django.utils.html import escape
+
+from subscribers.models import Subscriber
+from .models import Campaign
+
+logger = logging.getLogger('newsletter')
+
+# Template variables that differ per recipient
+RECIPIENT_FIELDS = ('name', 'email', 'unsubscribe_url')
+MARKER = '\x1f'
+MARKER_PATTERN = re.compile(f"{MARKER}({'|'.join(RECIPIENT_FIELDS)}){MARKER}")
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+class CampaignBusy(Exception):
+    """Another sender holds the campaign"""
+
+
+class RenderedTemplate:
+    """A template rendered once, with per-recipient slots left open"""
+
+    def __init__(self, source, context, html=False):
+        slots = {field: f'{MARKER}{field}{MARKER}' for field in RECIPIENT_FIELDS}
+        rendered = engines['django'].from_string(source).render({**context, **slots})
+        # Alternating literal text and slot names
+        self.parts = MARKER_PATTERN.split(rendered)
+        self.html = html
+
+    def fill(self, values):
+        if self.html:
+            values = {key: escape(value) for key, value in values.items()}
+        parts = self.parts[:]
+        parts[1::2] = [values[field] for field in parts[1::2]]
+        return ''.join(parts)
+
+
+def unsubscribe_url(email):
+    return f"{setting('SITE_URL', '')}/unsubscribe?email={quote(email)}"
+
+
+def build_message(rendered, subscriber, connection):
+    """One EmailMultiAlternatives for a (pk, email, name) row"""
+    _, email, name = subscriber
+    subject, text, html = rendered
+    values = {
+        'name': name or setting('NEWSLETTER_DEFAULT_NAME', 'there'),
+        'email': email,
+        'unsubscribe_url': unsubscribe_url(email),
+    }
+    message = EmailMultiAlternatives(
+        subject.fill(values).strip(),
+        text.fill(values),
+        settings.DEFAULT_FROM_EMAIL,
+        [email],
+        connection=connection,
+        headers={'List-Unsubscribe': f"<{values['unsubscribe_url']}>"},
+    )
+    if html:
+        message.attach_alternative(html.fill(values), 'text/html')
+    return message
+
+
+def render_campaign(campaign):
+    context = {'campaign': campaign, 'site_url': setting('SITE_URL', '')}
+    return (
+        RenderedTemplate(campaign.subject, context),
+        RenderedTemplate(campaign.body_text, context),
+        RenderedTemplate(campaign.body_html, context, html=True) if campaign.body_html else None,
+    )
+
+
+def recipients_after(last_id, batch_size):
+    return list(
+        Subscriber.objects.filter(is_active=True, pk__gt=last_id)
+        .order_by('pk')
+        .values_list('pk', 'email', 'name')[:batch_size]
+    )
+
+
+def lease_until():
+    return timezone.now() + timedelta(seconds=setting('NEWSLETTER_LEASE_SECONDS', 300))
+
+
+def claim(campaign_id, sender):
+    """Take ownership of a campaign for ``sender``; True if this call got it"""
+    now = timezone.now()
+    claimable = (
+        Q(status__in=('draft', 'queued'))
+        | Q(status='sending', lease_expires_at__isnull=True)
+        | Q(status='sending', lease_expires_at__lt=now)
+    )
+    return bool(Campaign.objects.filter(claimable, pk=campaign_id).update(
+        status='sending', sender=sender, lease_expires_at=lease_until(),
+        started_at=Coalesce('started_at', now),
+    ))
+
+
+def send_campaign(campaign_id, batch_size=None, rate=None, connection=None, on_batch=None, sleep=time.sleep):
+    """
+    Send (or resume sending) a campaign. Returns the campaign with updated
+    counts. ``on_batch(campaign)`` is called after each checkpoint. Raises
+    CampaignBusy if another sender holds the campaign or takes it over.
+    """
+    batch_size = batch_size or setting('NEWSLETTER_BATCH_SIZE', 100)
+    rate = setting('NEWSLETTER_SEND_RATE', 0) if rate is None else rate
+    per_connection = setting('NEWSLETTER_MESSAGES_PER_CONNECTION', 1000)
+
+    sender = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'[-100:]
+    if not claim(campaign_id, sender):
+        campaign = Campaign.objects.get(pk=campaign_id)
+        if campaign.status == 'sent':
+            return campaign
+        raise CampaignBusy(f'Campaign {campaign.pk} is being sent by {campaign.sender or "another sender"}')
+    owned = Campaign.objects.filter(pk=campaign_id, sender=sender)
+
+    try:
+        campaign = Campaign.objects.get(pk=campaign_id)
+        if campaign.in_flight_through is not None:
+            skipped = Subscriber.objects.filter(
+                is_active=True, pk__gt=campaign.last_subscriber_id, pk__lte=campaign.in_flight_through
+            ).count()
+            logger.warning('Campaign %s: batch up to subscriber %s was interrupted; skipping %s recipient(s)',
+                           campaign.pk, campaign.in_flight_through, skipped)
+            owned.update(
+                last_subscriber_id=campaign.in_flight_through, in_flight_through=None,
+                skipped_count=F('skipped_count') + skipped,
+            )
+            campaign.refresh_from_db()
+
+        rendered = render_campaign(campaign)
+        connection = connection or get_connection()
+        last_id = campaign.last_subscriber_id
+        on_connection = 0
+        sent_total = 0
+        started = time.monotonic()
+        try:
+            while True:
+                batch = recipients_after(last_id, batch_size)
+                if not batch:
+                    break
+                if on_connection >= per_connection:
+                    connection.close()
+                    on_connection = 0
+                # Fails before anything is marked in flight if the server is down
+                connection.open()
+
+                through = batch[-1][0]
+                if not owned.update(in_flight_through=through, lease_expires_at=lease_until()):
+                    raise CampaignBusy(f'Campaign {campaign.pk} was taken over by another sender')
+                messages = [build_message(rendered, subscriber, connection) for subscriber in batch]
+                sent = connection.send_messages(messages) or 0
+                owned.update(
+                    last_subscriber_id=through,
+                    in_flight_through=None,
+                    sent_count=F('sent_count') + sent,
+                    failed_count=F('failed_count') + len(batch) - sent,
+                )
+                last_id = through
+                on_connection += len(batch)
+                sent_total += len(batch)
+                if on_batch:
+                    campaign.refresh_from_db()
+                    on_batch(campaign)
+
+                if rate:
+                    # Pace to the average rate rather than sleeping a fixed time per batch
+                    ahead = sent_total / rate - (time.monotonic() - started)
+                    if ahead > 0:
+                        sleep(ahead)
+        finally:
+            connection.close()
+    except CampaignBusy:
+        raise
+    except BaseException:
+        # Let a retry resume straight away rather than wait out the lease
+        owned.update(sender='', lease_expires_at=None)
+        raise
+
+    owned.update(status='sent', finished_at=timezone.now(), sender='', lease_expires_at=None)
+    campaign.refresh_from_db()
+    return campaign
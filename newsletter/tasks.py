@@ -0,0 +1,17 @@
+import logging
+
+from tasks.queue import task
+
+from .sending import CampaignBusy, send_campaign
+
+logger = logging.getLogger('newsletter')
+
+
+@task(max_attempts=10)
+def deliver_campaign(campaign_id):
+    """Send a campaign; a retry resumes from the last checkpoint"""
+    try:
+        send_campaign(campaign_id)
+    except CampaignBusy as exc:
+        # A duplicate task or a manual send already owns it
+        logger.info('%s', exc)
@@ -1,3 +1,184 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from subscribers.models import Subscriber
+from .models import Campaign
+from .sending import CampaignBusy, send_campaign
+
+
+class FlakyBackend(EmailBackend):
+    """locmem backend that dies on a given send_messages() call"""
+
+    def __init__(self, fail_on_call, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.fail_on_call = fail_on_call
+
+    def send_messages(self, messages):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise ConnectionResetError('connection lost')
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                   NEWSLETTER_SEND_RATE=0, SITE_URL='https://example.com')
+class CampaignSendTest(TestCase):
+    """Test campaign delivery"""
+
+    def setUp(self):
+        Subscriber.objects.bulk_create(
+            [Subscriber(email=f'user{i}@example.com', name=f'User {i}' if i % 2 else '') for i in range(25)]
+        )
+        Subscriber.objects.filter(email='user3@example.com').update(is_active=False)
+        self.campaign = Campaign.objects.create(
+            subject='{{ campaign.pk }}: news for {{ name }}',
+            body_text='Hi {{ name }},\nNew work at {{ site_url }}\nUnsubscribe: {{ unsubscribe_url }}',
+            body_html='<p>Hi {{ name }}</p>',
+        )
+
+    def recipients(self):
+        return [message.to[0] for message in mail.outbox]
+
+    def test_sends_to_each_active_subscriber_once(self):
+        """Test every active subscriber gets exactly one personalised message"""
+        campaign = send_campaign(self.campaign.pk, batch_size=10)
+        self.assertEqual(campaign.status, 'sent')
+        self.assertEqual(campaign.sent_count, 24)
+        self.assertEqual(len(self.recipients()), 24)
+        self.assertEqual(len(set(self.recipients())), 24)
+        self.assertNotIn('user3@example.com', self.recipients())
+
+        message = next(m for m in mail.outbox if m.to == ['user1@example.com'])
+        self.assertEqual(message.subject, f'{self.campaign.pk}: news for User 1')
+        self.assertIn('Hi User 1,\nNew work at https://example.com', message.body)
+        self.assertIn('https://example.com/unsubscribe?email=user1%40example.com', message.body)
+        self.assertEqual(message.alternatives[0][0], '<p>Hi User 1</p>')
+        self.assertIn('List-Unsubscribe', message.extra_headers)
+        unnamed = next(m for m in mail.outbox if m.to == ['user0@example.com'])
+        self.assertIn('Hi there,', unnamed.body)
+
+    def test_html_values_escaped(self):
+        """Test per-recipient values are HTML-escaped in the HTML body"""
+        Subscriber.objects.filter(email='user1@example.com').update(name='<b>Al</b>')
+        send_campaign(self.campaign.pk)
+        message = next(m for m in mail.outbox if m.to == ['user1@example.com'])
+        self.assertEqual(message.alternatives[0][0], '<p>Hi &lt;b&gt;Al&lt;/b&gt;</p>')
+
+    def test_templates_rendered_once(self):
+        """Test the templates are rendered once per campaign, not per recipient"""
+        from django.template.backends.django import Template
+        with mock.patch.object(Template, 'render', autospec=True, side_effect=Template.render) as render:
+            send_campaign(self.campaign.pk, batch_size=5)
+        self.assertEqual(render.call_count, 3)  # subject, text, html
+        self.assertEqual(len(mail.outbox), 24)
+
+    def test_connection_reused_across_batches(self):
+        """Test one connection is opened for the whole campaign"""
+        connection = EmailBackend()
+        with mock.patch.object(connection, 'close', wraps=connection.close) as close:
+            send_campaign(self.campaign.pk, batch_size=5, connection=connection)
+        self.assertEqual(close.call_count, 1)
+
+    def test_constant_queries_per_batch(self):
+        """Test the number of queries grows with batches, not recipients"""
+        with self.assertNumQueries(5 + 3 * 3):
+            send_campaign(self.campaign.pk, batch_size=10)
+
+    def test_resume_after_crash_skips_interrupted_batch(self):
+        """Test a crashed send resumes from its checkpoint without mailing anyone twice"""
+        with self.assertRaises(ConnectionResetError):
+            send_campaign(self.campaign.pk, batch_size=10, connection=FlakyBackend(fail_on_call=2))
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'sending')
+        self.assertEqual(self.campaign.sent_count, 10)
+        self.assertIsNotNone(self.campaign.in_flight_through)
+
+        with self.assertLogs('newsletter', 'WARNING'):
+            campaign = send_campaign(self.campaign.pk, batch_size=10)
+        self.assertEqual(campaign.status, 'sent')
+        self.assertEqual(campaign.sent_count, 14)
+        self.assertEqual(campaign.skipped_count, 10)
+        self.assertEqual(len(self.recipients()), len(set(self.recipients())))
+        self.assertEqual(len(self.recipients()), 14)
+
+    def test_rate_limit(self):
+        """Test sending is paced to the configured rate"""
+        pauses = []
+        send_campaign(self.campaign.pk, batch_size=8, rate=100, sleep=pauses.append)
+        # The fake sleep doesn't advance the clock, so each pause is the
+        # whole lead over 100/s: the last is ~0.24s for 24 messages
+        self.assertEqual(len(pauses), 3)
+        self.assertGreater(pauses[-1], 0.15)
+        self.assertLessEqual(pauses[-1], 0.24)
+
+    def test_sent_campaign_not_resent(self):
+        """Test running a finished campaign again sends nothing"""
+        send_campaign(self.campaign.pk)
+        mail.outbox.clear()
+        send_campaign(self.campaign.pk)
+        self.assertEqual(mail.outbox, [])
+
+    def test_command(self):
+        """Test the send_campaign command reports totals"""
+        out = StringIO()
+        call_command('send_campaign', self.campaign.pk, batch_size=10, rate=0, stdout=out)
+        self.assertIn('24 sent, 0 failed, 0 skipped', out.getvalue())
+
+    def test_second_sender_is_refused(self):
+        """Test a second sender can't send a campaign another sender holds"""
+        refused = []
+
+        def second_sender(campaign):
+            if refused:
+                return
+            with self.assertRaises(CampaignBusy):
+                send_campaign(campaign.pk, batch_size=10)
+            with self.assertRaises(CommandError):
+                call_command('send_campaign', campaign.pk, stdout=StringIO())
+            refused.append(campaign.last_subscriber_id)
+
+        campaign = send_campaign(self.campaign.pk, batch_size=10, on_batch=second_sender)
+        self.assertEqual(len(refused), 1)
+        self.assertEqual((campaign.status, campaign.sent_count, campaign.skipped_count), ('sent', 24, 0))
+        self.assertEqual((campaign.sender, campaign.lease_expires_at), ('', None))
+        self.assertEqual(len(self.recipients()), 24)
+        self.assertEqual(len(set(self.recipients())), 24)
+
+    def test_expired_lease_is_taken_over(self):
+        """Test a sender whose lease ran out stops once another sender resumes the campaign"""
+        def stall(campaign):
+            if campaign.sent_count == 10:
+                Campaign.objects.filter(pk=campaign.pk).update(lease_expires_at=timezone.now())
+                send_campaign(campaign.pk, batch_size=10)
+
+        with self.assertRaises(CampaignBusy):
+            send_campaign(self.campaign.pk, batch_size=10, on_batch=stall)
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.status, self.campaign.sent_count), ('sent', 24))
+        self.assertEqual(len(self.recipients()), 24)
+        self.assertEqual(len(set(self.recipients())), 24)
+
+    def test_admin_action_queues_once(self):
+        """Test sending a campaign from the admin twice queues a single task"""
+        from django.contrib.auth import get_user_model
+        from django.urls import reverse
+        from tasks.models import Task
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        url = reverse('admin:newsletter_campaign_changelist')
+        data = {'action': 'send_campaigns', '_selected_action': [self.campaign.pk]}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, data)
+            self.client.post(url, data)
+        self.assertEqual(Task.objects.filter(name='newsletter.tasks.deliver_campaign').count(), 1)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'queued')
+        self.assertEqual(send_campaign(self.campaign.pk).sent_count, 24)
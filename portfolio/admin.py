@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Category, Project, ProjectImage, Credit, Equipment, ProjectEquipment, ContactSubmission, Service, Testimonial, Award
+from core.admin import PerformanceModelAdmin
+from .facets import projects as project_facets
+from .models import Category, Project, ProjectImage, Credit, Equipment, ProjectEquipment, ContactSubmission, Service, Testimonial, Award, ProjectViewBucket
 
 
 class ProjectImageInline(admin.TabularInline):
@@ -59,16 +61,20 @@ class ProjectAdmin(admin.ModelAdmin):
     
     def mark_as_featured(self, request, queryset):
         updated = queryset.update(featured=True)
+        project_facets.invalidate()
         self.message_user(request, f'{updated} project(s) marked as featured.')
     mark_as_featured.short_description = 'Mark selected projects as featured'
     
     def mark_as_not_featured(self, request, queryset):
         updated = queryset.update(featured=False)
+        project_facets.invalidate()
         self.message_user(request, f'{updated} project(s) unmarked as featured.')
     mark_as_not_featured.short_description = 'Remove featured status'
     
     def reset_view_count(self, request, queryset):
         updated = queryset.update(view_count=0)
+        # Trending and the windowed boards drop them at the next refresh
+        ProjectViewBucket.objects.filter(project__in=queryset).delete()
         self.message_user(request, f'View count reset for {updated} project(s).')
     reset_view_count.short_description = 'Reset view count to 0'
 
@@ -102,7 +108,7 @@ class ServiceAdmin(admin.ModelAdmin):
 
 
 @admin.register(Testimonial)
-class TestimonialAdmin(admin.ModelAdmin):
+class TestimonialAdmin(PerformanceModelAdmin):
     list_display = ['client_name', 'client_company', 'rating', 'project', 'featured', 'order']
     list_filter = ['rating', 'featured', 'created_at']
     search_fields = ['client_name', 'client_company', 'testimonial']
@@ -110,7 +116,7 @@ class TestimonialAdmin(admin.ModelAdmin):
 
 
 @admin.register(Award)
-class AwardAdmin(admin.ModelAdmin):
+class AwardAdmin(PerformanceModelAdmin):
     list_display = ['title', 'organization', 'year', 'project', 'featured', 'order']
     list_filter = ['year', 'featured', 'organization']
     search_fields = ['title', 'organization', 'description']
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class PortfolioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'portfolio'
+
+    def ready(self):
+        from core.images import register_variant_field
+        from . import facets
+        from .models import Award, Project, ProjectImage, Testimonial
+
+        register_variant_field(Project, 'thumbnail')
+        register_variant_field(ProjectImage, 'image')
+        register_variant_field(Testimonial, 'client_photo')
+        register_variant_field(Award, 'image')
+        facets.connect()
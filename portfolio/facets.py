@@ -0,0 +1,12 @@
+from core.facets import FacetCache
+
+from .models import Category, Project
+
+# ProjectViewSet query parameters that filter the list
+projects = FacetCache('portfolio-projects', ['category', 'featured', 'search', 'tags', 'year'])
+
+
+def connect():
+    # Views only bump view_count, which no filter reads
+    projects.watch(Project, ignore=['view_count'])
+    projects.watch(Category)
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolio.trending import refresh
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the trending and most-viewed project boards from the hourly view buckets.'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} ranking rows in {time.monotonic() - started:.2f}s'
+        ))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0006_award_image_variants_project_thumbnail_variants_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(choices=[('trending', 'Trending'), ('views_1d', 'Most viewed, last day'), ('views_7d', 'Most viewed, last 7 days'), ('views_30d', 'Most viewed, last 30 days')], max_length=20)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField(help_text='Decayed views (trending) or views in the window')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='portfolio.project')),
+            ],
+            options={
+                'ordering': ['board', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('board', 'rank'), name='portfolio_ranking_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectViewBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(help_text='Start of the hour')),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_buckets', to='portfolio.project')),
+            ],
+            options={
+                'ordering': ['-hour'],
+                'indexes': [models.Index(fields=['hour'], name='portfolio_p_hour_b17b7c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('project', 'hour'), name='portfolio_view_bucket_unique')],
+            },
+        ),
+    ]
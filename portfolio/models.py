@@ -23,6 +23,7 @@ class Project(models.Model):
     duration = models.CharField(max_length=20, blank=True, help_text="e.g., 4:32")
     description = models.TextField()
     thumbnail = models.ImageField(upload_to='portfolio/thumbnails/', blank=True)
+    thumbnail_variants = models.JSONField(default=dict, blank=True, editable=False)
     thumbnail_url = models.URLField(blank=True, help_text="External image URL (Unsplash, etc.)")
     video_url = models.URLField(blank=True, help_text="YouTube or Vimeo URL")
     video_file = models.FileField(upload_to='portfolio/videos/', blank=True)
@@ -76,6 +77,7 @@ class Project(models.Model):
 class ProjectImage(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='portfolio/gallery/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     caption = models.CharField(max_length=200, blank=True)
     is_behind_the_scenes = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
@@ -162,6 +164,7 @@ class Testimonial(models.Model):
     client_title = models.CharField(max_length=200, blank=True, help_text="e.g., CEO at Company")
     client_company = models.CharField(max_length=200, blank=True)
     client_photo = models.ImageField(upload_to='testimonials/', blank=True)
+    client_photo_variants = models.JSONField(default=dict, blank=True, editable=False)
     client_photo_url = models.URLField(blank=True, help_text="External image URL")
     testimonial = models.TextField()
     rating = models.PositiveIntegerField(choices=[(i, i) for i in range(1, 6)], default=5)
@@ -186,6 +189,7 @@ class Award(models.Model):
     project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, blank=True, related_name='awards')
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='awards/', blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     featured = models.BooleanField(default=True)
     order = models.PositiveIntegerField(default=0)
     
@@ -194,3 +198,50 @@ class Award(models.Model):
     
     def __str__(self):
         return f"{self.title} ({self.year})"
+
+
+class ProjectViewBucket(models.Model):
+    """Views of a project within one hour. Kept for TRENDING_RETENTION_DAYS, see portfolio.trending."""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='view_buckets')
+    hour = models.DateTimeField(help_text="Start of the hour")
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-hour']
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'hour'], name='portfolio_view_bucket_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['hour']),
+        ]
+
+    def __str__(self):
+        return f"{self.project} @ {self.hour:%Y-%m-%d %H:00}: {self.views}"
+
+
+class ProjectRanking(models.Model):
+    """
+    Precomputed top projects per board, rebuilt in bulk by
+    portfolio.trending.refresh. Only the top TRENDING_SIZE of each board
+    are stored.
+    """
+    BOARD_CHOICES = [
+        ('trending', 'Trending'),
+        ('views_1d', 'Most viewed, last day'),
+        ('views_7d', 'Most viewed, last 7 days'),
+        ('views_30d', 'Most viewed, last 30 days'),
+    ]
+
+    board = models.CharField(max_length=20, choices=BOARD_CHOICES)
+    rank = models.PositiveSmallIntegerField()
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='rankings')
+    score = models.FloatField(help_text="Decayed views (trending) or views in the window")
+
+    class Meta:
+        ordering = ['board', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'rank'], name='portfolio_ranking_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_board_display()} #{self.rank}: {self.project}"
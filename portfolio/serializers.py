@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from core.images import placeholder
+from core.serializers import SrcsetField, build_srcset
 from .models import Category, Project, ProjectImage, Credit, Equipment, ContactSubmission, Service, Testimonial, Award
 
 
@@ -9,9 +11,11 @@ class CategorySerializer(serializers.ModelSerializer):
 
 
 class ProjectImageSerializer(serializers.ModelSerializer):
+    image_srcset = SrcsetField(source='image_variants')
+
     class Meta:
         model = ProjectImage
-        fields = ['id', 'image', 'caption', 'is_behind_the_scenes']
+        fields = ['id', 'image', 'image_srcset', 'caption', 'is_behind_the_scenes']
 
 
 class CreditSerializer(serializers.ModelSerializer):
@@ -26,14 +30,10 @@ class EquipmentSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'category']
 
 
-class ProjectListSerializer(serializers.ModelSerializer):
-    category = CategorySerializer(read_only=True)
+class ProjectThumbnailSerializer(serializers.ModelSerializer):
+    """The thumbnail fields shared by the project list and detail serializers"""
     thumbnail = serializers.SerializerMethodField()
-    tags = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = Project
-        fields = ['id', 'title', 'slug', 'category', 'client', 'year', 'thumbnail', 'featured', 'tags', 'view_count']
+    thumbnail_srcset = serializers.SerializerMethodField()
     
     def get_thumbnail(self, obj):
         if obj.thumbnail_url:
@@ -45,17 +45,38 @@ class ProjectListSerializer(serializers.ModelSerializer):
             return obj.thumbnail.url
         return None
     
+    def get_thumbnail_srcset(self, obj):
+        # An external thumbnail_url wins over the upload, and has no variants
+        if obj.thumbnail_url:
+            return {}
+        return build_srcset(obj.thumbnail_variants, self.context.get('request'))
+
+
+class ProjectListSerializer(ProjectThumbnailSerializer):
+    category = CategorySerializer(read_only=True)
+    thumbnail_placeholder = serializers.SerializerMethodField()
+    tags = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Project
+        fields = ['id', 'title', 'slug', 'category', 'client', 'year', 'thumbnail', 'thumbnail_srcset',
+                  'thumbnail_placeholder', 'featured', 'tags', 'view_count']
+    
+    def get_thumbnail_placeholder(self, obj):
+        if obj.thumbnail_url:
+            return None
+        return placeholder(obj.thumbnail_variants)
+    
     def get_tags(self, obj):
         return obj.get_tags_list()
 
 
-class ProjectDetailSerializer(serializers.ModelSerializer):
+class ProjectDetailSerializer(ProjectThumbnailSerializer):
     category = CategorySerializer(read_only=True)
     images = ProjectImageSerializer(many=True, read_only=True)
     credits = CreditSerializer(many=True, read_only=True)
     equipment = serializers.SerializerMethodField()
     behind_the_scenes = serializers.SerializerMethodField()
-    thumbnail = serializers.SerializerMethodField()
     tags = serializers.SerializerMethodField()
     related_projects = serializers.SerializerMethodField()
     
@@ -63,21 +84,11 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         model = Project
         fields = [
             'id', 'title', 'slug', 'category', 'client', 'year', 'duration',
-            'description', 'thumbnail', 'video_url', 'video_file', 'featured',
+            'description', 'thumbnail', 'thumbnail_srcset', 'video_url', 'video_file', 'featured',
             'images', 'credits', 'equipment', 'behind_the_scenes', 'tags',
             'view_count', 'meta_title', 'meta_description', 'related_projects'
         ]
     
-    def get_thumbnail(self, obj):
-        if obj.thumbnail_url:
-            return obj.thumbnail_url
-        elif obj.thumbnail:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.thumbnail.url)
-            return obj.thumbnail.url
-        return None
-    
     def get_equipment(self, obj):
         return [pe.equipment.name for pe in obj.equipment_used.all()]
     
@@ -118,12 +129,15 @@ class ServiceSerializer(serializers.ModelSerializer):
 
 class TestimonialSerializer(serializers.ModelSerializer):
     client_photo = serializers.SerializerMethodField()
+    client_photo_srcset = serializers.SerializerMethodField()
+    client_photo_placeholder = serializers.SerializerMethodField()
     project_title = serializers.CharField(source='project.title', read_only=True)
     
     class Meta:
         model = Testimonial
-        fields = ['id', 'client_name', 'client_title', 'client_company', 'client_photo', 
-                  'testimonial', 'rating', 'project_title', 'featured']
+        fields = ['id', 'client_name', 'client_title', 'client_company', 'client_photo',
+                  'client_photo_srcset', 'client_photo_placeholder', 'testimonial', 'rating',
+                  'project_title', 'featured']
     
     def get_client_photo(self, obj):
         if obj.client_photo_url:
@@ -134,16 +148,27 @@ class TestimonialSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.client_photo.url)
             return obj.client_photo.url
         return None
+    
+    def get_client_photo_srcset(self, obj):
+        if obj.client_photo_url:
+            return {}
+        return build_srcset(obj.client_photo_variants, self.context.get('request'))
+    
+    def get_client_photo_placeholder(self, obj):
+        if obj.client_photo_url:
+            return None
+        return placeholder(obj.client_photo_variants)
 
 
 class AwardSerializer(serializers.ModelSerializer):
     project_title = serializers.CharField(source='project.title', read_only=True)
     image = serializers.SerializerMethodField()
+    image_srcset = SrcsetField(source='image_variants')
     
     class Meta:
         model = Award
         fields = ['id', 'title', 'organization', 'year', 'category', 'project_title', 
-                  'description', 'image', 'featured']
+                  'description', 'image', 'image_srcset', 'featured']
     
     def get_image(self, obj):
         if obj.image:
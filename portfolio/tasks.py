@@ -0,0 +1,9 @@
+from tasks.queue import task
+
+from . import trending
+
+
+@task(priority=20)
+def refresh_trending():
+    """Rebuild the trending and most-viewed boards from the hourly view buckets"""
+    trending.refresh()
@@ -2,7 +2,7 @@ from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Project, Category, ContactSubmission
+from .models import Project, Category, ContactSubmission, ProjectRanking, ProjectViewBucket
 
 
 class ProjectModelTest(TestCase):
@@ -77,6 +77,165 @@ class ProjectAPITest(APITestCase):
         self.assertTrue(response.data[0]['featured'])
 
 
+class TrendingTest(APITestCase):
+    """Test the hourly view buckets, trending boards and windowed popular"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.category = Category.objects.create(name='Test Category', slug='test-category')
+        self.projects = {
+            slug: Project.objects.create(title=slug.title(), slug=slug, description='Test',
+                                         category=self.category, year=2024)
+            for slug in ('classic', 'fresh', 'quiet')
+        }
+
+    def view(self, slug, count, hours_ago):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .trending import record_view
+        for _ in range(count):
+            record_view(self.projects[slug].pk, now=timezone.now() - timedelta(hours=hours_ago))
+
+    def get(self, name, **params):
+        from django.core.cache import cache
+        cache.clear()  # cache_page
+        return self.client.get(reverse(name), params)
+
+    def test_views_share_an_hourly_bucket(self):
+        """Test that views within one hour increment a single bucket"""
+        self.client.get(reverse('project-detail', kwargs={'slug': 'fresh'}))
+        self.client.get(reverse('project-detail', kwargs={'slug': 'fresh'}))
+        bucket = ProjectViewBucket.objects.get()
+        self.assertEqual(bucket.project, self.projects['fresh'])
+        self.assertEqual(bucket.views, 2)
+        self.assertEqual((bucket.hour.minute, bucket.hour.second), (0, 0))
+
+    def test_recent_views_outrank_older_ones(self):
+        """Test that trending decays old views while the 30 day board counts them in full"""
+        from .trending import refresh
+        self.view('classic', 10, hours_ago=24 * 5)
+        self.view('fresh', 3, hours_ago=1)
+        refresh()
+        trending = list(ProjectRanking.objects.filter(board='trending').values_list('project__slug', flat=True))
+        self.assertEqual(trending, ['fresh', 'classic'])
+        month = list(ProjectRanking.objects.filter(board='views_30d').values_list('project__slug', 'score'))
+        self.assertEqual(month, [('classic', 10), ('fresh', 3)])
+        self.assertFalse(ProjectRanking.objects.filter(board='views_1d', project__slug='classic').exists())
+
+    def test_trending_endpoint_reads_the_boards(self):
+        """Test GET /api/portfolio/projects/trending/ after a refresh, and its fallback before"""
+        from .trending import ranked, refresh
+        Project.objects.filter(slug='quiet').update(view_count=100)
+        response = self.get('project-trending')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]['slug'], 'quiet')
+
+        self.view('fresh', 2, hours_ago=0)
+        refresh()
+        with self.assertNumQueries(1):  # refresh already queued
+            self.assertEqual([p.slug for p in ranked('trending')], ['fresh'])
+        self.assertEqual([p['slug'] for p in self.get('project-trending').json()], ['fresh'])
+
+    def test_refresh_is_queued_once_per_interval(self):
+        """Test that reading the boards queues at most one refresh task"""
+        from tasks.models import Task
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('project-trending'))
+            self.client.get(reverse('project-popular'), {'days': 7})
+        self.assertEqual(Task.objects.filter(name='portfolio.tasks.refresh_trending').count(), 1)
+
+    def test_popular_window(self):
+        """Test GET /api/portfolio/projects/popular/?days="""
+        from .trending import refresh
+        self.view('classic', 10, hours_ago=24 * 5)
+        self.view('fresh', 3, hours_ago=1)
+        refresh()
+        self.assertEqual([p['slug'] for p in self.get('project-popular', days=1).json()], ['fresh'])
+        self.assertEqual([p['slug'] for p in self.get('project-popular', days=7).json()], ['classic', 'fresh'])
+        self.assertEqual(self.get('project-popular', days=2).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get('project-popular', days='week').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get('project-popular').status_code, status.HTTP_200_OK)
+
+    def test_refresh_prunes_expired_buckets(self):
+        """Test that buckets older than TRENDING_RETENTION_DAYS are deleted"""
+        from .trending import refresh
+        self.view('classic', 1, hours_ago=24 * 31)
+        self.view('fresh', 1, hours_ago=2)
+        refresh()
+        self.assertEqual(list(ProjectViewBucket.objects.values_list('project__slug', flat=True)), ['fresh'])
+        self.assertFalse(ProjectRanking.objects.filter(project__slug='classic').exists())
+
+
+class ProjectFacetTest(APITestCase):
+    """Test GET /api/portfolio/projects/facets/"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.music = Category.objects.create(name='Music Videos', slug='music')
+        self.ads = Category.objects.create(name='Commercials', slug='ads')
+        for slug, category, year, tags in [
+            ('one', self.music, 2024, 'drone, music video'),
+            ('two', self.music, 2023, 'commercial'),
+            ('three', self.ads, 2024, 'drone'),
+        ]:
+            Project.objects.create(title=slug, slug=slug, description='Test', category=category, year=year, tags=tags)
+
+    def facets(self, **params):
+        response = self.client.get(reverse('project-facets'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        return {name: {row['value']: row['count'] for row in rows} for name, rows in data.items()}
+
+    def test_counts(self):
+        """Test counts per category, year and tag"""
+        self.assertEqual(self.facets(), {
+            'categories': {'music': 2, 'ads': 1},
+            'years': {2024: 2, 2023: 1},
+            'tags': {'drone': 2, 'music video': 1, 'commercial': 1},
+        })
+        response = self.client.get(reverse('project-facets'))
+        self.assertEqual(response.json()['categories'][0], {'value': 'music', 'label': 'Music Videos', 'count': 2})
+
+    def test_each_facet_honors_the_other_filters(self):
+        """Test that a filter narrows the other facets but not its own"""
+        self.assertEqual(self.facets(category='music'), {
+            'categories': {'music': 2, 'ads': 1},
+            'years': {2024: 1, 2023: 1},
+            'tags': {'drone': 1, 'music video': 1, 'commercial': 1},
+        })
+        self.assertEqual(self.facets(year=2024, tags='drone')['categories'], {'music': 1, 'ads': 1})
+        self.assertEqual(len(self.client.get(reverse('project-list'), {'year': 2024}).json()['results']), 2)
+
+    def test_cached_until_projects_change(self):
+        """Test that counts are cached per filter combination and invalidated by saves, not views"""
+        self.facets(category='music')
+        with self.assertNumQueries(0):
+            self.facets(category='music')
+        self.client.get(reverse('project-detail', kwargs={'slug': 'one'}))
+        with self.assertNumQueries(0):
+            self.facets(category='music')
+
+        project = Project.objects.get(slug='three')
+        project.category = self.music
+        project.save()
+        self.assertEqual(self.facets(category='music')['years'], {2024: 2, 2023: 1})
+        Project.objects.get(slug='two').delete()
+        self.assertEqual(self.facets()['tags'], {'drone': 2, 'music video': 1})
+
+    def test_bulk_featured_action_invalidates(self):
+        """Test the admin featured actions refresh counts filtered on featured"""
+        from django.contrib.admin.sites import AdminSite
+        from django.test import RequestFactory
+        from .admin import ProjectAdmin
+        self.assertEqual(self.facets(featured='true')['years'], {})
+        model_admin = ProjectAdmin(Project, AdminSite())
+        model_admin.message_user = lambda *args, **kwargs: None
+        model_admin.mark_as_featured(RequestFactory().post('/'), Project.objects.filter(year=2024))
+        self.assertEqual(self.facets(featured='true')['years'], {2024: 2})
+
+
 class ContactSubmissionTest(APITestCase):
     """Test Contact form submission"""
     
@@ -0,0 +1,110 @@
+"""
+Trending and windowed-popular projects.
+
+Each project view adds one to that project's bucket for the current hour
+(ProjectViewBucket), so the store holds at most one row per project per
+hour with views, for TRENDING_RETENTION_DAYS. Requests never aggregate it:
+refresh() reads the buckets once, in bulk, and writes the top
+TRENDING_SIZE projects of each board to ProjectRanking:
+
+* 'trending': views weighted by exp(-age * ln 2 / half-life), so a view
+  counts half as much after TRENDING_HALF_LIFE_HOURS and old favourites
+  give way to whatever is being watched now.
+* 'views_1d', 'views_7d', 'views_30d': plain view totals for the window.
+
+refresh() runs as a background task, queued at most once per
+TRENDING_REFRESH_INTERVAL by the endpoints that read the boards, or from
+cron with `manage.py refresh_trending`.
+"""
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Project, ProjectRanking, ProjectViewBucket
+
+WINDOWS = {1: 'views_1d', 7: 'views_7d', 30: 'views_30d'}
+REFRESH_KEY = 'portfolio-trending-refresh'
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+def current_hour(now=None):
+    return (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+
+def record_view(project_id, now=None):
+    """Count one view in the project's bucket for this hour"""
+    hour = current_hour(now)
+    if ProjectViewBucket.objects.filter(project_id=project_id, hour=hour).update(views=F('views') + 1):
+        return
+    _, created = ProjectViewBucket.objects.get_or_create(project_id=project_id, hour=hour, defaults={'views': 1})
+    if not created:
+        # Another request created the bucket first
+        ProjectViewBucket.objects.filter(project_id=project_id, hour=hour).update(views=F('views') + 1)
+
+
+def score_buckets(buckets, now):
+    """
+    Board scores from (project_id, hour, views) rows:
+    {board: Counter(project_id -> score)}. Memory grows with projects, not rows.
+    """
+    decay = math.log(2) / setting('TRENDING_HALF_LIFE_HOURS', 24)
+    boards = defaultdict(Counter)
+    starts = {board: current_hour(now) - timedelta(days=days) + timedelta(hours=1) for days, board in WINDOWS.items()}
+    for project_id, hour, views in buckets:
+        age = max((now - hour).total_seconds() / 3600, 0)
+        boards['trending'][project_id] += views * math.exp(-decay * age)
+        for board, start in starts.items():
+            if hour >= start:
+                boards[board][project_id] += views
+    return boards
+
+
+def refresh(now=None):
+    """Rebuild every board from the view buckets and drop buckets past retention"""
+    now = now or timezone.now()
+    retention = now - timedelta(days=setting('TRENDING_RETENTION_DAYS', 30))
+    size = setting('TRENDING_SIZE', 24)
+    buckets = (
+        ProjectViewBucket.objects.filter(hour__gte=retention)
+        .values_list('project_id', 'hour', 'views')
+        .iterator(chunk_size=5000)
+    )
+    boards = score_buckets(buckets, now)
+    rankings = [
+        ProjectRanking(board=board, rank=rank, project_id=project_id, score=score)
+        for board, scores in boards.items()
+        for rank, (project_id, score) in enumerate(scores.most_common(size), start=1)
+    ]
+    with transaction.atomic():
+        ProjectRanking.objects.all().delete()
+        ProjectRanking.objects.bulk_create(rankings)
+    ProjectViewBucket.objects.filter(hour__lt=retention).delete()
+    return len(rankings)
+
+
+def schedule_refresh():
+    """Queue a refresh unless one was queued within TRENDING_REFRESH_INTERVAL"""
+    from .tasks import refresh_trending
+
+    if cache.add(REFRESH_KEY, True, setting('TRENDING_REFRESH_INTERVAL', 600)):
+        refresh_trending.delay()
+
+
+def ranked(board, limit=None):
+    """Projects on ``board``, best first"""
+    schedule_refresh()
+    limit = limit or setting('TRENDING_SIZE', 24)
+    return (
+        Project.objects.filter(rankings__board=board)
+        .select_related('category')
+        .order_by('rankings__rank')[:limit]
+    )
@@ -5,7 +5,10 @@ from django.db.models import Q
 from django.views.decorators.cache import cache_page
 from django.utils.decorators import method_decorator
 from django.conf import settings
+from core.facets import tag_counts, value_counts
+from .facets import projects as project_facets
 from .models import Category, Project, ContactSubmission, Service, Testimonial, Award
+from .trending import WINDOWS, ranked, record_view
 from .serializers import (
     CategorySerializer,
     ProjectListSerializer,
@@ -44,13 +47,27 @@ class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         queryset = Project.objects.select_related('category').prefetch_related('images', 'credits', 'equipment_used__equipment')
-        category = self.request.query_params.get('category')
-        featured = self.request.query_params.get('featured')
-        search = self.request.query_params.get('search')
-        tags = self.request.query_params.get('tags')
+        return self.filter_projects(queryset)
+    
+    def filter_projects(self, queryset, skip=None):
+        """Apply the list's query parameter filters, except ``skip``"""
+        params = {
+            name: value for name, value in self.request.query_params.items()
+            if name in project_facets.params and name != skip
+        }
+        category = params.get('category')
+        featured = params.get('featured')
+        search = params.get('search')
+        tags = params.get('tags')
+        year = params.get('year')
         
         if category:
             queryset = queryset.filter(category__slug=category)
+        if year:
+            try:
+                queryset = queryset.filter(year=int(year))
+            except ValueError:
+                queryset = queryset.none()
         if featured:
             queryset = queryset.filter(featured=True)
         if search:
@@ -74,9 +91,22 @@ class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
         instance = self.get_object()
         # Increment view count when project is viewed
         instance.increment_view_count()
+        record_view(instance.pk)
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Project counts per category, year and tag for the current filters"""
+        def count():
+            projects = Project.objects.all()
+            return {
+                'categories': value_counts(self.filter_projects(projects, skip='category'), 'category__slug', 'category__name'),
+                'years': value_counts(self.filter_projects(projects, skip='year'), 'year'),
+                'tags': tag_counts(self.filter_projects(projects, skip='tags')),
+            }
+        return Response(project_facets.get_or_set(request.query_params, count))
+    
     @method_decorator(cache_page(CACHE_TTL))
     @action(detail=False, methods=['get'])
     def featured(self, request):
@@ -84,11 +114,35 @@ class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = ProjectListSerializer(featured_projects, many=True, context={'request': request})
         return Response(serializer.data)
     
+    @method_decorator(cache_page(CACHE_TTL))
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Projects with the most recent attention, older views decaying away"""
+        projects = list(ranked('trending', 6))
+        if not projects:
+            # Nothing viewed recently, or the first refresh hasn't run yet
+            projects = Project.objects.select_related('category').order_by('-view_count')[:6]
+        serializer = ProjectListSerializer(projects, many=True, context={'request': request})
+        return Response(serializer.data)
+    
     @method_decorator(cache_page(CACHE_TTL))
     @action(detail=False, methods=['get'])
     def popular(self, request):
-        """Get most viewed projects"""
-        popular_projects = Project.objects.select_related('category').order_by('-view_count')[:6]
+        """Get most viewed projects, all time or over the last 1, 7 or 30 days (?days=)"""
+        days = request.query_params.get('days')
+        if days is None:
+            popular_projects = Project.objects.select_related('category').order_by('-view_count')[:6]
+        else:
+            try:
+                days = int(days)
+            except ValueError:
+                days = None
+            if days not in WINDOWS:
+                return Response(
+                    {'error': f"days must be one of {', '.join(map(str, WINDOWS))}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            popular_projects = ranked(WINDOWS[days], 6)
         serializer = ProjectListSerializer(popular_projects, many=True, context={'request': request})
         return Response(serializer.data)
 
@@ -96,6 +150,7 @@ class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
 class ContactSubmissionView(generics.CreateAPIView):
     queryset = ContactSubmission.objects.all()
     serializer_class = ContactSubmissionSerializer
+    throttle_scope = 'contact'
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
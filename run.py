@@ -1,55 +1,189 @@
 #!/usr/bin/env python
 """
 Main entry point for running both Django backend and React frontend.
+
+Development (default):
+    python run.py
+
+Development under ASGI (uvicorn with autoreload; async views run natively):
+    python run.py --asgi
+
+Production (multi-worker gunicorn, no frontend dev server):
+    python run.py --production --workers 4 --threads 2
+    python run.py --production --asgi        # uvicorn workers via backend.asgi
+
+Both modes also start a background task worker (manage.py taskworker), which
+sends emails, builds image variants, delivers campaigns, flushes telemetry and
+runs the other queued jobs. Pass --no-worker when workers run as their own
+service.
+
+Send SIGHUP to this process to gracefully reload the gunicorn workers.
 """
+import argparse
+import importlib.util
 import os
 import subprocess
 import sys
 import signal
 import time
+import urllib.error
+import urllib.request
 from pathlib import Path
 
 processes = []
 
-def signal_handler(sig, frame):
+HEALTH_PATH = "/api/health/"
+
+
+def shutdown(exit_code=0):
     print("\nShutting down servers...")
     for p in processes:
         if p.poll() is None:
             p.terminate()
-    sys.exit(0)
+    sys.exit(exit_code)
+
+
+def signal_handler(sig, frame):
+    shutdown(0)
+
+
+def reload_handler(sig, frame):
+    """Forward SIGHUP to gunicorn, which restarts workers one by one"""
+    if processes and processes[0].poll() is None:
+        processes[0].send_signal(signal.SIGHUP)
+
+
+def default_workers():
+    """gunicorn's usual recommendation: (2 x cores) + 1"""
+    return (os.cpu_count() or 1) * 2 + 1
+
 
-def main():
+def wait_until_ready(port, timeout=30.0, interval=0.25, process=None):
+    """Poll the health endpoint until the backend answers 200 or we give up"""
+    url = f"http://127.0.0.1:{port}{HEALTH_PATH}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(interval)
+    return False
+
+
+def gunicorn_command(args):
+    command = [
+        sys.executable, "-m", "gunicorn",
+        "--bind", f"{args.host}:{args.port}",
+        "--workers", str(args.workers),
+        "--timeout", str(args.timeout),
+        "--graceful-timeout", str(args.graceful_timeout),
+        "--max-requests", str(args.max_requests),
+        "--max-requests-jitter", str(max(args.max_requests // 10, 1)),
+        "--access-logfile", "-",
+    ]
+    if args.preload:
+        # Load Django once in the master so forked workers share its memory
+        # pages copy-on-write. Code changes then need a full restart, not HUP.
+        command.append("--preload")
+    if args.asgi:
+        command += ["--worker-class", "uvicorn.workers.UvicornWorker", "backend.asgi:application"]
+    else:
+        command += ["--worker-class", "gthread", "--threads", str(args.threads), "backend.wsgi:application"]
+    return command
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Kodeen Hunter backend (and frontend in development).")
+    parser.add_argument("--production", action="store_true",
+                        help="Run gunicorn with multiple workers instead of runserver + Vite")
+    parser.add_argument("--asgi", action="store_true",
+                        help="Serve backend.asgi with uvicorn (workers in production)")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int,
+                        default=int(os.environ.get("WEB_CONCURRENCY", default_workers())))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("GUNICORN_THREADS", 2)),
+                        help="Threads per worker (WSGI mode)")
+    parser.add_argument("--timeout", type=int, default=30)
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    parser.add_argument("--max-requests", type=int, default=1000,
+                        help="Recycle a worker after this many requests")
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="Import the app in each worker instead of once in the master")
+    parser.add_argument("--ready-timeout", type=float, default=30.0,
+                        help="Seconds to wait for the health endpoint before giving up")
+    parser.add_argument("--skip-migrate", action="store_true")
+    parser.add_argument("--no-worker", dest="worker", action="store_false",
+                        help="Don't start the background task worker (manage.py taskworker)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
-    
+
     base_dir = Path(__file__).parent
-    
-    print("Running Django migrations...")
-    subprocess.run([sys.executable, "manage.py", "migrate", "--run-syncdb"], check=True)
-    
-    print("Starting Django backend on port 8000...")
-    django_process = subprocess.Popen([
-        sys.executable, "manage.py", "runserver", "0.0.0.0:8000"
-    ])
+
+    if not args.skip_migrate:
+        print("Running Django migrations...")
+        subprocess.run([sys.executable, "manage.py", "migrate", "--run-syncdb"], check=True)
+
+    if args.asgi and importlib.util.find_spec("uvicorn") is None:
+        sys.exit("ASGI mode needs uvicorn: pip install 'uvicorn[standard]'")
+
+    if args.production:
+        signal.signal(signal.SIGHUP, reload_handler)
+        mode = "ASGI (uvicorn)" if args.asgi else f"WSGI (gthread x{args.threads})"
+        print(f"Starting gunicorn on port {args.port}: {args.workers} workers, {mode}...")
+        django_process = subprocess.Popen(gunicorn_command(args))
+    elif args.asgi:
+        print(f"Starting Django backend (ASGI) on port {args.port}...")
+        django_process = subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "backend.asgi:application",
+            "--host", args.host, "--port", str(args.port), "--reload"
+        ])
+    else:
+        print(f"Starting Django backend on port {args.port}...")
+        django_process = subprocess.Popen([
+            sys.executable, "manage.py", "runserver", f"{args.host}:{args.port}"
+        ])
     processes.append(django_process)
-    
-    time.sleep(2)
-    
-    print("Starting React frontend on port 5000...")
-    frontend_dir = base_dir / "frontend"
-    react_process = subprocess.Popen(
-        ["npm", "run", "dev", "--", "--port", "5000"],
-        cwd=frontend_dir
-    )
-    processes.append(react_process)
-    
+
+    if not wait_until_ready(args.port, timeout=args.ready_timeout, process=django_process):
+        print(f"Backend did not become ready on {HEALTH_PATH} within {args.ready_timeout}s")
+        shutdown(1)
+
+    if args.worker:
+        print("Starting background task worker...")
+        processes.append(subprocess.Popen([sys.executable, "manage.py", "taskworker"]))
+
+    if not args.production:
+        print("Starting React frontend on port 5000...")
+        frontend_dir = base_dir / "frontend"
+        react_process = subprocess.Popen(
+            ["npm", "run", "dev", "--", "--port", "5000"],
+            cwd=frontend_dir
+        )
+        processes.append(react_process)
+
     print("\n" + "="*50)
     print("Servers running:")
-    print("  - Frontend: http://0.0.0.0:5000")
-    print("  - Backend API: http://0.0.0.0:8000/api/")
-    print("  - Admin: http://0.0.0.0:8000/admin/")
+    if not args.production:
+        print("  - Frontend: http://0.0.0.0:5000")
+    print(f"  - Backend API: http://{args.host}:{args.port}/api/")
+    print(f"  - Admin: http://{args.host}:{args.port}/admin/")
+    if args.worker:
+        print("  - Task worker: manage.py taskworker")
+    else:
+        print("  - Task worker: not started; queued emails and jobs wait for `python manage.py taskworker`")
     print("="*50 + "\n")
-    
+
     for p in processes:
         p.wait()
 
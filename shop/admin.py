@@ -1,5 +1,18 @@
 from django.contrib import admin
-from .models import ProductCategory, Product, ProductFeature, ProductImage, Order, OrderItem, Coupon, ProductReview
+from django.db import transaction
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from core.admin import PerformanceModelAdmin
+from core.exports import export_actions
+from .downloads import make_download_token
+from .exports import OrderExport
+from .models import (
+    ProductCategory, Product, ProductFeature, ProductImage, Order, OrderItem, Coupon, ProductReview, DailySalesRollup,
+    StockReservation,
+)
+from .sales import sales_series, sales_totals, top_sellers
+from .signals import orders_cancelled, orders_paid, orders_unpaid, reviews_changed
 
 
 class ProductFeatureInline(admin.TabularInline):
@@ -18,6 +31,17 @@ class OrderItemInline(admin.TabularInline):
     readonly_fields = ['product_name', 'price', 'quantity']
 
 
+class StockReservationInline(admin.TabularInline):
+    model = StockReservation
+    extra = 0
+    can_delete = False
+    fields = ['product', 'quantity', 'status', 'expires_at']
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(ProductCategory)
 class ProductCategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug', 'order']
@@ -67,13 +91,13 @@ class CouponAdmin(admin.ModelAdmin):
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(PerformanceModelAdmin):
     list_display = ['order_number', 'customer_name', 'customer_email', 'status', 'payment_status', 'total', 'created_at']
     list_filter = ['status', 'payment_status', 'created_at']
     search_fields = ['order_number', 'customer_name', 'customer_email', 'payment_id']
-    readonly_fields = ['order_number', 'customer_name', 'customer_email', 'subtotal', 'discount', 'total', 'download_token', 'download_count', 'created_at', 'updated_at']
-    inlines = [OrderItemInline]
-    actions = ['mark_as_completed', 'mark_as_paid', 'generate_download_tokens']
+    readonly_fields = ['order_number', 'customer_name', 'customer_email', 'subtotal', 'discount', 'total', 'download_link', 'download_count', 'created_at', 'updated_at']
+    inlines = [OrderItemInline, StockReservationInline]
+    actions = ['mark_as_completed', 'mark_as_paid', 'mark_as_refunded', 'mark_as_cancelled', *export_actions(OrderExport())]
     
     fieldsets = (
         ('Order Information', {
@@ -89,7 +113,7 @@ class OrderAdmin(admin.ModelAdmin):
             'fields': ('subtotal', 'discount', 'coupon', 'total')
         }),
         ('Downloads', {
-            'fields': ('download_token', 'download_count', 'max_downloads')
+            'fields': ('download_link', 'download_count', 'max_downloads')
         }),
         ('Notes', {
             'fields': ('notes',)
@@ -104,23 +128,48 @@ class OrderAdmin(admin.ModelAdmin):
         self.message_user(request, f'{updated} order(s) marked as completed.')
     mark_as_completed.short_description = 'Mark selected orders as completed'
     
+    def set_payment_status(self, queryset, paid, payment_status):
+        """
+        Bulk payment status change that keeps the sales rollups in step.
+        Returns the number of orders that moved into or out of 'paid'.
+        """
+        with transaction.atomic():
+            moving = queryset.exclude(payment_status='paid') if paid else queryset.filter(payment_status='paid')
+            ids = list(moving.select_for_update().values_list('pk', flat=True))
+            Order.objects.filter(pk__in=ids).update(payment_status=payment_status)
+            if ids:
+                (orders_paid if paid else orders_unpaid).send(sender=Order, order_ids=ids)
+        return len(ids)
+
     def mark_as_paid(self, request, queryset):
-        updated = queryset.update(payment_status='paid')
+        updated = self.set_payment_status(queryset, True, 'paid')
         self.message_user(request, f'{updated} order(s) marked as paid.')
     mark_as_paid.short_description = 'Mark selected orders as paid'
+
+    def mark_as_refunded(self, request, queryset):
+        updated = self.set_payment_status(queryset, False, 'refunded')
+        self.message_user(request, f'{updated} paid order(s) marked as refunded.')
+    mark_as_refunded.short_description = 'Mark selected paid orders as refunded'
+
+    def mark_as_cancelled(self, request, queryset):
+        with transaction.atomic():
+            ids = list(queryset.exclude(status='cancelled').select_for_update().values_list('pk', flat=True))
+            Order.objects.filter(pk__in=ids).update(status='cancelled')
+            if ids:
+                orders_cancelled.send(sender=Order, order_ids=ids)
+        self.message_user(request, f'{len(ids)} order(s) cancelled; their reserved stock was released.')
+    mark_as_cancelled.short_description = 'Cancel selected orders and release their stock'
     
-    def generate_download_tokens(self, request, queryset):
-        count = 0
-        for order in queryset:
-            if not order.download_token:
-                order.generate_download_token()
-                count += 1
-        self.message_user(request, f'Generated download tokens for {count} order(s).')
-    generate_download_tokens.short_description = 'Generate download tokens'
+    def download_link(self, obj):
+        if not obj.pk:
+            return '-'
+        path = reverse('orders-download', kwargs={'order_number': obj.order_number})
+        return f'{path}?token={make_download_token(obj.order_number)}'
+    download_link.short_description = 'Download link (freshly signed)'
 
 
 @admin.register(ProductReview)
-class ProductReviewAdmin(admin.ModelAdmin):
+class ProductReviewAdmin(PerformanceModelAdmin):
     list_display = ['customer_name', 'product', 'rating', 'is_verified_purchase', 'is_approved', 'created_at']
     list_filter = ['rating', 'is_verified_purchase', 'is_approved', 'created_at']
     search_fields = ['customer_name', 'customer_email', 'title', 'review']
@@ -129,11 +178,65 @@ class ProductReviewAdmin(admin.ModelAdmin):
     actions = ['approve_reviews', 'unapprove_reviews']
     
     def approve_reviews(self, request, queryset):
-        updated = queryset.update(is_approved=True)
+        updated = self.set_approved(queryset, True)
         self.message_user(request, f'{updated} review(s) approved.')
     approve_reviews.short_description = 'Approve selected reviews'
     
     def unapprove_reviews(self, request, queryset):
-        updated = queryset.update(is_approved=False)
+        updated = self.set_approved(queryset, False)
         self.message_user(request, f'{updated} review(s) unapproved.')
     unapprove_reviews.short_description = 'Unapprove selected reviews'
+    
+    def set_approved(self, queryset, approved):
+        """Flip approval in one UPDATE, then refresh the affected products' stats"""
+        changed = queryset.exclude(is_approved=approved)
+        product_ids = set(changed.values_list('product_id', flat=True).distinct())
+        updated = changed.update(is_approved=approved)
+        reviews_changed.send(sender=ProductReview, product_ids=product_ids)
+        return updated
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(PerformanceModelAdmin):
+    """Read-only view of the rollups, plus the sales dashboard"""
+    change_list_template = 'admin/shop/dailysalesrollup/change_list.html'
+    list_display = ['date', 'dimension', 'label', 'orders', 'units', 'gross', 'discount', 'net']
+    list_filter = ['dimension']
+    search_fields = ['label']
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path('dashboard/', self.admin_site.admin_view(self.dashboard_view), name='shop_dailysalesrollup_dashboard'),
+        ]
+        return urls + super().get_urls()
+
+    def dashboard_view(self, request):
+        """Monthly revenue for the last three years and the top sellers, from the rollups only"""
+        until = timezone.localdate()
+        since = until.replace(day=1, year=until.year - 3)
+        series = sales_series(since, until, 'month')
+        peak = max((row['net'] for row in series), default=0) or 1
+        for row in series:
+            row['percent'] = round(row['net'] * 100 / peak, 1)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Sales dashboard',
+            'since': since,
+            'until': until,
+            'series': series,
+            'totals': sales_totals(since, until),
+            'products': top_sellers('product', since, until),
+            'coupons': top_sellers('coupon', since, until),
+        }
+        return TemplateResponse(request, 'admin/shop/dailysalesrollup/dashboard.html', context)
@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class ShopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shop'
+
+    def ready(self):
+        from core.images import register_variant_field
+        from . import facets, rankings, reviews, sales, stock, tasks
+        from .models import Product, ProductImage
+
+        register_variant_field(Product, 'image')
+        register_variant_field(ProductImage, 'image')
+        reviews.connect()
+        sales.connect()
+        rankings.connect()  # After sales: rankings read the rollups
+        stock.connect()
+        facets.connect()
+        tasks.connect()
@@ -0,0 +1,47 @@
+"""
+Signed download tokens.
+
+A token is the order number, an optional product id and an expiry time,
+signed with HMAC-SHA256 (``django.core.signing``, keyed on SECRET_KEY). It is
+checked in memory, with a constant-time compare of the signature, before the
+download view touches the database; forged, tampered, expired or
+wrong-order tokens are turned away without a query. Only a valid token goes
+on to load the order and spend one of its downloads.
+
+Tokens aren't stored, so rotating SECRET_KEY revokes them all. One is
+issued in the order create response, in the payment confirmation email and
+in the admin, never by the open order list/retrieve endpoints.
+"""
+import time
+
+from django.conf import settings
+from django.core import signing
+
+SALT = 'shop.order-download'
+
+
+def make_download_token(order_number, product_id=None, max_age=None):
+    """Token for ``order_number`` (one product if ``product_id``), valid for ``max_age`` seconds"""
+    max_age = max_age if max_age is not None else settings.DOWNLOAD_TOKEN_MAX_AGE
+    claims = {'o': order_number, 'e': int(time.time()) + max_age}
+    if product_id is not None:
+        claims['p'] = product_id
+    return signing.dumps(claims, salt=SALT, compress=True)
+
+
+def verify_download_token(token, order_number):
+    """
+    The token's claims if it is genuine, unexpired and issued for
+    ``order_number``; otherwise None. Never queries the database.
+    """
+    if not token:
+        return None
+    try:
+        claims = signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        return None
+    if not isinstance(claims, dict) or claims.get('o') != order_number:
+        return None
+    if not isinstance(claims.get('e'), int) or claims['e'] < time.time():
+        return None
+    return claims
@@ -0,0 +1,66 @@
+from collections import defaultdict
+
+from core.exports import CHUNK_SIZE, Export, chunked
+
+from .models import Order, OrderItem
+
+
+class OrderExport(Export):
+    """Orders with their item lines: one CSV row per item, one JSON line per order"""
+    name = 'orders'
+    model = Order
+    date_field = 'created_at'
+    columns = [
+        ('order_number', 'order_number'),
+        ('created_at', 'created_at'),
+        ('customer_name', 'customer_name'),
+        ('customer_email', 'customer_email'),
+        ('status', 'status'),
+        ('payment_status', 'payment_status'),
+        ('payment_method', 'payment_method'),
+        ('payment_id', 'payment_id'),
+        ('subtotal', 'subtotal'),
+        ('discount', 'discount'),
+        ('total', 'total'),
+        ('coupon', 'coupon__code'),
+    ]
+    item_columns = [
+        ('item_product', 'product_name'),
+        ('item_price', 'price'),
+        ('item_quantity', 'quantity'),
+    ]
+
+    def header(self):
+        return super().header() + [name for name, _ in self.item_columns]
+
+    def orders_with_items(self, queryset, chunk_size):
+        """Yield (order row, [item rows]), fetching items once per chunk of orders"""
+        lookups = ['pk'] + [lookup for _, lookup in self.columns]
+        orders = queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+        item_lookups = [lookup for _, lookup in self.item_columns]
+        for chunk in chunked(orders, chunk_size):
+            items = defaultdict(list)
+            item_rows = (
+                OrderItem.objects.filter(order_id__in=[row[0] for row in chunk])
+                .order_by('pk').values_list('order_id', *item_lookups)
+            )
+            for order_id, *item in item_rows:
+                items[order_id].append(item)
+            for pk, *order in chunk:
+                yield order, items[pk]
+
+    def records(self, queryset, chunk_size=CHUNK_SIZE):
+        blank = [''] * len(self.item_columns)
+        for order, items in self.orders_with_items(queryset, chunk_size):
+            if not items:
+                yield order + blank
+            for item in items:
+                yield order + item
+
+    def documents(self, queryset, chunk_size=CHUNK_SIZE):
+        names = super().header()
+        item_names = [name.removeprefix('item_') for name, _ in self.item_columns]
+        for order, items in self.orders_with_items(queryset, chunk_size):
+            document = dict(zip(names, order))
+            document['items'] = [dict(zip(item_names, item)) for item in items]
+            yield document
@@ -0,0 +1,12 @@
+from core.facets import FacetCache
+
+from .models import Product, ProductCategory
+
+# ProductViewSet query parameters that filter the list
+products = FacetCache('shop-products', ['category', 'featured', 'search', 'type'])
+
+
+def connect():
+    # Stock and review stats change constantly and no filter reads them
+    products.watch(Product, ignore=['stock', 'review_count', 'rating_average'])
+    products.watch(ProductCategory)
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:41
+
+from django.db import migrations, models
+from django.db.models import Avg, Count
+
+
+def backfill_review_stats(apps, schema_editor):
+    Product = apps.get_model('shop', 'Product')
+    ProductReview = apps.get_model('shop', 'ProductReview')
+    stats = (
+        ProductReview.objects.filter(is_approved=True)
+        .values('product').annotate(count=Count('pk'), average=Avg('rating')).order_by()
+    )
+    Product.objects.bulk_update(
+        [Product(pk=row['product'], review_count=row['count'], rating_average=round(row['average'], 2))
+         for row in stats],
+        ['review_count', 'rating_average'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_product_image_variants_productimage_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_average',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0005_product_review_stats'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='order',
+            name='download_token',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0006_remove_order_download_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Day the order was placed')),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('product', 'Product'), ('coupon', 'Coupon')], max_length=10)),
+                ('key', models.PositiveIntegerField(default=0, help_text='Product or coupon id; 0 for totals and deleted products')),
+                ('label', models.CharField(blank=True, help_text='Product name or coupon code', max_length=200)),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('gross', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('net', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'ordering': ['-date', 'dimension', 'key'],
+                'indexes': [models.Index(fields=['dimension', 'date'], name='shop_dailys_dimensi_7b9251_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'key', 'date'), name='shop_sales_rollup_unique')],
+            },
+        ),
+    ]
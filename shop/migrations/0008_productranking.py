@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0007_dailysalesrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.PositiveSmallIntegerField(choices=[(7, 'Last 7 days'), (30, 'Last 30 days'), (90, 'Last 90 days')])),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='shop.product')),
+            ],
+            options={
+                'ordering': ['window', '-units'],
+                'indexes': [models.Index(fields=['window', '-units'], name='shop_produc_window_fcd638_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'window'), name='shop_ranking_unique')],
+            },
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 
 class ProductCategory(models.Model):
@@ -23,11 +23,15 @@ class Product(models.Model):
     description = models.TextField()
     short_description = models.CharField(max_length=300, blank=True)
     image = models.ImageField(upload_to='shop/products/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     file = models.FileField(upload_to='shop/downloads/', blank=True, help_text="Digital product file")
     is_digital = models.BooleanField(default=True)
     is_active = models.BooleanField(default=True)
     featured = models.BooleanField(default=False)
     stock = models.PositiveIntegerField(default=0, help_text="For physical products")
+    # Approved-review stats, kept current by shop.reviews.refresh_review_stats
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_average = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -62,6 +66,7 @@ class ProductFeature(models.Model):
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='shop/gallery/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     order = models.PositiveIntegerField(default=0)
 
     class Meta:
@@ -169,7 +174,6 @@ class Order(models.Model):
     coupon = models.ForeignKey(Coupon, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
     
     # Download tracking
-    download_token = models.CharField(max_length=100, blank=True, unique=True, help_text="Unique token for download access")
     download_count = models.PositiveIntegerField(default=0)
     max_downloads = models.PositiveIntegerField(default=3, help_text="Maximum number of downloads allowed")
     
@@ -188,12 +192,11 @@ class Order(models.Model):
     def __str__(self):
         return f"Order {self.order_number}"
     
-    def generate_download_token(self):
-        """Generate unique download token"""
-        import uuid
-        self.download_token = uuid.uuid4().hex
-        self.save(update_fields=['download_token'])
-        return self.download_token
+    def save(self, *args, **kwargs):
+        # shop.sales claims a payment change with an UPDATE in pre_save; if
+        # the save itself then fails, the claim must roll back with it
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
     
     def can_download(self):
         """Check if customer can still download"""
@@ -213,3 +216,98 @@ class OrderItem(models.Model):
     @property
     def total(self):
         return self.price * self.quantity
+
+
+class StockReservation(models.Model):
+    """
+    Stock of a physical product taken for an order. Held until the order is
+    paid (committed), or cancelled, failed or expired (released and given
+    back). See shop.stock.
+    """
+    STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('committed', 'Committed'),
+        ('released', 'Released'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='held')
+    expires_at = models.DateTimeField(help_text="Released if still held (unpaid) at this time")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product} for {self.order} ({self.status})"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Paid sales for one day, in total and per product and coupon. Maintained
+    by shop.sales as orders are paid or refunded; rebuilt with
+    `manage.py rebuild_sales_rollups`.
+    """
+    DIMENSION_CHOICES = [
+        ('total', 'Total'),
+        ('product', 'Product'),
+        ('coupon', 'Coupon'),
+    ]
+
+    date = models.DateField(help_text="Day the order was placed")
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES)
+    key = models.PositiveIntegerField(default=0, help_text="Product or coupon id; 0 for totals and deleted products")
+    label = models.CharField(max_length=200, blank=True, help_text="Product name or coupon code")
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    gross = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    net = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-date', 'dimension', 'key']
+        constraints = [
+            # Also the index the reports read through: one dimension, a date range
+            models.UniqueConstraint(fields=['dimension', 'key', 'date'], name='shop_sales_rollup_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.get_dimension_display()} {self.label}".rstrip()
+
+
+class ProductRanking(models.Model):
+    """
+    Paid units per product over a sliding window of days, read by the
+    bestsellers endpoint and ordering=popular. Maintained by shop.rankings
+    from the daily sales rollups.
+    """
+    WINDOW_CHOICES = [
+        (7, 'Last 7 days'),
+        (30, 'Last 30 days'),
+        (90, 'Last 90 days'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='rankings')
+    window = models.PositiveSmallIntegerField(choices=WINDOW_CHOICES)
+    units = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['window', '-units']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'window'], name='shop_ranking_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['window', '-units']),
+        ]
+
+    def __str__(self):
+        return f"{self.product} ({self.window} days): {self.units}"
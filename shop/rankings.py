@@ -0,0 +1,97 @@
+"""
+Bestseller rankings (ProductRanking).
+
+Units sold per product over the last 7, 30 and 90 days are summed from the
+product rows of the daily sales rollups (shop.sales), never from order
+items. When orders are paid or refunded only the products in those orders
+are recomputed: at most 90 rollup rows each. Windows slide at midnight with
+no order event to mark it, so the first ranking read of each day refreshes
+every product in one grouped query over the last 90 days of rollups.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import DailySalesRollup, OrderItem, Product, ProductRanking
+from .signals import orders_paid, orders_unpaid
+
+WINDOWS = [days for days, _ in ProductRanking.WINDOW_CHOICES]
+DEFAULT_WINDOW = 30
+
+
+def window_start(days, today):
+    return today - timedelta(days=days - 1)
+
+
+@transaction.atomic
+def refresh(product_ids=None, today=None):
+    """Recompute the rankings of ``product_ids`` (every product if None)"""
+    today = today or timezone.localdate()
+    rows = DailySalesRollup.objects.filter(
+        dimension='product', date__gte=window_start(max(WINDOWS), today), date__lte=today,
+        key__in=Product.objects.values('pk') if product_ids is None else list(product_ids),
+    )
+    sums = {}
+    for days in WINDOWS:
+        in_window = Q(date__gte=window_start(days, today))
+        sums[f'units_{days}'] = Sum('units', filter=in_window)
+        sums[f'orders_{days}'] = Sum('orders', filter=in_window)
+
+    rankings = []
+    for row in rows.values('key').annotate(**sums).order_by():
+        for days in WINDOWS:
+            if row[f'units_{days}']:
+                rankings.append(ProductRanking(
+                    product_id=row['key'], window=days,
+                    units=row[f'units_{days}'], orders=row[f'orders_{days}'],
+                ))
+
+    stale = ProductRanking.objects.all()
+    if product_ids is not None:
+        stale = stale.filter(product_id__in=list(product_ids))
+    stale.delete()
+    ProductRanking.objects.bulk_create(rankings, batch_size=1000)
+
+
+def ensure_current():
+    """Refresh everything once a day, the first time rankings are read"""
+    today = timezone.localdate()
+    if cache.add(f'shop-rankings:{today.isoformat()}', True, 2 * 24 * 3600):
+        refresh(today=today)
+
+
+def bestsellers(days=DEFAULT_WINDOW):
+    """Active products by units sold in the window, best first"""
+    ensure_current()
+    return (
+        Product.objects.filter(is_active=True, rankings__window=days)
+        .annotate(units_sold=F('rankings__units'))
+        .order_by('-units_sold', 'pk')
+    )
+
+
+def order_by_popularity(queryset, days=DEFAULT_WINDOW):
+    """``queryset`` of products, best selling first; unsold products keep their order after them"""
+    ensure_current()
+    units = ProductRanking.objects.filter(product=OuterRef('pk'), window=days).values('units')[:1]
+    return queryset.annotate(popularity=Coalesce(Subquery(units), Value(0))).order_by(
+        '-popularity', *Product._meta.ordering
+    )
+
+
+def _on_orders_changed(sender, order_ids, **kwargs):
+    product_ids = set(
+        OrderItem.objects.filter(order_id__in=order_ids, product__isnull=False).values_list('product_id', flat=True)
+    )
+    if product_ids:
+        refresh(product_ids)
+
+
+def connect():
+    # Connected after shop.sales, so the rollups already include these orders
+    orders_paid.connect(_on_orders_changed, dispatch_uid='shop-rankings-paid')
+    orders_unpaid.connect(_on_orders_changed, dispatch_uid='shop-rankings-unpaid')
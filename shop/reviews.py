@@ -0,0 +1,48 @@
+"""
+Denormalized review stats on Product (review_count, rating_average).
+
+Stats are recomputed for the affected products whenever reviews_changed is
+sent: by post_save/post_delete for single reviews, and explicitly by bulk
+admin actions. Recomputing is one grouped aggregate plus one bulk UPDATE
+however many products or reviews are involved.
+"""
+from django.db.models import Avg, Count
+from django.db.models.signals import post_delete, post_save
+
+from .models import Product, ProductReview
+from .signals import reviews_changed
+
+
+def refresh_review_stats(product_ids):
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    stats = {
+        row['product']: row
+        for row in ProductReview.objects.filter(product_id__in=product_ids, is_approved=True)
+        .values('product').annotate(count=Count('pk'), average=Avg('rating')).order_by()
+    }
+    products = []
+    for pk in product_ids:
+        row = stats.get(pk)
+        products.append(Product(
+            pk=pk,
+            review_count=row['count'] if row else 0,
+            rating_average=round(row['average'], 2) if row else None,
+        ))
+    Product.objects.bulk_update(products, ['review_count', 'rating_average'])
+
+
+def _on_reviews_changed(sender, product_ids, **kwargs):
+    refresh_review_stats(product_ids)
+
+
+def _on_review_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        reviews_changed.send(sender=ProductReview, product_ids=[instance.product_id])
+
+
+def connect():
+    reviews_changed.connect(_on_reviews_changed, dispatch_uid='shop-review-stats')
+    post_save.connect(_on_review_saved, sender=ProductReview, dispatch_uid='shop-review-saved')
+    post_delete.connect(_on_review_saved, sender=ProductReview, dispatch_uid='shop-review-deleted')
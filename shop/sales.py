@@ -0,0 +1,238 @@
+"""
+Sales rollups (DailySalesRollup) and the reports read from them.
+
+Reports never touch order history: they sum pre-aggregated day rows, so a
+three-year revenue chart is about 1,100 'total' rows grouped by month.
+Rows count the orders that are currently paid, on the day each order was
+placed. Product rows carry a share of the order discount in proportion to
+their line total.
+
+Rollups follow payments incrementally. orders_paid and orders_unpaid are
+sent when saving an order moves it into or out of 'paid' (and by the bulk
+admin actions, which bypass save signals). The move is claimed in pre_save
+with a conditional UPDATE on the stored status, so of two saves racing to
+mark one order paid only one sends orders_paid; Order.save runs in a
+transaction, so a save that fails after the claim undoes it. The receivers add or subtract
+those orders' contribution with F() updates, so concurrent payments don't
+lose increments. `manage.py rebuild_sales_rollups` recomputes a date range
+from scratch, one chunk of days per transaction; run it after deleting paid
+orders or loading them with bulk_create, neither of which is tracked.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, Min, Sum
+from django.db.models.functions import TruncMonth, TruncWeek, TruncYear
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+
+from .models import DailySalesRollup, Order, OrderItem
+from .signals import orders_paid, orders_unpaid
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0')
+INTERVALS = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'year': TruncYear,
+}
+MEASURES = ('orders', 'units', 'gross', 'discount', 'net')
+# Annotations can't reuse the field names, hence the prefix
+SUMS = {f'sum_{name}': Sum(name) for name in MEASURES}
+
+
+def day_range(start, end):
+    """Aware datetimes bounding local days ``start`` to ``end`` inclusive"""
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+
+
+def contributions(orders):
+    """
+    What ``orders`` (an Order queryset) add to the rollups:
+    {(date, dimension, key): [label, orders, units, gross, discount, net]}.
+    Two queries whatever the number of orders.
+    """
+    items = defaultdict(list)
+    for row in (OrderItem.objects.filter(order__in=orders.values('pk'))
+                .values_list('order_id', 'product_id', 'product_name', 'price', 'quantity')):
+        items[row[0]].append(row[1:])
+
+    rows = {}
+
+    def add(day, dimension, key, label, units, gross, discount, net):
+        row = rows.get((day, dimension, key))
+        if row is None:
+            row = rows[(day, dimension, key)] = [label, 0, 0, ZERO, ZERO, ZERO]
+        row[1] += 1
+        row[2] += units
+        row[3] += gross
+        row[4] += discount
+        row[5] += net
+
+    for pk, created_at, subtotal, discount, total, coupon_id, coupon_code in orders.values_list(
+        'pk', 'created_at', 'subtotal', 'discount', 'total', 'coupon_id', 'coupon__code'
+    ):
+        day = timezone.localdate(created_at)
+        units = sum(quantity for *_, quantity in items[pk])
+        add(day, 'total', 0, '', units, subtotal, discount, total)
+        if coupon_id:
+            add(day, 'coupon', coupon_id, coupon_code, units, subtotal, discount, total)
+        for product_id, name, price, quantity in items[pk]:
+            line = price * quantity
+            share = (discount * line / subtotal).quantize(CENT) if subtotal else ZERO
+            add(day, 'product', product_id or 0, name if product_id else 'Deleted products',
+                quantity, line, share, line - share)
+    return rows
+
+
+@transaction.atomic
+def apply(rows, sign):
+    """Add (sign=1) or subtract (sign=-1) contributions from the rollups"""
+    if not rows:
+        return
+    DailySalesRollup.objects.bulk_create(
+        [DailySalesRollup(date=day, dimension=dimension, key=key, label=row[0])
+         for (day, dimension, key), row in rows.items()],
+        ignore_conflicts=True,
+    )
+    for (day, dimension, key), (_, orders, units, gross, discount, net) in rows.items():
+        DailySalesRollup.objects.filter(date=day, dimension=dimension, key=key).update(
+            orders=F('orders') + sign * orders,
+            units=F('units') + sign * units,
+            gross=F('gross') + sign * gross,
+            discount=F('discount') + sign * discount,
+            net=F('net') + sign * net,
+        )
+    if sign < 0:
+        DailySalesRollup.objects.filter(date__in={day for day, _, _ in rows}, orders__lte=0).delete()
+
+
+def record_paid(order_ids):
+    apply(contributions(Order.objects.filter(pk__in=order_ids)), 1)
+
+
+def record_unpaid(order_ids):
+    apply(contributions(Order.objects.filter(pk__in=order_ids)), -1)
+
+
+def rebuild(since=None, until=None, chunk_days=31):
+    """
+    Recompute the rollups for local days ``since`` to ``until`` (default:
+    all paid orders). Yields (start, end, rows written) per chunk; each
+    chunk is replaced in one transaction.
+    """
+    paid = Order.objects.filter(payment_status='paid')
+    everything = since is None and until is None
+    if since is None or until is None:
+        bounds = paid.aggregate(first=Min('created_at'), last=Max('created_at'))
+        if bounds['first'] is None:
+            if everything:
+                DailySalesRollup.objects.all().delete()
+            return
+        since = since or timezone.localdate(bounds['first'])
+        until = until or timezone.localdate(bounds['last'])
+    if everything:
+        DailySalesRollup.objects.exclude(date__gte=since, date__lte=until).delete()
+
+    start = since
+    while start <= until:
+        end = min(start + timedelta(days=chunk_days - 1), until)
+        lower, upper = day_range(start, end)
+        with transaction.atomic():
+            DailySalesRollup.objects.filter(date__gte=start, date__lte=end).delete()
+            rows = contributions(paid.filter(created_at__gte=lower, created_at__lt=upper))
+            DailySalesRollup.objects.bulk_create(
+                [DailySalesRollup(date=day, dimension=dimension, key=key, label=label, orders=orders,
+                                  units=units, gross=gross, discount=discount, net=net)
+                 for (day, dimension, key), (label, orders, units, gross, discount, net) in rows.items()],
+                batch_size=1000,
+            )
+        yield start, end, len(rows)
+        start = end + timedelta(days=1)
+
+
+# Reports ------------------------------------------------------------------
+
+def totals(since, until, dimension='total'):
+    return DailySalesRollup.objects.filter(dimension=dimension, date__gte=since, date__lte=until)
+
+
+def _summed(rows):
+    """values() rows with the MEASURES sums under their plain names"""
+    return [
+        {**{k: v for k, v in row.items() if not k.startswith('sum_')},
+         **{name: row[f'sum_{name}'] or 0 for name in MEASURES}}
+        for row in rows
+    ]
+
+
+def sales_series(since, until, interval='month'):
+    """Total sales per day/week/month/year, oldest first"""
+    rows = totals(since, until)
+    trunc = INTERVALS[interval]
+    rows = rows.annotate(period=trunc('date') if trunc else F('date'))
+    return _summed(rows.values('period').annotate(**SUMS).order_by('period'))
+
+
+def sales_totals(since, until):
+    return _summed([totals(since, until).aggregate(**SUMS)])[0]
+
+
+def top_sellers(dimension, since, until, limit=10):
+    """Products or coupons with the highest net sales in the range"""
+    return _summed(
+        totals(since, until, dimension)
+        .values('key')
+        .annotate(name=Max('label'), **SUMS)
+        .order_by('-sum_net', 'key')[:limit]
+    )
+
+
+# Receivers ----------------------------------------------------------------
+
+def _on_orders_paid(sender, order_ids, **kwargs):
+    record_paid(order_ids)
+
+
+def _on_orders_unpaid(sender, order_ids, **kwargs):
+    record_unpaid(order_ids)
+
+
+def _claim_payment_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Flip the stored payment status ahead of the save, and note whether this
+    save is the one that moved the order into or out of 'paid'.
+    """
+    instance._payment_change = None
+    if raw or (update_fields is not None and 'payment_status' not in update_fields):
+        return
+    if instance._state.adding:
+        if instance.payment_status == 'paid':
+            instance._payment_change = orders_paid
+        return
+    stored = Order.objects.filter(pk=instance.pk)
+    if instance.payment_status == 'paid':
+        if stored.exclude(payment_status='paid').update(payment_status='paid'):
+            instance._payment_change = orders_paid
+    elif stored.filter(payment_status='paid').update(payment_status=instance.payment_status):
+        instance._payment_change = orders_unpaid
+
+
+def _on_order_saved(sender, instance, raw=False, **kwargs):
+    signal = getattr(instance, '_payment_change', None)
+    instance._payment_change = None
+    if signal is not None and not raw:
+        signal.send(sender=Order, order_ids=[instance.pk])
+
+
+def connect():
+    orders_paid.connect(_on_orders_paid, dispatch_uid='shop-sales-paid')
+    orders_unpaid.connect(_on_orders_unpaid, dispatch_uid='shop-sales-unpaid')
+    pre_save.connect(_claim_payment_change, sender=Order, dispatch_uid='shop-order-payment-change')
+    post_save.connect(_on_order_saved, sender=Order, dispatch_uid='shop-order-saved')
@@ -1,5 +1,11 @@
+from django.db import transaction
+from django.db.models import F, Q
 from rest_framework import serializers
+from core.db_router import use_primary
+from core.serializers import PlaceholderField, SrcsetField
 from .models import ProductCategory, Product, ProductFeature, ProductImage, Order, OrderItem, Coupon, ProductReview
+from .downloads import make_download_token
+from .stock import OutOfStock, reserve
 
 
 class ProductCategorySerializer(serializers.ModelSerializer):
@@ -15,25 +21,33 @@ class ProductFeatureSerializer(serializers.ModelSerializer):
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    image_srcset = SrcsetField(source='image_variants')
+
     class Meta:
         model = ProductImage
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'image_srcset']
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductBaseSerializer(serializers.ModelSerializer):
+    """Fields shared by the product list and detail serializers"""
     category = ProductCategorySerializer(read_only=True)
     current_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     features = serializers.SerializerMethodField()
+    image_srcset = SrcsetField(source='image_variants')
+    
+    def get_features(self, obj):
+        return [f.feature for f in obj.features.all()]
+
+
+class ProductListSerializer(ProductBaseSerializer):
+    image_placeholder = PlaceholderField(source='image_variants')
     
     class Meta:
         model = Product
         fields = [
-            'id', 'name', 'slug', 'category', 'price', 'sale_price',
-            'current_price', 'short_description', 'image', 'is_digital', 'featured', 'features'
+            'id', 'name', 'slug', 'category', 'price', 'sale_price', 'current_price', 'short_description',
+            'image', 'image_srcset', 'image_placeholder', 'is_digital', 'featured', 'features'
         ]
-    
-    def get_features(self, obj):
-        return [f.feature for f in obj.features.all()]
 
 
 class ProductReviewSerializer(serializers.ModelSerializer):
@@ -43,10 +57,7 @@ class ProductReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ['is_verified_purchase', 'created_at']
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
-    category = ProductCategorySerializer(read_only=True)
-    current_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
-    features = serializers.SerializerMethodField()
+class ProductDetailSerializer(ProductBaseSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     reviews = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
@@ -56,26 +67,22 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         model = Product
         fields = [
             'id', 'name', 'slug', 'category', 'price', 'sale_price',
-            'current_price', 'description', 'short_description', 'image',
+            'current_price', 'description', 'short_description', 'image', 'image_srcset',
             'is_digital', 'featured', 'features', 'images', 'stock',
             'reviews', 'average_rating', 'review_count'
         ]
     
-    def get_features(self, obj):
-        return [f.feature for f in obj.features.all()]
-    
     def get_reviews(self, obj):
         approved_reviews = obj.reviews.filter(is_approved=True)[:5]
         return ProductReviewSerializer(approved_reviews, many=True).data
     
     def get_average_rating(self, obj):
-        approved_reviews = obj.reviews.filter(is_approved=True)
-        if approved_reviews.exists():
-            return round(sum(r.rating for r in approved_reviews) / approved_reviews.count(), 1)
-        return 0
+        if obj.rating_average is None:
+            return 0
+        return round(float(obj.rating_average), 1)
     
     def get_review_count(self, obj):
-        return obj.reviews.filter(is_approved=True).count()
+        return obj.review_count
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -90,6 +97,15 @@ class CouponSerializer(serializers.ModelSerializer):
         fields = ['code', 'discount_type', 'discount_value']
 
 
+def use_coupon(coupon):
+    """Count one use of ``coupon`` in a single UPDATE; False if it has run out meanwhile"""
+    return bool(
+        Coupon.objects.filter(pk=coupon.pk)
+        .filter(Q(max_uses__isnull=True) | Q(max_uses=0) | Q(times_used__lt=F('max_uses')))
+        .update(times_used=F('times_used') + 1)
+    )
+
+
 class OrderCreateSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
     coupon_code = serializers.CharField(required=False, allow_blank=True, write_only=True)
@@ -103,7 +119,9 @@ class OrderCreateSerializer(serializers.ModelSerializer):
     def validate_coupon_code(self, value):
         if value:
             try:
-                coupon = Coupon.objects.get(code=value.upper())
+                # Coupon usage counts change with every order, so check the primary
+                with use_primary():
+                    coupon = Coupon.objects.get(code=value.upper())
                 if not coupon.is_valid():
                     raise serializers.ValidationError("This coupon is not valid or has expired.")
                 return coupon
@@ -122,8 +140,6 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         if coupon:
             discount = coupon.calculate_discount(subtotal)
             validated_data['coupon'] = coupon
-            coupon.times_used += 1
-            coupon.save()
         
         validated_data['subtotal'] = subtotal
         validated_data['discount'] = discount
@@ -134,14 +150,21 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         import uuid
         validated_data['order_number'] = f"ORD{timezone.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:6].upper()}"
         
-        order = Order.objects.create(**validated_data)
-        
-        # Create order items
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
-        
-        # Generate download token for digital products
-        order.generate_download_token()
+        # All or nothing: an order that can't be covered leaves no trace
+        with transaction.atomic():
+            order = Order.objects.create(**validated_data)
+            
+            # Create order items
+            for item_data in items_data:
+                OrderItem.objects.create(order=order, **item_data)
+            
+            # Last, so hot product and coupon rows stay locked for as little of the transaction as possible
+            try:
+                reserve(order, [(item.get('product'), item['quantity']) for item in items_data])
+            except OutOfStock as e:
+                raise serializers.ValidationError({'items': [str(e)]})
+            if coupon and not use_coupon(coupon):
+                raise serializers.ValidationError({'coupon_code': ["This coupon is not valid or has expired."]})
         
         return order
 
@@ -154,6 +177,21 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'order_number', 'customer_name', 'customer_email',
             'status', 'payment_status', 'subtotal', 'discount', 'total', 
-            'items', 'download_token', 'created_at'
+            'items', 'created_at'
         ]
-        read_only_fields = ['order_number', 'download_token']
+        read_only_fields = fields
+
+
+class OrderReceiptSerializer(OrderSerializer):
+    """
+    The order as returned to the customer who just placed it, with a signed
+    download token. Only the create response and the payment email carry a
+    token; list and retrieve are open, so they must not mint one.
+    """
+    download_token = serializers.SerializerMethodField()
+
+    class Meta(OrderSerializer.Meta):
+        fields = OrderSerializer.Meta.fields + ['download_token']
+
+    def get_download_token(self, obj):
+        return make_download_token(obj.order_number)
@@ -0,0 +1,15 @@
+from django.dispatch import Signal
+
+# Sent with product_ids=[...] whenever approved reviews of those products may
+# have changed, including by bulk updates that bypass post_save
+reviews_changed = Signal()
+
+# Sent with order_ids=[...] when orders become paid, and when paid orders are
+# refunded or otherwise stop being paid. post_save sends them for single
+# orders; bulk updates must send them explicitly.
+orders_paid = Signal()
+orders_unpaid = Signal()
+
+# Sent with order_ids=[...] when orders are cancelled or their payment fails,
+# so their reserved stock is given back. Same rules as orders_paid.
+orders_cancelled = Signal()
@@ -0,0 +1,166 @@
+"""
+Stock reservations for physical products (StockReservation).
+
+Checkout takes stock with one conditional UPDATE per product:
+
+    UPDATE shop_product SET stock = stock - n WHERE id = ... AND stock >= n
+
+The database checks and decrements in a single statement, so concurrent
+buyers never read a stale count and can't oversell, and each product row is
+only locked for the rest of the checkout transaction rather than across a
+read-check-write round trip. If any line can't be covered the transaction
+rolls back, giving back whatever the earlier lines took.
+
+Reservations are held for STOCK_RESERVATION_TIMEOUT seconds. Payment
+commits them (orders_paid); cancellation or a failed payment releases them
+(orders_cancelled), as does the expiry sweep for orders left unpaid.
+Releasing flips each reservation with a conditional UPDATE too, so a
+reservation is given back once however many releases race.
+"""
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_init, post_save
+from django.utils import timezone
+
+from .models import Order, Product, StockReservation
+from .signals import orders_cancelled, orders_paid
+
+logger = logging.getLogger(__name__)
+
+
+class OutOfStock(Exception):
+    def __init__(self, product, available):
+        self.product = product
+        self.available = available
+        super().__init__(
+            f"Only {available} of {product.name} left in stock." if available
+            else f"{product.name} is out of stock."
+        )
+
+
+def take(product_id, quantity):
+    """Decrement stock if at least ``quantity`` is left; True if it was"""
+    return bool(
+        Product.objects.filter(pk=product_id, stock__gte=quantity).update(stock=F('stock') - quantity)
+    )
+
+
+def reserve(order, items):
+    """
+    Reserve stock for the physical products among ``items``, (product,
+    quantity) pairs, or raise OutOfStock. Must run inside the transaction
+    that creates ``order``.
+    """
+    quantities = Counter()
+    products = {}
+    for product, quantity in items:
+        if product is not None and not product.is_digital:
+            quantities[product.pk] += quantity
+            products[product.pk] = product
+    if not quantities:
+        return []
+
+    # In id order, so two checkouts sharing products lock them in the same order
+    for product_id, quantity in sorted(quantities.items()):
+        if not take(product_id, quantity):
+            available = Product.objects.filter(pk=product_id).values_list('stock', flat=True).first() or 0
+            raise OutOfStock(products[product_id], available)
+
+    expires_at = timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_TIMEOUT)
+    reservations = StockReservation.objects.bulk_create([
+        StockReservation(order=order, product_id=product_id, quantity=quantity, expires_at=expires_at)
+        for product_id, quantity in quantities.items()
+    ])
+    transaction.on_commit(lambda: schedule_expiry(expires_at))
+    return reservations
+
+
+def _release(reservations):
+    """Give back the stock of the held ``reservations``; returns the units released"""
+    released = 0
+    for pk, product_id, quantity in list(reservations.filter(status='held').values_list('pk', 'product_id', 'quantity')):
+        with transaction.atomic():
+            # Only the release that flips the row gives the stock back
+            if StockReservation.objects.filter(pk=pk, status='held').update(status='released'):
+                Product.objects.filter(pk=product_id).update(stock=F('stock') + quantity)
+                released += quantity
+    return released
+
+
+def release(order_ids):
+    """Release the held stock of cancelled or failed orders"""
+    return _release(StockReservation.objects.filter(order_id__in=order_ids))
+
+
+def expire(now=None):
+    """Release reservations still held (unpaid) past their expiry"""
+    return _release(StockReservation.objects.filter(expires_at__lte=now or timezone.now()))
+
+
+def commit(order_ids):
+    """
+    Keep the stock of paid orders. A reservation that expired before the
+    payment arrived is taken again if stock allows; otherwise the order is
+    logged as oversold for someone to sort out.
+    """
+    StockReservation.objects.filter(order_id__in=order_ids, status='held').update(status='committed')
+    expired = StockReservation.objects.filter(order_id__in=order_ids, status='released').select_related('order')
+    for reservation in list(expired):
+        with transaction.atomic():
+            if take(reservation.product_id, reservation.quantity):
+                StockReservation.objects.filter(pk=reservation.pk).update(status='committed')
+            else:
+                logger.warning(
+                    'Order %s was paid after its reservation of %s x product %s expired, and stock has run out',
+                    reservation.order.order_number, reservation.quantity, reservation.product_id,
+                )
+
+
+def schedule_expiry(expires_at):
+    """Queue a sweep just after ``expires_at``, at most one per minute"""
+    from .tasks import expire_stock_reservations
+
+    minute = expires_at.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    if cache.add(f'shop-stock-sweep:{minute.isoformat()}', True, settings.STOCK_RESERVATION_TIMEOUT + 120):
+        expire_stock_reservations.schedule(minute)
+
+
+# Receivers ----------------------------------------------------------------
+
+def is_cancelled(order):
+    return order.status == 'cancelled' or order.payment_status == 'failed'
+
+
+def _on_orders_paid(sender, order_ids, **kwargs):
+    commit(order_ids)
+
+
+def _on_orders_cancelled(sender, order_ids, **kwargs):
+    release(order_ids)
+
+
+def _remember_cancelled(sender, instance, **kwargs):
+    state = instance.__dict__
+    instance._loaded_cancelled = state.get('status') == 'cancelled' or state.get('payment_status') == 'failed'
+
+
+def _on_order_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    was_cancelled = not created and getattr(instance, '_loaded_cancelled', False)
+    instance._loaded_cancelled = is_cancelled(instance)
+    if instance._loaded_cancelled and not was_cancelled:
+        orders_cancelled.send(sender=Order, order_ids=[instance.pk])
+
+
+def connect():
+    orders_paid.connect(_on_orders_paid, dispatch_uid='shop-stock-paid')
+    orders_cancelled.connect(_on_orders_cancelled, dispatch_uid='shop-stock-cancelled')
+    post_init.connect(_remember_cancelled, sender=Order, dispatch_uid='shop-order-loaded-cancelled')
+    post_save.connect(_on_order_saved, sender=Order, dispatch_uid='shop-order-saved-cancelled')
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.mail import send_mail
+from django.urls import reverse
+
+from tasks.queue import task
+
+from . import stock
+from .downloads import make_download_token
+from .models import Order
+from .signals import orders_paid
+
+
+@task
+def send_order_confirmation(order_id):
+    """Email the customer a summary of a new order"""
+    order = Order.objects.prefetch_related('items').filter(pk=order_id).first()
+    if order is None:
+        return
+
+    lines = [f"Hi {order.customer_name},", "", f"Thanks for your order {order.order_number}.", ""]
+    for item in order.items.all():
+        lines.append(f"  {item.product_name} x {item.quantity}  ${item.total:.2f}")
+    if order.discount:
+        lines.append(f"  Discount  -${order.discount:.2f}")
+    lines += [
+        f"  Total  ${order.total:.2f}",
+        "",
+        "We'll email your download link as soon as payment is confirmed.",
+        f"{settings.SITE_URL}/shop",
+    ]
+    send_mail(
+        f"Order confirmation {order.order_number}",
+        "\n".join(lines),
+        settings.DEFAULT_FROM_EMAIL,
+        [order.customer_email],
+    )
+
+
+@task
+def send_payment_confirmation(order_id):
+    """Confirm payment and email the download link, the only place a paid customer gets one"""
+    order = Order.objects.prefetch_related('items__product').filter(pk=order_id, payment_status='paid').first()
+    if order is None:
+        return
+
+    lines = [f"Hi {order.customer_name},", "", f"We've received your payment for order {order.order_number}."]
+    digital = [item.product_name for item in order.items.all() if item.product and item.product.is_digital]
+    if digital:
+        path = reverse('orders-download', kwargs={'order_number': order.order_number})
+        days = settings.DOWNLOAD_TOKEN_MAX_AGE // 86400
+        lines += [
+            "",
+            "Your downloads:",
+            *(f"  {name}" for name in digital),
+            "",
+            f"{settings.API_URL}{path}?token={make_download_token(order.order_number)}",
+            "",
+            f"The link works for {days} days and up to {order.max_downloads} downloads.",
+        ]
+    send_mail(
+        f"Payment received {order.order_number}",
+        "\n".join(lines),
+        settings.DEFAULT_FROM_EMAIL,
+        [order.customer_email],
+    )
+
+
+@task
+def expire_stock_reservations():
+    """Give back the stock of reservations left unpaid past their expiry"""
+    stock.expire()
+
+
+def _on_orders_paid(sender, order_ids, **kwargs):
+    for order_id in order_ids:
+        send_payment_confirmation.delay(order_id)
+
+
+def connect():
+    orders_paid.connect(_on_orders_paid, dispatch_uid='shop-payment-confirmation')
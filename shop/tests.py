@@ -1,9 +1,14 @@
-from django.test import TestCase
+from django.contrib.admin.sites import AdminSite
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from decimal import Decimal
-from .models import Product, ProductCategory, Order, OrderItem
+from .admin import OrderAdmin, ProductReviewAdmin
+from .models import Product, ProductCategory, Order, OrderItem, ProductReview, StockReservation
+from .downloads import make_download_token, verify_download_token
 
 
 class ProductModelTest(TestCase):
@@ -130,3 +135,738 @@ class OrderAPITest(APITestCase):
         response = self.client.post(url, data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OrderDownloadTest(APITestCase):
+    """Test the async order download view"""
+    
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='LUT Pack',
+            slug='lut-pack',
+            description='Test description',
+            price=Decimal('10.00'),
+            file='shop/downloads/luts.zip'
+        )
+        self.order = Order.objects.create(
+            order_number='ORD1',
+            customer_name='John Doe',
+            customer_email='john@example.com',
+            subtotal=Decimal('10.00'),
+            total=Decimal('10.00'),
+            payment_status='paid',
+            max_downloads=1
+        )
+        OrderItem.objects.create(order=self.order, product=self.product, product_name='LUT Pack', price=Decimal('10.00'))
+        self.url = reverse('orders-download', kwargs={'order_number': 'ORD1'})
+    
+    def test_download_with_valid_token(self):
+        """Test a valid token returns links and uses up a download"""
+        response = self.client.get(self.url, {'token': make_download_token('ORD1')})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['remaining_downloads'], 0)
+        self.assertEqual(len(response.json()['downloads']), 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.download_count, 1)
+    
+    def test_download_limit(self):
+        """Test downloads stop once max_downloads is reached"""
+        token = make_download_token('ORD1')
+        self.client.get(self.url, {'token': token})
+        response = self.client.get(self.url, {'token': token})
+        
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_download_with_invalid_token(self):
+        """Test forged, tampered, expired and wrong-order tokens are rejected without a query"""
+        token = make_download_token('ORD1')
+        other = make_download_token('ORD2')
+        expired = make_download_token('ORD1', max_age=-1)
+        for bad in ('', 'wrong', token[:-1] + ('A' if token[-1] != 'A' else 'B'), other, expired):
+            with self.subTest(token=bad), self.assertNumQueries(0):
+                response = self.client.get(self.url, {'token': bad})
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.download_count, 0)
+    
+    def test_product_scoped_token(self):
+        """Test a token issued for one product only returns that product"""
+        other = Product.objects.create(name='Presets', slug='presets', description='Test description',
+                                       price=Decimal('5.00'), file='shop/downloads/presets.zip')
+        OrderItem.objects.create(order=self.order, product=other, product_name='Presets', price=Decimal('5.00'))
+        
+        response = self.client.get(self.url, {'token': make_download_token('ORD1', product_id=other.pk)})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([d['product'] for d in response.json()['downloads']], ['Presets'])
+    
+    def test_serialized_token_verifies(self):
+        """Test the token in the order receipt opens the download"""
+        from .serializers import OrderReceiptSerializer
+        token = OrderReceiptSerializer(self.order).data['download_token']
+        self.assertEqual(verify_download_token(token, 'ORD1')['o'], 'ORD1')
+        self.assertIsNone(verify_download_token(token, 'ORD2'))
+
+    def test_order_api_does_not_mint_tokens(self):
+        """Test listing or retrieving orders, which anyone can do, returns no download token"""
+        response = self.client.get(reverse('orders-list'))
+        self.assertNotIn('download_token', response.data['results'][0])
+        response = self.client.get(reverse('orders-detail', kwargs={'order_number': 'ORD1'}))
+        self.assertNotIn('download_token', response.data)
+
+    def test_anonymous_cannot_change_payment_state(self):
+        """Test the order API refuses updates and deletes, so no one can mark an order paid"""
+        from tasks.models import Task
+        order = Order.objects.create(order_number='ORD2', customer_name='Jane', customer_email='jane@example.com',
+                                     subtotal=Decimal('10.00'), total=Decimal('10.00'))
+        url = reverse('orders-detail', kwargs={'order_number': 'ORD2'})
+        payload = {'payment_status': 'paid', 'status': 'cancelled', 'customer_email': 'attacker@example.com'}
+        with self.captureOnCommitCallbacks(execute=True):
+            responses = [self.client.patch(url, payload, format='json'), self.client.put(url, payload, format='json'),
+                         self.client.delete(url)]
+        self.assertEqual({r.status_code for r in responses}, {status.HTTP_405_METHOD_NOT_ALLOWED})
+        order.refresh_from_db()
+        self.assertEqual((order.payment_status, order.status, order.customer_email),
+                         ('pending', 'pending', 'jane@example.com'))
+        self.assertFalse(Task.objects.filter(name='shop.tasks.send_payment_confirmation').exists())
+
+    def test_payment_confirmation_emails_link(self):
+        """Test the payment email carries a working download link"""
+        from django.core import mail
+        from .tasks import send_payment_confirmation
+        send_payment_confirmation(self.order.pk)
+        self.assertEqual(mail.outbox[0].to, ['john@example.com'])
+        with self.settings(API_URL='https://api.example.com', SITE_URL='https://example.com'):
+            send_payment_confirmation(self.order.pk)
+        self.assertIn('https://api.example.com/api/shop/orders/ORD1/download/?token=', mail.outbox[1].body)
+        token = mail.outbox[0].body.split('?token=')[1].split()[0]
+        self.assertEqual(verify_download_token(token, 'ORD1')['o'], 'ORD1')
+
+    def test_payment_queues_confirmation(self):
+        """Test an order becoming paid queues the payment email"""
+        from tasks.models import Task
+        order = Order.objects.create(order_number='ORD2', customer_name='Jane', customer_email='jane@example.com',
+                                     subtotal=Decimal('10.00'), total=Decimal('10.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            order.payment_status = 'paid'
+            order.save()
+        task = Task.objects.get(name='shop.tasks.send_payment_confirmation')
+        self.assertEqual(task.args, [order.pk])
+
+
+class CouponValidateTest(APITestCase):
+    """Test POST /api/shop/coupons/validate/"""
+    
+    def setUp(self):
+        from django.utils import timezone
+        from datetime import timedelta
+        from .models import Coupon
+        now = timezone.now()
+        Coupon.objects.create(
+            code='SAVE10',
+            discount_type='percentage',
+            discount_value=Decimal('10'),
+            valid_from=now - timedelta(days=1),
+            valid_until=now + timedelta(days=1)
+        )
+    
+    def test_validate_coupon(self):
+        """Test a valid coupon returns the discount for the subtotal"""
+        url = reverse('coupon-validate')
+        response = self.client.post(url, {'code': 'save10', 'subtotal': 49.99}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(response.data['discount']), Decimal('4.999'))
+
+
+class BulkAdminActionTest(TestCase):
+    """Test set-based order and review admin actions"""
+
+    def setUp(self):
+        self.request = RequestFactory().post('/')
+        self.products = [
+            Product.objects.create(name=f'Pack {i}', slug=f'pack-{i}', description='Test', price=Decimal('10.00'))
+            for i in range(2)
+        ]
+
+    def run_action(self, admin_class, model, action, queryset):
+        model_admin = admin_class(model, AdminSite())
+        model_admin.message_user = lambda *args, **kwargs: None
+        with CaptureQueriesContext(connection) as queries:
+            getattr(model_admin, action)(self.request, queryset)
+        return len(queries)
+
+    def add_reviews(self, count, rating):
+        ProductReview.objects.bulk_create([
+            ProductReview(product=self.products[i % 2], customer_name='A', customer_email='a@example.com',
+                          rating=rating, title='T', review='R')
+            for i in range(count)
+        ])
+
+    def test_approve_reviews_refreshes_stats(self):
+        """Test approving reviews updates the products' rating stats"""
+        self.add_reviews(4, rating=4)
+        ProductReview.objects.filter(pk=ProductReview.objects.first().pk).update(rating=2)
+        self.run_action(ProductReviewAdmin, ProductReview, 'approve_reviews', ProductReview.objects.all())
+        stats = dict(Product.objects.values_list('slug', 'review_count'))
+        self.assertEqual(stats, {'pack-0': 2, 'pack-1': 2})
+        self.assertEqual(
+            sorted(Product.objects.values_list('rating_average', flat=True)), [Decimal('3.00'), Decimal('4.00')]
+        )
+
+        self.run_action(ProductReviewAdmin, ProductReview, 'unapprove_reviews', ProductReview.objects.all())
+        self.assertEqual(list(Product.objects.values_list('review_count', 'rating_average')), [(0, None), (0, None)])
+
+    def test_single_review_save_refreshes_stats(self):
+        """Test approving one review in the admin form also refreshes stats"""
+        self.add_reviews(1, rating=5)
+        review = ProductReview.objects.get()
+        review.is_approved = True
+        review.save()
+        self.products[0].refresh_from_db()
+        self.assertEqual((self.products[0].review_count, self.products[0].rating_average), (1, Decimal('5.00')))
+
+    def test_review_actions_constant_queries(self):
+        """Test approving reviews costs the same queries for 2 or 40 reviews"""
+        self.add_reviews(2, rating=5)
+        few = self.run_action(ProductReviewAdmin, ProductReview, 'approve_reviews', ProductReview.objects.all())
+        ProductReview.objects.all().delete()
+        self.add_reviews(40, rating=5)
+        many = self.run_action(ProductReviewAdmin, ProductReview, 'approve_reviews', ProductReview.objects.all())
+        self.assertEqual(few, many)
+
+
+class SalesRollupTest(TestCase):
+    """Test the daily sales rollups and the reports built on them"""
+
+    def setUp(self):
+        from django.utils import timezone
+        from .models import Coupon
+        now = timezone.now()
+        self.lut = Product.objects.create(name='LUT Pack', slug='lut-pack', description='Test', price=Decimal('30.00'))
+        self.presets = Product.objects.create(name='Presets', slug='presets', description='Test', price=Decimal('10.00'))
+        self.coupon = Coupon.objects.create(code='SAVE10', discount_type='fixed', discount_value=Decimal('10'),
+                                            valid_from=now, valid_until=now)
+
+    def make_order(self, number, day, coupon=False):
+        """Pending order: 1 x LUT Pack (30) + 2 x Presets (10), optionally $10 off"""
+        discount = Decimal('10.00') if coupon else Decimal('0.00')
+        order = Order.objects.create(
+            order_number=number, customer_name='Ann', customer_email='ann@example.com',
+            subtotal=Decimal('50.00'), discount=discount, total=Decimal('50.00') - discount,
+            coupon=self.coupon if coupon else None,
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=f'{day}T12:00:00Z')
+        OrderItem.objects.create(order=order, product=self.lut, product_name='LUT Pack', price=Decimal('30.00'))
+        OrderItem.objects.create(order=order, product=self.presets, product_name='Presets',
+                                 price=Decimal('10.00'), quantity=2)
+        return Order.objects.get(pk=order.pk)
+
+    def rollups(self):
+        from .models import DailySalesRollup
+        return {
+            (str(row.date), row.dimension, row.label): (row.orders, row.units, row.gross, row.discount, row.net)
+            for row in DailySalesRollup.objects.all()
+        }
+
+    def run_action(self, action, queryset):
+        model_admin = OrderAdmin(Order, AdminSite())
+        model_admin.message_user = lambda *args, **kwargs: None
+        getattr(model_admin, action)(RequestFactory().post('/'), queryset)
+
+    def test_paying_an_order_updates_rollups(self):
+        """Test a paid order is added per day, product and coupon, with the discount shared out"""
+        order = self.make_order('ORD1', '2025-03-01', coupon=True)
+        self.assertEqual(self.rollups(), {})
+        order.payment_status = 'paid'
+        order.save()
+        self.assertEqual(self.rollups(), {
+            ('2025-03-01', 'total', ''): (1, 3, Decimal('50.00'), Decimal('10.00'), Decimal('40.00')),
+            ('2025-03-01', 'coupon', 'SAVE10'): (1, 3, Decimal('50.00'), Decimal('10.00'), Decimal('40.00')),
+            ('2025-03-01', 'product', 'LUT Pack'): (1, 1, Decimal('30.00'), Decimal('6.00'), Decimal('24.00')),
+            ('2025-03-01', 'product', 'Presets'): (1, 2, Decimal('20.00'), Decimal('4.00'), Decimal('16.00')),
+        })
+
+        order.notes = 'Resaved'
+        order.save()
+        self.assertEqual(self.rollups()[('2025-03-01', 'total', '')][0], 1)
+
+    def test_refund_subtracts(self):
+        """Test refunding takes the order back out of the rollups"""
+        self.make_order('ORD1', '2025-03-01')
+        order = self.make_order('ORD2', '2025-03-01')
+        for number in ('ORD1', 'ORD2'):
+            order = Order.objects.get(order_number=number)
+            order.payment_status = 'paid'
+            order.save()
+        order.payment_status = 'refunded'
+        order.save()
+        rollups = self.rollups()
+        self.assertEqual(rollups[('2025-03-01', 'total', '')],
+                         (1, 3, Decimal('50.00'), Decimal('0.00'), Decimal('50.00')))
+        order = Order.objects.get(order_number='ORD1')
+        order.payment_status = 'refunded'
+        order.save()
+        self.assertEqual(self.rollups(), {})
+
+    def test_stale_or_partial_saves_do_not_double_count(self):
+        """Test racing saves, deferred loads and update_fields saves count a payment once"""
+        order = self.make_order('ORD1', '2025-03-01')
+        first, second = Order.objects.get(pk=order.pk), Order.objects.get(pk=order.pk)
+        for copy in (first, second):
+            copy.payment_status = 'paid'
+            copy.save()
+        self.assertEqual(self.rollups()[('2025-03-01', 'total', '')][0], 1)
+
+        deferred = Order.objects.defer('payment_status').get(pk=order.pk)
+        deferred.notes = 'Resaved'
+        deferred.save()
+        second.notes = 'Resaved'
+        second.save(update_fields=['notes'])
+        self.assertEqual(self.rollups()[('2025-03-01', 'total', '')][0], 1)
+
+        first.payment_status = 'refunded'
+        first.save(update_fields=['payment_status'])
+        second.payment_status = 'refunded'
+        second.save()
+        self.assertEqual(self.rollups(), {})
+
+    def test_failed_save_rolls_back_the_claim(self):
+        """Test a save that fails after claiming the payment leaves the order unpaid, to be counted later"""
+        from unittest import mock
+        from django.db import DatabaseError
+        order = self.make_order('ORD1', '2025-03-01')
+        order.payment_status = 'paid'
+        with mock.patch.object(Order, '_do_update', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                order.save()
+        self.assertEqual(Order.objects.get(pk=order.pk).payment_status, 'pending')
+        order.save()
+        self.assertEqual(self.rollups()[('2025-03-01', 'total', '')][0], 1)
+
+    def test_only_admin_or_payment_moves_rollups(self):
+        """Test the public order API can't mark orders paid or refunded; the admin action can"""
+        order = self.make_order('ORD1', '2025-03-01')
+        url = reverse('orders-detail', kwargs={'order_number': 'ORD1'})
+        for payment_status in ('paid', 'refunded', 'paid'):
+            response = self.client.patch(url, {'payment_status': payment_status}, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        response = self.client.post(reverse('orders-list'), {
+            'customer_name': 'Ann', 'customer_email': 'ann@example.com', 'payment_status': 'paid',
+            'items': [{'product': self.presets.pk, 'product_name': 'Presets', 'price': '10.00', 'quantity': 1}],
+        }, content_type='application/json')
+        self.assertEqual(response.data['order']['payment_status'], 'pending')
+        self.assertEqual(self.rollups(), {})
+
+        self.run_action('mark_as_paid', Order.objects.filter(pk=order.pk))
+        self.assertEqual(self.rollups()[('2025-03-01', 'total', '')][0], 1)
+
+    def test_bulk_admin_actions(self):
+        """Test the bulk paid/refunded actions update the rollups once per order"""
+        for i, day in enumerate(['2025-03-01', '2025-03-01', '2025-03-02']):
+            self.make_order(f'ORD{i}', day)
+        self.run_action('mark_as_paid', Order.objects.all())
+        self.run_action('mark_as_paid', Order.objects.all())
+        rollups = self.rollups()
+        self.assertEqual(rollups[('2025-03-01', 'total', '')][0], 2)
+        self.assertEqual(rollups[('2025-03-02', 'total', '')][0], 1)
+
+        self.run_action('mark_as_refunded', Order.objects.filter(order_number='ORD0'))
+        self.assertEqual(self.rollups()[('2025-03-01', 'product', 'Presets')][:2], (1, 2))
+        self.assertEqual(Order.objects.get(order_number='ORD0').payment_status, 'refunded')
+
+    def test_rebuild_matches_incremental(self):
+        """Test rebuilding in chunks reproduces the incrementally maintained rollups"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import DailySalesRollup
+        for i, day in enumerate(['2025-01-30', '2025-02-01', '2025-02-03', '2025-02-03']):
+            self.make_order(f'ORD{i}', day, coupon=i % 2)
+        self.run_action('mark_as_paid', Order.objects.exclude(order_number='ORD3'))
+        expected = self.rollups()
+
+        DailySalesRollup.objects.update(net=0)
+        DailySalesRollup.objects.create(date='2024-01-01', dimension='total', orders=9)
+        out = StringIO()
+        call_command('rebuild_sales_rollups', chunk_days=2, stdout=out)
+        self.assertEqual(self.rollups(), expected)
+        self.assertIn('in 3 chunk(s)', out.getvalue())
+
+    def test_report_reads_only_rollups(self):
+        """Test the sales API answers from the rollups without touching orders"""
+        from django.contrib.auth.models import User
+        for i, day in enumerate(['2024-12-31', '2025-01-15', '2025-01-20']):
+            self.make_order(f'ORD{i}', day, coupon=i == 2)
+        self.run_action('mark_as_paid', Order.objects.all())
+        url = reverse('sales-report')
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_login(User.objects.create_user('staff', password='pass', is_staff=True))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'since': '2024-01-01', 'until': '2025-12-31'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([q['sql'] for q in queries if 'shop_order' in q['sql']])
+
+        data = response.json()
+        self.assertEqual([(row['period'], row['orders'], row['net']) for row in data['series']],
+                         [('2024-12-01', 1, '50.00'), ('2025-01-01', 2, '90.00')])
+        self.assertEqual(data['totals']['net'], '140.00')
+        self.assertEqual([row['name'] for row in data['products']], ['LUT Pack', 'Presets'])
+        self.assertEqual(data['coupons'][0]['discount'], '10.00')
+
+        response = self.client.get(url, {'interval': 'fortnight'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_dashboard(self):
+        """Test the admin dashboard renders from the rollups"""
+        from django.contrib.auth.models import User
+        from django.utils import timezone
+        order = self.make_order('ORD1', timezone.localdate().isoformat())
+        order.payment_status = 'paid'
+        order.save()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        response = self.client.get(reverse('admin:shop_dailysalesrollup_dashboard'))
+        self.assertContains(response, 'Net revenue by month')
+        self.assertContains(response, 'LUT Pack')
+
+
+class BestsellerTest(TestCase):
+    """Test the bestseller rankings, endpoint and ordering=popular"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.products = {
+            slug: Product.objects.create(name=slug.title(), slug=slug, description='Test', price=Decimal('10.00'))
+            for slug in ('luts', 'presets', 'overlays', 'unsold')
+        }
+
+    def sell(self, slug, quantity, days_ago, number):
+        from datetime import timedelta
+        from django.utils import timezone
+        order = Order.objects.create(order_number=number, customer_name='Ann', customer_email='ann@example.com',
+                                     subtotal=Decimal('10.00') * quantity, total=Decimal('10.00') * quantity)
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        OrderItem.objects.create(order=order, product=self.products[slug], product_name=slug,
+                                 price=Decimal('10.00'), quantity=quantity)
+        order = Order.objects.get(pk=order.pk)
+        order.payment_status = 'paid'
+        order.save()
+        return order
+
+    def bestsellers(self, **params):
+        from django.core.cache import cache
+        cache.clear()  # cache_page
+        response = self.client.get(reverse('product-bestsellers'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(item['slug'], item['units_sold']) for item in response.json()]
+
+    def test_windows(self):
+        """Test each window counts only the paid units sold inside it"""
+        self.sell('luts', 1, 1, 'ORD1')
+        self.sell('presets', 3, 10, 'ORD2')
+        self.sell('overlays', 5, 60, 'ORD3')
+        self.sell('overlays', 9, 120, 'ORD4')
+
+        self.assertEqual(self.bestsellers(window=7), [('luts', 1)])
+        self.assertEqual(self.bestsellers(), [('presets', 3), ('luts', 1)])
+        self.assertEqual(self.bestsellers(window=90), [('overlays', 5), ('presets', 3), ('luts', 1)])
+        response = self.client.get(reverse('product-bestsellers'), {'window': 14})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refunds_and_payments_update_rankings(self):
+        """Test order events refresh the rankings of the products involved"""
+        self.sell('luts', 2, 1, 'ORD1')
+        order = self.sell('presets', 3, 1, 'ORD2')
+        self.assertEqual(self.bestsellers(window=7), [('presets', 3), ('luts', 2)])
+        order.payment_status = 'refunded'
+        order.save()
+        self.assertEqual(self.bestsellers(window=7), [('luts', 2)])
+
+    def test_public_api_does_not_move_rankings(self):
+        """Test anonymous paid/refunded PATCHes neither rank nor unrank a product"""
+        from .models import ProductRanking
+        order = self.sell('luts', 2, 1, 'ORD1')
+        pending = Order.objects.create(order_number='ORD2', customer_name='Ann', customer_email='ann@example.com',
+                                       subtotal=Decimal('30.00'), total=Decimal('30.00'))
+        OrderItem.objects.create(order=pending, product=self.products['presets'], product_name='presets',
+                                 price=Decimal('10.00'), quantity=3)
+        for number, payment_status in (('ORD1', 'refunded'), ('ORD2', 'paid')):
+            response = self.client.patch(reverse('orders-detail', kwargs={'order_number': number}),
+                                         {'payment_status': payment_status}, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(self.bestsellers(window=7), [('luts', 2)])
+        self.assertEqual(set(ProductRanking.objects.values_list('product__slug', flat=True)), {'luts'})
+        order.refresh_from_db()
+        self.assertEqual(order.payment_status, 'paid')
+
+    def test_served_from_rankings(self):
+        """Test requests, daily refresh included, read rankings and rollups, not orders"""
+        self.sell('luts', 2, 1, 'ORD1')
+        for url, params in ((reverse('product-bestsellers'), {}), (reverse('product-list'), {'ordering': 'popular'})):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url, params)
+            self.assertFalse([q['sql'] for q in queries if 'shop_orderitem' in q['sql'] or 'shop_order"' in q['sql']])
+
+    def test_daily_rollover(self):
+        """Test the first read of a day slides the windows without an order event"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .rankings import ensure_current, refresh
+        from .models import ProductRanking
+        self.sell('luts', 2, 8, 'ORD1')
+        refresh(today=timezone.localdate() - timedelta(days=2))
+        self.assertEqual(ProductRanking.objects.get(window=7).units, 2)
+        ensure_current()
+        self.assertFalse(ProductRanking.objects.filter(window=7).exists())
+        self.assertEqual(ProductRanking.objects.get(window=30).units, 2)
+
+    def test_ordering_popular(self):
+        """Test ordering=popular lists best sellers first, then the rest in the usual order"""
+        self.sell('overlays', 1, 2, 'ORD1')
+        self.sell('presets', 4, 2, 'ORD2')
+        response = self.client.get(reverse('product-list'), {'ordering': 'popular'})
+        slugs = [item['slug'] for item in response.json()['results']]
+        self.assertEqual(slugs[:2], ['presets', 'overlays'])
+        self.assertEqual(sorted(slugs[2:]), ['luts', 'unsold'])
+
+
+class StockReservationTest(APITestCase):
+    """Test stock reservation at checkout, release, commit and expiry"""
+
+    def setUp(self):
+        from core.throttling import throttle_cache
+        throttle_cache().clear()  # Order throttle
+        self.tripod = Product.objects.create(name='Tripod', slug='tripod', description='Test', price=Decimal('80.00'),
+                                             is_digital=False, stock=5)
+        self.bag = Product.objects.create(name='Camera Bag', slug='bag', description='Test', price=Decimal('40.00'),
+                                          is_digital=False, stock=1)
+        self.luts = Product.objects.create(name='LUTs', slug='luts', description='Test', price=Decimal('20.00'))
+
+    def checkout(self, *lines):
+        items = [{'product': product.pk, 'product_name': product.name, 'price': str(product.price), 'quantity': quantity}
+                 for product, quantity in lines]
+        return self.client.post(reverse('orders-list'), {
+            'customer_name': 'Ann', 'customer_email': 'ann@example.com', 'items': items,
+        }, format='json')
+
+    def stock(self):
+        return {p.slug: p.stock for p in Product.objects.filter(is_digital=False)}
+
+    def test_checkout_reserves_physical_stock(self):
+        """Test that checkout decrements stock for physical products only"""
+        response = self.checkout((self.tripod, 2), (self.luts, 1), (self.tripod, 1))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.stock(), {'tripod': 2, 'bag': 1})
+        reservation = StockReservation.objects.get()
+        self.assertEqual((reservation.product, reservation.quantity, reservation.status), (self.tripod, 3, 'held'))
+
+    def test_short_line_rolls_back_the_whole_order(self):
+        """Test that one uncovered line leaves stock, orders and coupons untouched"""
+        response = self.checkout((self.tripod, 2), (self.bag, 2))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['items'], ['Only 1 of Camera Bag left in stock.'])
+        self.assertEqual(self.stock(), {'tripod': 5, 'bag': 1})
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_coupon_use_counted_in_one_update(self):
+        """Test that checkout counts the coupon with an F() update and stops at max_uses"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import Coupon
+        now = timezone.now()
+        coupon = Coupon.objects.create(code='ONCE', discount_type='fixed', discount_value=Decimal('5'), max_uses=1,
+                                       valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1))
+        response = self.client.post(reverse('orders-list'), {
+            'customer_name': 'Ann', 'customer_email': 'ann@example.com', 'coupon_code': 'once',
+            'items': [{'product': self.tripod.pk, 'product_name': 'Tripod', 'price': '80.00', 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.times_used, 1)
+
+        # A second checkout that validated the coupon before the first one used it up
+        from .serializers import use_coupon
+        self.assertFalse(use_coupon(coupon))
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.times_used, 1)
+
+    def test_cancel_and_payment_failure_release_stock(self):
+        """Test that cancelling or failing payment gives the stock back exactly once"""
+        first = Order.objects.get(order_number=self.checkout((self.tripod, 2)).data['order']['order_number'])
+        second = Order.objects.get(order_number=self.checkout((self.tripod, 3)).data['order']['order_number'])
+        self.assertEqual(self.stock()['tripod'], 0)
+
+        first.status = 'cancelled'
+        first.save()
+        first.save()
+        self.assertEqual(self.stock()['tripod'], 2)
+        second.payment_status = 'failed'
+        second.save()
+        self.assertEqual(self.stock()['tripod'], 5)
+        self.assertEqual(set(StockReservation.objects.values_list('status', flat=True)), {'released'})
+
+    def test_public_api_cannot_release_or_commit_stock(self):
+        """Test anonymous cancel or paid PATCHes are refused and leave the reservation held"""
+        number = self.checkout((self.tripod, 2)).data['order']['order_number']
+        url = reverse('orders-detail', kwargs={'order_number': number})
+        for payload in ({'status': 'cancelled'}, {'payment_status': 'paid'}):
+            response = self.client.patch(url, payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(self.stock()['tripod'], 3)
+        self.assertEqual(set(StockReservation.objects.values_list('status', flat=True)), {'held'})
+
+    def test_admin_cancel_action(self):
+        """Test the bulk cancel action releases every selected order's stock"""
+        self.checkout((self.tripod, 2))
+        self.checkout((self.tripod, 1), (self.bag, 1))
+        model_admin = OrderAdmin(Order, AdminSite())
+        model_admin.message_user = lambda *args, **kwargs: None
+        model_admin.mark_as_cancelled(RequestFactory().post('/'), Order.objects.all())
+        self.assertEqual(self.stock(), {'tripod': 5, 'bag': 1})
+
+    def test_payment_commits_and_expiry_releases_the_rest(self):
+        """Test that paid reservations survive the expiry sweep and unpaid ones don't"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .stock import expire
+        paid = Order.objects.get(order_number=self.checkout((self.tripod, 2)).data['order']['order_number'])
+        self.checkout((self.tripod, 3))
+        paid.payment_status = 'paid'
+        paid.save()
+
+        self.assertEqual(expire(), 0)
+        self.assertEqual(expire(timezone.now() + timedelta(hours=1)), 3)
+        self.assertEqual(self.stock()['tripod'], 3)
+        self.assertEqual(paid.reservations.get().status, 'committed')
+
+    def test_payment_after_expiry_takes_stock_again(self):
+        """Test that a late payment re-reserves expired stock if any is left"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .stock import expire
+        order = Order.objects.get(order_number=self.checkout((self.bag, 1)).data['order']['order_number'])
+        expire(timezone.now() + timedelta(hours=1))
+        self.assertEqual(self.stock()['bag'], 1)
+        order.payment_status = 'paid'
+        order.save()
+        self.assertEqual(self.stock()['bag'], 0)
+        self.assertEqual(order.reservations.get().status, 'committed')
+
+    def test_expiry_sweep_is_scheduled(self):
+        """Test that checkout queues one expiry sweep per minute of expiries"""
+        from tasks.models import Task
+        with self.captureOnCommitCallbacks(execute=True):
+            self.checkout((self.tripod, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.checkout((self.tripod, 1))
+        task = Task.objects.get(name='shop.tasks.expire_stock_reservations')
+        self.assertGreater(task.run_at, StockReservation.objects.first().expires_at)
+
+
+class StockConcurrencyTest(TransactionTestCase):
+    """Test that concurrent checkouts never oversell"""
+
+    def test_hundred_buyers_ten_units(self):
+        """Test 100 simultaneous buyers of a product with 10 in stock: 10 orders, stock 0"""
+        import random
+        import threading
+        import time
+        from unittest import mock
+        from django.db import OperationalError, close_old_connections
+        from rest_framework.exceptions import ValidationError
+        from .serializers import OrderCreateSerializer
+
+        product = Product.objects.create(name='Tripod', slug='tripod', description='Test', price=Decimal('80.00'),
+                                         is_digital=False, stock=10)
+        payload = {'customer_name': 'Ann', 'customer_email': 'ann@example.com', 'items': [
+            {'product': product.pk, 'product_name': 'Tripod', 'price': '80.00', 'quantity': 1},
+        ]}
+        start = threading.Barrier(100)
+        results = []
+
+        def buy():
+            try:
+                serializer = OrderCreateSerializer(data=payload)
+                serializer.is_valid(raise_exception=True)
+                start.wait()
+                for _ in range(500):
+                    try:
+                        serializer.save()
+                    except ValidationError:
+                        results.append('sold out')
+                    except OperationalError:
+                        # The in-memory SQLite test database reports a locked
+                        # table instead of waiting for it; back off and retry
+                        time.sleep(random.uniform(0.001, 0.05))
+                        continue
+                    else:
+                        results.append('bought')
+                    return
+                # Still locked out after ~12s: a locking regression, not contention
+                results.append('gave up')
+            finally:
+                close_old_connections()
+
+        buyers = [threading.Thread(target=buy) for _ in range(100)]
+        # Queuing the expiry sweep after commit would be one more contended write
+        with mock.patch('shop.stock.schedule_expiry'):
+            for buyer in buyers:
+                buyer.start()
+            for buyer in buyers:
+                buyer.join()
+
+        product.refresh_from_db()
+        self.assertEqual(results.count('gave up'), 0)
+        self.assertEqual(results.count('bought'), 10)
+        self.assertEqual(results.count('sold out'), 90)
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(Order.objects.count(), 10)
+        self.assertEqual(sum(StockReservation.objects.values_list('quantity', flat=True)), 10)
+
+
+class ProductFacetTest(APITestCase):
+    """Test GET /api/shop/products/facets/"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.luts = ProductCategory.objects.create(name='LUTs', slug='luts')
+        self.gear = ProductCategory.objects.create(name='Gear', slug='gear')
+        for slug, category, digital, active in [
+            ('film', self.luts, True, True),
+            ('teal', self.luts, True, True),
+            ('tripod', self.gear, False, True),
+            ('retired', self.gear, False, False),
+        ]:
+            Product.objects.create(name=slug, slug=slug, description='Test', price=Decimal('10.00'),
+                                   category=category, is_digital=digital, is_active=active)
+
+    def facets(self, **params):
+        response = self.client.get(reverse('product-facets'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {name: {row['value']: row['count'] for row in rows} for name, rows in response.json().items()}
+
+    def test_counts_honor_other_filters(self):
+        """Test active product counts per category and type, each ignoring only its own filter"""
+        self.assertEqual(self.facets(), {'categories': {'luts': 2, 'gear': 1}, 'types': {'digital': 2, 'physical': 1}})
+        self.assertEqual(self.facets(type='physical'), {'categories': {'gear': 1}, 'types': {'digital': 2, 'physical': 1}})
+        self.assertEqual(self.facets(category='luts')['types'], {'digital': 2})
+        self.assertEqual(len(self.client.get(reverse('product-list'), {'type': 'physical'}).json()['results']), 1)
+
+    def test_cached_until_products_change(self):
+        """Test that counts are cached and invalidated by product saves, but not stock changes"""
+        self.facets()
+        with self.assertNumQueries(0):
+            self.facets()
+        tripod = Product.objects.get(slug='tripod')
+        tripod.stock = 3
+        tripod.save(update_fields=['stock'])
+        with self.assertNumQueries(0):
+            self.facets()
+        retired = Product.objects.get(slug='retired')
+        retired.is_active = True
+        retired.save()
+        self.assertEqual(self.facets()['categories'], {'luts': 2, 'gear': 2})
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProductCategoryViewSet, ProductViewSet, OrderViewSet, CouponValidateView
+from .views import ProductCategoryViewSet, ProductViewSet, OrderViewSet, CouponValidateView, SalesReportView, order_download
 
 router = DefaultRouter()
 router.register(r'categories', ProductCategoryViewSet)
@@ -8,6 +8,9 @@ router.register(r'products', ProductViewSet)
 router.register(r'orders', OrderViewSet, basename='orders')
 
 urlpatterns = [
+    # Plain async Django view, so it lives outside the DRF router
+    path('orders/<str:order_number>/download/', order_download, name='orders-download'),
     path('', include(router.urls)),
     path('coupons/validate/', CouponValidateView.as_view(), name='coupon-validate'),
+    path('sales/', SalesReportView.as_view(), name='sales-report'),
 ]
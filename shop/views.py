@@ -1,21 +1,34 @@
-from rest_framework import viewsets, status, generics
+from decimal import Decimal, InvalidOperation
+from rest_framework import mixins, viewsets, status, generics, permissions, views
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.http import FileResponse, Http404
+from django.db.models import F
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.views.decorators.cache import cache_page
 from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_GET
 from django.conf import settings
+from django.utils import timezone
+from core.db_router import use_primary
+from core.exports import parse_date
+from core.facets import value_counts
+from .downloads import verify_download_token
+from .facets import products as product_facets
+from .rankings import DEFAULT_WINDOW, WINDOWS, bestsellers, order_by_popularity
+from .sales import CENT, INTERVALS, sales_series, sales_totals, top_sellers
 from .models import ProductCategory, Product, Order, OrderItem, Coupon, ProductReview
 from .serializers import (
     ProductCategorySerializer,
     ProductListSerializer,
     ProductDetailSerializer,
     OrderSerializer,
+    OrderReceiptSerializer,
     OrderCreateSerializer,
     CouponSerializer,
     ProductReviewSerializer
 )
+from .tasks import send_order_confirmation
 
 # Cache timeout from settings
 CACHE_TTL = getattr(settings, 'API_CACHE_TIMEOUT', 300)
@@ -34,6 +47,7 @@ class ProductCategoryViewSet(viewsets.ReadOnlyModelViewSet):
 class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Product.objects.filter(is_active=True).select_related('category').prefetch_related('features', 'images', 'reviews')
     lookup_field = 'slug'
+    throttle_scope = None  # Set per action: review() uses 'reviews'
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -41,10 +55,24 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         return ProductListSerializer
     
     def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True)
-        category = self.request.query_params.get('category')
-        featured = self.request.query_params.get('featured')
-        search = self.request.query_params.get('search')
+        queryset = self.filter_products(Product.objects.filter(is_active=True))
+        ordering = self.request.query_params.get('ordering')
+        
+        if ordering == 'popular':
+            queryset = order_by_popularity(queryset)
+        
+        return queryset
+    
+    def filter_products(self, queryset, skip=None):
+        """Apply the list's query parameter filters, except ``skip``"""
+        params = {
+            name: value for name, value in self.request.query_params.items()
+            if name in product_facets.params and name != skip
+        }
+        category = params.get('category')
+        featured = params.get('featured')
+        search = params.get('search')
+        product_type = params.get('type')
         
         if category:
             queryset = queryset.filter(category__slug=category)
@@ -52,9 +80,25 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(featured=True)
         if search:
             queryset = queryset.filter(name__icontains=search) | queryset.filter(description__icontains=search)
+        if product_type in ('digital', 'physical'):
+            queryset = queryset.filter(is_digital=product_type == 'digital')
         
         return queryset
     
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Active product counts per category and type (digital/physical) for the current filters"""
+        def count():
+            products = Product.objects.filter(is_active=True)
+            types = value_counts(self.filter_products(products, skip='type'), 'is_digital')
+            return {
+                'categories': value_counts(self.filter_products(products, skip='category'), 'category__slug', 'category__name'),
+                'types': [
+                    {'value': 'digital' if row['value'] else 'physical', 'count': row['count']} for row in types
+                ],
+            }
+        return Response(product_facets.get_or_set(request.query_params, count))
+    
     @method_decorator(cache_page(CACHE_TTL))
     @action(detail=False, methods=['get'])
     def featured(self, request):
@@ -62,7 +106,27 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = ProductListSerializer(featured_products, many=True, context={'request': request})
         return Response(serializer.data)
     
-    @action(detail=True, methods=['post'])
+    @method_decorator(cache_page(CACHE_TTL))
+    @action(detail=False, methods=['get'])
+    def bestsellers(self, request):
+        """Best-selling products over the last 7, 30 or 90 days (?window=, default 30)"""
+        try:
+            window = int(request.query_params.get('window', DEFAULT_WINDOW))
+        except ValueError:
+            window = None
+        if window not in WINDOWS:
+            return Response(
+                {'error': f"window must be one of {', '.join(map(str, WINDOWS))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        products = bestsellers(window).select_related('category').prefetch_related('features')[:12]
+        serializer = ProductListSerializer(products, many=True, context={'request': request})
+        data = serializer.data
+        for item, product in zip(data, products):
+            item['units_sold'] = product.units_sold
+        return Response(data)
+    
+    @action(detail=True, methods=['post'], throttle_scope='reviews')
     def review(self, request, slug=None):
         """Submit a review for a product"""
         product = self.get_object()
@@ -77,9 +141,18 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(mixins.CreateModelMixin,
+                   mixins.ListModelMixin,
+                   mixins.RetrieveModelMixin,
+                   viewsets.GenericViewSet):
+    """
+    Anyone can place an order and look one up; nothing else. Status and
+    payment changes come from the admin and the payment flow only, since
+    they release stock, move the sales rollups and email download links.
+    """
     queryset = Order.objects.all()
     lookup_field = 'order_number'
+    throttle_scope = 'orders'
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -97,74 +170,104 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             order = serializer.save()
-            # TODO: Send order confirmation email
+            send_order_confirmation.delay(order.pk)
             # TODO: Process payment (Stripe/PayPal integration)
             return Response(
                 {
                     'message': 'Order created successfully! Check your email for payment instructions.',
-                    'order': OrderSerializer(order).data
+                    'order': OrderReceiptSerializer(order).data
                 },
                 status=status.HTTP_201_CREATED
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    @action(detail=True, methods=['get'])
-    def download(self, request, order_number=None):
-        """Download digital products for an order"""
-        order = self.get_object()
-        token = request.query_params.get('token')
-        
-        if not token or token != order.download_token:
-            return Response(
-                {'error': 'Invalid download token'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        if not order.can_download():
-            return Response(
-                {'error': 'Download limit reached or payment not confirmed'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        # Get digital products from order
-        digital_items = order.items.filter(product__is_digital=True, product__file__isnull=False)
-        
-        if not digital_items.exists():
-            return Response(
-                {'error': 'No digital products in this order'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # For simplicity, return download links
-        # In production, you'd want to serve files securely or create a zip
-        downloads = []
-        for item in digital_items:
-            if item.product and item.product.file:
-                downloads.append({
-                    'product': item.product_name,
-                    'url': request.build_absolute_uri(item.product.file.url)
-                })
-        
-        # Increment download count
-        order.download_count += 1
-        order.save(update_fields=['download_count'])
-        
-        return Response({
-            'downloads': downloads,
-            'remaining_downloads': order.max_downloads - order.download_count
+
+
+@require_GET
+async def order_download(request, order_number):
+    """
+    Download digital products for an order.
+
+    Async so that slow clients wait on the event loop rather than holding a
+    worker thread; all database access goes through the async ORM.
+    """
+    # Checked before any query, so forged or expired tokens cost no DB access
+    claims = verify_download_token(request.GET.get('token'), order_number)
+    if claims is None:
+        return JsonResponse(
+            {'error': 'Invalid or expired download token'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    try:
+        order = await Order.objects.aget(order_number=order_number)
+    except Order.DoesNotExist:
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    if not order.can_download():
+        return JsonResponse(
+            {'error': 'Download limit reached or payment not confirmed'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    # Get digital products from order
+    digital_items = (
+        order.items.filter(product__is_digital=True)
+        .exclude(product__file='')
+        .select_related('product')
+    )
+    if 'p' in claims:
+        digital_items = digital_items.filter(product_id=claims['p'])
+
+    # For simplicity, return download links
+    # In production, you'd want to serve files securely or create a zip
+    downloads = []
+    async for item in digital_items:
+        downloads.append({
+            'product': item.product_name,
+            'url': request.build_absolute_uri(item.product.file.url)
         })
 
+    if not downloads:
+        return JsonResponse(
+            {'error': 'No digital products in this order'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    # Increment in the database so two concurrent downloads can't both take
+    # the last remaining slot
+    updated = await Order.objects.filter(
+        pk=order.pk, download_count__lt=F('max_downloads')
+    ).aupdate(download_count=F('download_count') + 1)
+    if not updated:
+        return JsonResponse(
+            {'error': 'Download limit reached or payment not confirmed'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    return JsonResponse({
+        'downloads': downloads,
+        'remaining_downloads': order.max_downloads - order.download_count - 1
+    })
+
 
 class CouponValidateView(generics.GenericAPIView):
     """Validate a coupon code"""
     serializer_class = CouponSerializer
+    throttle_scope = 'coupons'
     
     def post(self, request):
         code = request.data.get('code', '').upper()
-        subtotal = request.data.get('subtotal', 0)
+        try:
+            subtotal = Decimal(str(request.data.get('subtotal', 0)))
+        except InvalidOperation:
+            return Response(
+                {'error': 'Invalid subtotal'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         try:
-            coupon = Coupon.objects.get(code=code)
+            with use_primary():
+                coupon = Coupon.objects.get(code=code)
             
             if not coupon.is_valid():
                 return Response(
@@ -178,7 +281,7 @@ class CouponValidateView(generics.GenericAPIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            discount = coupon.calculate_discount(float(subtotal))
+            discount = coupon.calculate_discount(subtotal)
             
             return Response({
                 'valid': True,
@@ -193,3 +296,41 @@ class CouponValidateView(generics.GenericAPIView):
                 {'error': 'Invalid coupon code'},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+
+class SalesReportView(views.APIView):
+    """
+    Sales over a date range, read from the daily rollups only: totals, a
+    series per day/week/month/year and the top products and coupons.
+    Staff only. Defaults to the last three years by month.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+        interval = params.get('interval', 'month')
+        if interval not in INTERVALS:
+            return Response(
+                {'error': f"interval must be one of {', '.join(INTERVALS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            until = parse_date(params['until']) if params.get('until') else timezone.localdate()
+            since = parse_date(params['since']) if params.get('since') else until.replace(day=1, year=until.year - 3)
+        except ValueError:
+            return Response({'error': 'Dates must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+        def money(rows):
+            # Strings, like the serializers' decimal fields
+            return [{key: str(Decimal(value).quantize(CENT)) if key in ('gross', 'discount', 'net') else value
+                     for key, value in row.items()} for row in rows]
+
+        return Response({
+            'since': since,
+            'until': until,
+            'interval': interval,
+            'totals': money([sales_totals(since, until)])[0],
+            'series': money(sales_series(since, until, interval)),
+            'products': money(top_sellers('product', since, until)),
+            'coupons': money(top_sellers('coupon', since, until)),
+        })
@@ -1,9 +1,38 @@
+import codecs
+
+from django import forms
 from django.contrib import admin
-from .models import Subscriber
+from django.db import transaction
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from core.admin import PerformanceModelAdmin
+from core.exports import export_actions
+from .exports import SubscriberExport
+from .models import Subscriber, SubscriberImport
+from .tasks import import_subscribers
+
+
+class SubscriberImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV with an "email" column (and optional "name"), or JSON Lines')
+    source = forms.CharField(max_length=50, initial='import', help_text="Stored as each new subscriber's source")
+
+    def clean_file(self):
+        """Reject files that don't start as UTF-8 text; the worker reports later errors"""
+        upload = self.cleaned_data['file']
+        head = next(upload.chunks(64 * 1024), b'')
+        upload.seek(0)
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(head)
+        except UnicodeDecodeError:
+            raise forms.ValidationError('The file is not UTF-8 text. Re-save it as UTF-8 CSV and try again.')
+        return upload
 
 
 @admin.register(Subscriber)
-class SubscriberAdmin(admin.ModelAdmin):
+class SubscriberAdmin(PerformanceModelAdmin):
+    change_list_template = 'admin/subscribers/subscriber/change_list.html'
     list_display = ['email', 'name', 'is_active', 'subscribed_at', 'source']
     list_filter = ['is_active', 'source', 'subscribed_at']
     search_fields = ['email', 'name']
@@ -19,7 +48,7 @@ class SubscriberAdmin(admin.ModelAdmin):
         }),
     )
     
-    actions = ['activate_subscribers', 'deactivate_subscribers']
+    actions = ['activate_subscribers', 'deactivate_subscribers', *export_actions(SubscriberExport())]
     
     def activate_subscribers(self, request, queryset):
         """Bulk activate subscribers"""
@@ -29,11 +58,35 @@ class SubscriberAdmin(admin.ModelAdmin):
     
     def deactivate_subscribers(self, request, queryset):
         """Bulk deactivate subscribers"""
-        from django.utils import timezone
-        count = 0
-        for subscriber in queryset:
-            if subscriber.is_active:
-                subscriber.unsubscribe()
-                count += 1
+        count = queryset.filter(is_active=True).update(is_active=False, unsubscribed_at=timezone.now())
         self.message_user(request, f'{count} subscriber(s) deactivated.')
     deactivate_subscribers.short_description = 'Deactivate selected subscribers'
+
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='subscribers_subscriber_import'),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """Upload a CSV/JSONL list of subscribers"""
+        if not self.has_add_permission(request):
+            return redirect('admin:subscribers_subscriber_changelist')
+        form = SubscriberImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            with transaction.atomic():
+                queued = SubscriberImport.objects.create(
+                    file=upload, filename=upload.name[:255], source=form.cleaned_data['source'],
+                )
+                import_subscribers.delay(queued.pk)
+            self.message_user(request, f'Queued {queued.filename} for import. Progress is shown below.')
+            return redirect('admin:subscribers_subscriber_import')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'title': 'Import subscribers',
+            'imports': SubscriberImport.objects.all()[:10],
+        }
+        return TemplateResponse(request, 'admin/subscribers/subscriber/import.html', context)
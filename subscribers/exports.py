@@ -0,0 +1,17 @@
+from core.exports import Export
+
+from .models import Subscriber
+
+
+class SubscriberExport(Export):
+    name = 'subscribers'
+    model = Subscriber
+    date_field = 'subscribed_at'
+    columns = [
+        ('email', 'email'),
+        ('name', 'name'),
+        ('is_active', 'is_active'),
+        ('source', 'source'),
+        ('subscribed_at', 'subscribed_at'),
+        ('unsubscribed_at', 'unsubscribed_at'),
+    ]
@@ -0,0 +1,40 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from subscribers.importing import FORMATS, ImportFileError, import_file
+
+
+class Command(BaseCommand):
+    help = (
+        'Import newsletter subscribers from a CSV (email[,name] columns) or JSON Lines file. '
+        'New emails are added, unsubscribed ones reactivated, active ones and invalid rows skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for stdin")
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='Defaults to jsonl for .jsonl/.ndjson/.json files, otherwise csv')
+        parser.add_argument('--source', default='import', help='Stored as each new subscriber\'s source')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        started = time.monotonic()
+        try:
+            if path == '-':
+                counts = import_file(sys.stdin.buffer, '', options['source'], options['batch_size'],
+                                     fmt=options['format'])
+            else:
+                with open(path, 'rb') as handle:
+                    counts = import_file(handle, path, options['source'], options['batch_size'],
+                                         fmt=options['format'])
+        except OSError as exc:
+            raise CommandError(f'Could not read {path}: {exc}')
+        except ImportFileError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(
+            f"{counts['inserted']} inserted, {counts['reactivated']} reactivated, "
+            f"{counts['skipped']} skipped in {time.monotonic() - started:.1f}s"
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:21
+
+import django.utils.timezone
+import subscribers.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscribers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubscriberImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(storage=subscribers.models.import_storage, upload_to='subscribers/')),
+                ('filename', models.CharField(max_length=255)),
+                ('source', models.CharField(default='import', max_length=50)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('inserted', models.PositiveIntegerField(default=0)),
+                ('reactivated', models.PositiveIntegerField(default=0)),
+                ('skipped', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -1,3 +1,7 @@
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.utils import timezone
 
@@ -27,4 +31,50 @@ class Subscriber(models.Model):
         """Unsubscribe the user"""
         self.is_active = False
         self.unsubscribed_at = timezone.now()
-        self.save()
+        self.save(update_fields=['is_active', 'unsubscribed_at'])
+
+
+class ImportStorage(FileSystemStorage):
+    """Uploaded lists are kept in SUBSCRIBER_IMPORT_DIR, out of the publicly served MEDIA_ROOT"""
+
+    @property
+    def base_location(self):
+        return settings.SUBSCRIBER_IMPORT_DIR
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+def import_storage():
+    return ImportStorage()
+
+
+class SubscriberImport(models.Model):
+    """An uploaded subscriber list, imported by the task worker"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    file = models.FileField(upload_to='subscribers/', storage=import_storage)
+    filename = models.CharField(max_length=255)
+    source = models.CharField(max_length=50, default='import')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+
+    # Updated after every batch while the import runs
+    inserted = models.PositiveIntegerField(default=0)
+    reactivated = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_status_display()})"
@@ -0,0 +1,9 @@
+from tasks.queue import task
+
+from .importing import run_import
+
+
+@task(max_attempts=1)
+def import_subscribers(import_id):
+    """Import a list uploaded in the admin"""
+    run_import(import_id)
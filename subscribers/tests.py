@@ -1,8 +1,21 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, RequestFactory, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Subscriber
+from .admin import SubscriberAdmin
+from .importing import import_subscribers, run_import
+from .models import Subscriber, SubscriberImport
 
 
 class SubscriberModelTest(TestCase):
@@ -26,6 +39,20 @@ class SubscriberModelTest(TestCase):
         self.assertIsNotNone(subscriber.unsubscribed_at)
 
 
+class SubscriberAdminActionTest(TestCase):
+    """Test subscriber admin actions"""
+
+    def test_deactivate_in_one_query(self):
+        """Test deactivating any number of subscribers is a single UPDATE"""
+        Subscriber.objects.bulk_create([Subscriber(email=f'user{i}@example.com') for i in range(50)])
+        admin = SubscriberAdmin(Subscriber, AdminSite())
+        admin.message_user = lambda *args, **kwargs: None
+        with self.assertNumQueries(1):
+            admin.deactivate_subscribers(RequestFactory().post('/'), Subscriber.objects.all())
+        self.assertFalse(Subscriber.objects.filter(is_active=True).exists())
+        self.assertFalse(Subscriber.objects.filter(unsubscribed_at__isnull=True).exists())
+
+
 class SubscriberAPITest(APITestCase):
     """Test Subscriber API endpoints"""
     
@@ -90,3 +117,140 @@ class SubscriberAPITest(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertFalse(response.data['subscribed'])
+
+
+class SubscriberImportTest(TestCase):
+    """Test bulk subscriber import"""
+
+    def setUp(self):
+        Subscriber.objects.create(email='active@example.com', name='Keep Me')
+        gone = Subscriber.objects.create(email='gone@example.com')
+        gone.unsubscribe()
+        self.import_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(SUBSCRIBER_IMPORT_DIR=self.import_dir)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.import_dir, ignore_errors=True)
+
+    def test_import_counts(self):
+        """Test new, reactivated, duplicate and invalid rows are counted"""
+        rows = [
+            (' New@Example.com ', 'New Person'),
+            ('new@example.com', 'Duplicate'),
+            ('active@example.com', 'Renamed'),
+            ('GONE@example.com', ''),
+            ('not-an-email', ''),
+            (None, ''),
+            ('other@example.com', ''),
+        ]
+        counts = import_subscribers(rows, batch_size=3)
+        self.assertEqual(counts, {'inserted': 2, 'reactivated': 1, 'skipped': 4})
+        new = Subscriber.objects.get(email='new@example.com')
+        self.assertEqual((new.name, new.source), ('New Person', 'import'))
+        self.assertEqual(Subscriber.objects.get(email='active@example.com').name, 'Keep Me')
+        gone = Subscriber.objects.get(email='gone@example.com')
+        self.assertTrue(gone.is_active)
+        self.assertIsNone(gone.unsubscribed_at)
+
+    def test_duplicates_across_batches(self):
+        """Test an email repeated in a later batch is skipped, not inserted twice"""
+        rows = [('a@example.com', ''), ('b@example.com', ''), ('a@example.com', '')]
+        counts = import_subscribers(rows, batch_size=2)
+        self.assertEqual(counts, {'inserted': 2, 'reactivated': 0, 'skipped': 1})
+
+    def test_constant_queries_per_batch(self):
+        """Test each batch costs the same queries whatever its size"""
+        rows = [(f'user{i}@example.com', '') for i in range(150)] + [('gone@example.com', '')]
+        # Lookup + insert + count, then lookup + reactivate + insert + count
+        with self.assertNumQueries(3 + 4):
+            import_subscribers(rows, batch_size=100)
+        self.assertEqual(Subscriber.objects.filter(is_active=True).count(), 152)
+
+    def test_command_csv_and_jsonl(self):
+        """Test the import_subscribers command reads CSV and JSON Lines files"""
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, 'list.csv')
+            with open(csv_path, 'w', encoding='utf-8') as handle:
+                handle.write('name,email\nAnn,ann@example.com\nBad,nope\n')
+            jsonl_path = os.path.join(directory, 'list.jsonl')
+            with open(jsonl_path, 'w', encoding='utf-8') as handle:
+                handle.write('{"email": "bob@example.com", "name": "Bob"}\nnot json\n\n{"email": "ann@example.com"}\n')
+
+            out = StringIO()
+            call_command('import_subscribers', csv_path, source='fair', stdout=out)
+            self.assertIn('1 inserted, 0 reactivated, 1 skipped', out.getvalue())
+            call_command('import_subscribers', jsonl_path, stdout=out)
+            self.assertIn('1 inserted, 0 reactivated, 2 skipped', out.getvalue())
+        self.assertEqual(Subscriber.objects.get(email='ann@example.com').source, 'fair')
+        self.assertEqual(Subscriber.objects.get(email='bob@example.com').name, 'Bob')
+
+    def test_inserted_excludes_conflicts(self):
+        """Test a row dropped by ignore_conflicts is counted as skipped, not inserted"""
+        bulk_create = Subscriber.objects.bulk_create
+
+        def racing_signup(objs, **kwargs):
+            Subscriber.objects.create(email='race@example.com')
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(Subscriber.objects, 'bulk_create', side_effect=racing_signup):
+            counts = import_subscribers([('race@example.com', ''), ('calm@example.com', '')])
+        self.assertEqual(counts, {'inserted': 1, 'reactivated': 0, 'skipped': 1})
+
+    def test_command_rejects_bad_files(self):
+        """Test non-UTF-8 and malformed CSV files give a CommandError, not a traceback"""
+        with tempfile.TemporaryDirectory() as directory:
+            latin1_path = os.path.join(directory, 'latin1.csv')
+            with open(latin1_path, 'wb') as handle:
+                handle.write('email,name\nzoe@example.com,Zo\u00eb\n'.encode('latin-1'))
+            with self.assertRaisesMessage(CommandError, 'is not UTF-8 text'):
+                call_command('import_subscribers', latin1_path, stdout=StringIO())
+            huge_path = os.path.join(directory, 'huge.csv')
+            with open(huge_path, 'w', encoding='utf-8') as handle:
+                handle.write('email\n"' + 'x' * 200000 + '"\n')
+            with self.assertRaisesMessage(CommandError, 'is not a valid CSV file'):
+                call_command('import_subscribers', huge_path, stdout=StringIO())
+
+    def test_admin_upload(self):
+        """Test importing a file through the admin queues it for the task worker"""
+        from tasks.models import Task
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(admin_user)
+        url = reverse('admin:subscribers_subscriber_import')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        upload = SimpleUploadedFile('list.csv', b'email\nzed@example.com\ngone@example.com\n', 'text/csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'file': upload, 'source': 'admin'}, follow=True)
+        self.assertContains(response, 'Queued list.csv for import')
+        self.assertFalse(Subscriber.objects.filter(email='zed@example.com').exists())
+
+        task = Task.objects.get(name='subscribers.tasks.import_subscribers')
+        path = SubscriberImport.objects.get().file.path
+        run_import(*task.args)
+        done = SubscriberImport.objects.get()
+        self.assertEqual((done.status, done.inserted, done.reactivated, done.skipped), ('done', 1, 1, 0))
+        self.assertTrue(Subscriber.objects.filter(email='zed@example.com', source='admin').exists())
+        self.assertFalse(os.path.exists(path))
+        response = self.client.get(url)
+        self.assertContains(response, '<td>Done</td>', html=False)
+
+    def test_admin_upload_rejects_non_utf8(self):
+        """Test a non-UTF-8 upload is a form error"""
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(admin_user)
+        upload = SimpleUploadedFile('list.csv', 'email\nzo\u00eb@example.com\n'.encode('latin-1'), 'text/csv')
+        response = self.client.post(reverse('admin:subscribers_subscriber_import'), {'file': upload, 'source': 'admin'})
+        self.assertContains(response, 'The file is not UTF-8 text')
+        self.assertFalse(SubscriberImport.objects.exists())
+
+    def test_failed_import_is_recorded(self):
+        """Test an import that hits bad bytes past the first chunk is marked failed with the reason"""
+        from django.core.files.base import ContentFile
+        content = b'email\n' + b''.join(f'user{i}@example.com\n'.encode() for i in range(2000)) + b'\xff\n'
+        queued = SubscriberImport.objects.create(file=ContentFile(content, 'list.csv'), filename='list.csv')
+        run_import(queued.pk)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'failed')
+        self.assertIn('is not UTF-8 text', queued.error)
+        self.assertGreaterEqual(queued.inserted, 500)
@@ -10,6 +10,7 @@ class SubscribeView(generics.CreateAPIView):
     """Subscribe to newsletter"""
     queryset = Subscriber.objects.all()
     serializer_class = SubscriberSerializer
+    throttle_scope = 'newsletter'
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
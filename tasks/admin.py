@@ -0,0 +1,37 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'last_error']
+    readonly_fields = ['attempts', 'locked_by', 'locked_at', 'created_at', 'finished_at', 'last_error']
+    actions = ['retry_tasks']
+    date_hierarchy = 'created_at'
+
+    fieldsets = (
+        (None, {
+            'fields': ('name', 'args', 'kwargs')
+        }),
+        ('Scheduling', {
+            'fields': ('status', 'priority', 'run_at')
+        }),
+        ('Attempts', {
+            'fields': ('attempts', 'max_attempts', 'last_error')
+        }),
+        ('Worker', {
+            'fields': ('locked_by', 'locked_at', 'created_at', 'finished_at'),
+            'classes': ('collapse',)
+        }),
+    )
+
+    def retry_tasks(self, request, queryset):
+        """Queue failed tasks to run again now, with a fresh set of attempts"""
+        updated = queryset.filter(status='failed').update(
+            status='pending', attempts=0, run_at=timezone.now(), finished_at=None
+        )
+        self.message_user(request, f'{updated} task(s) queued to run again.')
+    retry_tasks.short_description = 'Retry selected failed tasks'
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class TasksConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tasks'
+    verbose_name = 'Background Tasks'
+
+    def ready(self):
+        # Register every app's tasks.py so workers can run tasks by name
+        autodiscover_modules('tasks')
@@ -0,0 +1,91 @@
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from tasks import queue
+
+# How often a worker looks for tasks abandoned by crashed workers
+STALE_CHECK_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued background tasks. Start as many workers as you like; each task is claimed '
+        'by exactly one. SIGTERM stops claiming new tasks and waits for running ones to finish.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'TASKS_CONCURRENCY', 4),
+                            help='Tasks run at the same time by this worker')
+        parser.add_argument('--processes', action='store_true',
+                            help='Use a process pool instead of threads (for CPU-bound tasks)')
+        parser.add_argument('--poll', type=float, default=getattr(settings, 'TASKS_POLL_INTERVAL', 1.0),
+                            help='Seconds between polls when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Run every task that is due, then exit')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        concurrency = max(options['concurrency'], 1)
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.stop)
+
+        if options['processes']:
+            # Children are forked on the first submit; they must not share our connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=concurrency)
+            pool.submit(int).result()
+        else:
+            pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='task')
+
+        self.stdout.write(f'Worker {worker_id} started ({concurrency} {"processes" if options["processes"] else "threads"})')
+        counts = {'succeeded': 0, 'retry': 0, 'failed': 0, 'lost': 0}
+        running = set()
+        last_stale_check = 0
+        try:
+            while not self.stopping:
+                if time.monotonic() - last_stale_check > STALE_CHECK_INTERVAL:
+                    requeued, _ = queue.release_stale()
+                    if requeued:
+                        self.stdout.write(f'Requeued {requeued} task(s) from unresponsive workers')
+                    last_stale_check = time.monotonic()
+
+                claimed = queue.claim(worker_id, concurrency - len(running)) if len(running) < concurrency else []
+                close_old_connections()
+                running.update(pool.submit(queue.execute, pk, worker_id) for pk in claimed)
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+                done, running = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                self.collect(done, counts)
+        finally:
+            # Drain: let claimed tasks finish so none are left marked running
+            done, _ = wait(running)
+            self.collect(done, counts)
+            pool.shutdown()
+
+        self.stdout.write(
+            f"Worker {worker_id} stopped: {counts['succeeded']} succeeded, "
+            f"{counts['retry']} to retry, {counts['failed']} failed, {counts['lost']} taken over by other workers"
+        )
+
+    def collect(self, done, counts):
+        for future in done:
+            try:
+                counts[future.result()] += 1
+            except Exception as exc:
+                # execute() records task errors itself; this is the bookkeeping failing
+                self.stderr.write(f'Task execution error: {exc}')
+
+    def stop(self, signum, frame):
+        self.stdout.write('Stopping after running tasks finish...')
+        self.stopping = True
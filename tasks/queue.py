@@ -0,0 +1,216 @@
+"""
+A small database-backed task queue.
+
+Functions decorated with @task can be queued with ``.delay(*args)``; the row
+is written once the surrounding transaction commits, so a task never runs
+against data that was rolled back or isn't visible yet. `manage.py
+taskworker` claims due rows and runs them in a thread or process pool,
+retrying failures with exponential backoff.
+
+Arguments are stored as JSON, so pass primary keys rather than model
+instances.
+"""
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger('tasks')
+
+REGISTRY = {}
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+class TaskFunction:
+    """Wrapper returned by @task; calling it runs the function directly"""
+
+    def __init__(self, func, name, max_attempts, priority):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.priority = priority
+        self.__doc__ = func.__doc__
+        self.__wrapped__ = func
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Queue a call to run as soon as a worker is free"""
+        enqueue(self.name, args=args, kwargs=kwargs,
+                max_attempts=self.max_attempts, priority=self.priority)
+
+    def schedule(self, run_at, *args, **kwargs):
+        """Queue a call to run no earlier than ``run_at``"""
+        enqueue(self.name, args=args, kwargs=kwargs, run_at=run_at,
+                max_attempts=self.max_attempts, priority=self.priority)
+
+    def schedule_many(self, calls):
+        """Queue several calls with one INSERT; ``calls`` holds (run_at, args) pairs"""
+        enqueue_many(self.name, calls, max_attempts=self.max_attempts, priority=self.priority)
+
+
+def task(func=None, *, name=None, max_attempts=None, priority=0):
+    """Register a function as a queueable task"""
+    def register(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        wrapper = TaskFunction(
+            func, task_name,
+            max_attempts=max_attempts or setting('TASKS_MAX_ATTEMPTS', 5),
+            priority=priority,
+        )
+        REGISTRY[task_name] = wrapper
+        return wrapper
+
+    return register(func) if func is not None else register
+
+
+def enqueue(name, args=(), kwargs=None, run_at=None, max_attempts=None, priority=0):
+    """Insert a task row when the current transaction commits (now, outside one)"""
+    from .models import Task
+
+    args, kwargs = list(args), dict(kwargs or {})
+    # Fail at the call site, not later inside on_commit
+    json.dumps([args, kwargs])
+
+    def insert():
+        Task.objects.create(
+            name=name,
+            args=args,
+            kwargs=kwargs,
+            run_at=run_at or timezone.now(),
+            max_attempts=max_attempts or setting('TASKS_MAX_ATTEMPTS', 5),
+            priority=priority,
+        )
+
+    transaction.on_commit(insert)
+
+
+def enqueue_many(name, calls, max_attempts=None, priority=0):
+    """Like enqueue() for a batch of (run_at, args) calls, inserted with one bulk_create"""
+    from .models import Task
+
+    calls = [(run_at, list(args)) for run_at, args in calls]
+    if not calls:
+        return
+    json.dumps([args for _, args in calls])
+    max_attempts = max_attempts or setting('TASKS_MAX_ATTEMPTS', 5)
+
+    def insert():
+        Task.objects.bulk_create([
+            Task(name=name, args=args, kwargs={}, run_at=run_at or timezone.now(),
+                 max_attempts=max_attempts, priority=priority)
+            for run_at, args in calls
+        ])
+
+    transaction.on_commit(insert)
+
+
+def backoff(attempt):
+    """Delay before retry number ``attempt``: doubling, capped, with jitter"""
+    base = setting('TASKS_RETRY_BACKOFF', 30)
+    cap = setting('TASKS_RETRY_BACKOFF_MAX', 3600)
+    delay = min(base * 2 ** (attempt - 1), cap)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim(worker_id, limit):
+    """
+    Atomically take up to ``limit`` due tasks for this worker. Each row is
+    flipped from pending to running with a conditional UPDATE, so two
+    workers can never claim the same task.
+    """
+    from .models import Task
+
+    now = timezone.now()
+    candidates = list(
+        Task.objects.filter(status='pending', run_at__lte=now)
+        .order_by('priority', 'run_at')
+        .values_list('pk', flat=True)[:limit * 2]
+    )
+    claimed = []
+    for pk in candidates:
+        updated = Task.objects.filter(pk=pk, status='pending').update(
+            status='running', locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if updated:
+            claimed.append(pk)
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def execute(task_id, worker_id=None):
+    """
+    Run one claimed task and record the outcome. Safe to call in any thread or process.
+
+    The outcome is only written while ``worker_id`` (by default whoever holds
+    the row now) still holds the claim: if release_stale() requeued a slow
+    task and another worker took it, the late finish is dropped as 'lost'.
+    """
+    from .models import Task
+
+    try:
+        task_row = Task.objects.get(pk=task_id)
+        worker_id = worker_id or task_row.locked_by
+        lease = Task.objects.filter(pk=task_id, status='running', locked_by=worker_id)
+        if task_row.status != 'running' or task_row.locked_by != worker_id:
+            return 'lost'
+        func = REGISTRY.get(task_row.name)
+        try:
+            if func is None:
+                raise LookupError(f'No task registered as {task_row.name!r}')
+            func(*task_row.args, **task_row.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            if task_row.attempts < task_row.max_attempts and func is not None:
+                retry_at = timezone.now() + backoff(task_row.attempts)
+                if not lease.update(
+                    status='pending', run_at=retry_at, last_error=error, locked_by='', locked_at=None,
+                ):
+                    return _lost(task_row)
+                logger.warning('Task %s #%s failed (attempt %s), retrying at %s',
+                               task_row.name, task_id, task_row.attempts, retry_at)
+                return 'retry'
+            if not lease.update(
+                status='failed', last_error=error, finished_at=timezone.now(), locked_by='', locked_at=None,
+            ):
+                return _lost(task_row)
+            logger.error('Task %s #%s failed permanently after %s attempt(s)',
+                         task_row.name, task_id, task_row.attempts)
+            return 'failed'
+        if not lease.update(status='succeeded', finished_at=timezone.now(), locked_by='', locked_at=None):
+            return _lost(task_row)
+        return 'succeeded'
+    finally:
+        close_old_connections()
+
+
+def _lost(task_row):
+    logger.warning('Task %s #%s finished after its claim was released; outcome dropped',
+                   task_row.name, task_row.pk)
+    return 'lost'
+
+
+def release_stale(timeout=None):
+    """Return tasks whose worker died mid-run to the queue"""
+    from .models import Task
+
+    timeout = timeout if timeout is not None else setting('TASKS_LOCK_TIMEOUT', 600)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = Task.objects.filter(status='running', locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', last_error='Worker stopped responding', finished_at=timezone.now(),
+        locked_by='', locked_at=None,
+    )
+    requeued = stale.update(status='pending', run_at=timezone.now(), locked_by='', locked_at=None)
+    return requeued, failed
@@ -0,0 +1,242 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.admin.sites import AdminSite
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.utils import timezone
+
+from booking.admin import BookingAdmin
+from booking.models import Booking, BookingService
+from booking.tasks import send_booking_confirmation, send_booking_reminder
+from shop.models import Order, OrderItem
+from shop.tasks import send_order_confirmation
+from .models import Task
+from .queue import claim, execute, release_stale, task
+
+CALLS = []
+
+
+@task(name='tasks.tests.record')
+def record(value, suffix=''):
+    CALLS.append(f'{value}{suffix}')
+
+
+@task(name='tasks.tests.explode', max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+@task(name='tasks.tests.slow')
+def slow():
+    # Runs past the lock timeout: the row is requeued and claimed by w2 meanwhile
+    Task.objects.filter(name='tasks.tests.slow').update(locked_at=timezone.now() - timedelta(hours=1))
+    release_stale(timeout=600)
+    claim('w2', 1)
+
+
+class TaskQueueTest(TestCase):
+    """Test enqueueing, claiming and running tasks"""
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueued_on_commit(self):
+        """Test a task row is only written once the transaction commits"""
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delay('a', suffix='!')
+            self.assertFalse(Task.objects.exists())
+        queued = Task.objects.get()
+        self.assertEqual(queued.name, 'tasks.tests.record')
+        self.assertEqual(queued.args, ['a'])
+        self.assertEqual(queued.kwargs, {'suffix': '!'})
+
+    def test_arguments_must_be_json(self):
+        """Test non-JSON arguments are rejected when queueing"""
+        with self.assertRaises(TypeError):
+            record.delay(object())
+
+    def test_run_success(self):
+        """Test a claimed task runs and is marked succeeded"""
+        queued = Task.objects.create(name='tasks.tests.record', args=['x'])
+        self.assertEqual(claim('w1', 10), [queued.pk])
+        self.assertEqual(execute(queued.pk), 'succeeded')
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'succeeded')
+        self.assertEqual(queued.attempts, 1)
+        self.assertEqual(CALLS, ['x'])
+
+    def test_retry_with_backoff_then_fail(self):
+        """Test failures are retried later and fail for good after max_attempts"""
+        queued = Task.objects.create(name='tasks.tests.explode', max_attempts=2)
+        claim('w1', 1)
+        with self.assertLogs('tasks', 'WARNING'):
+            self.assertEqual(execute(queued.pk), 'retry')
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'pending')
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=20))
+        self.assertIn('boom', queued.last_error)
+
+        # Not due yet
+        self.assertEqual(claim('w1', 1), [])
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        claim('w1', 1)
+        with self.assertLogs('tasks', 'ERROR'):
+            self.assertEqual(execute(queued.pk), 'failed')
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'failed')
+        self.assertEqual(queued.attempts, 2)
+
+    def test_unknown_task_fails(self):
+        """Test a task with no registered function fails without retrying"""
+        queued = Task.objects.create(name='tasks.tests.missing')
+        claim('w1', 1)
+        with self.assertLogs('tasks', 'ERROR'):
+            self.assertEqual(execute(queued.pk), 'failed')
+
+    def test_claim_is_exclusive_and_ordered(self):
+        """Test each task is claimed once, by priority, and only when due"""
+        low = Task.objects.create(name='tasks.tests.record', args=['low'], priority=5)
+        high = Task.objects.create(name='tasks.tests.record', args=['high'], priority=0)
+        Task.objects.create(name='tasks.tests.record', run_at=timezone.now() + timedelta(hours=1))
+        self.assertEqual(claim('w1', 1), [high.pk])
+        self.assertEqual(claim('w2', 5), [low.pk])
+        self.assertEqual(claim('w3', 5), [])
+
+    def test_late_finish_does_not_overwrite_new_claim(self):
+        """Test a worker whose task was requeued and reclaimed can't record its outcome"""
+        queued = Task.objects.create(name='tasks.tests.slow')
+        claim('w1', 1)
+        with self.assertLogs('tasks', 'WARNING'):
+            self.assertEqual(execute(queued.pk, 'w1'), 'lost')
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.locked_by, queued.attempts), ('running', 'w2', 2))
+        # Nor can it start a task it no longer holds
+        self.assertEqual(execute(queued.pk, 'w1'), 'lost')
+
+    def test_release_stale(self):
+        """Test tasks held by a dead worker go back to the queue"""
+        queued = Task.objects.create(name='tasks.tests.record', args=['x'])
+        claim('w1', 1)
+        Task.objects.filter(pk=queued.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(release_stale(timeout=600), (1, 0))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'pending')
+        self.assertEqual(claim('w2', 1), [queued.pk])
+
+
+class TaskWorkerCommandTest(TransactionTestCase):
+    """Test the taskworker management command"""
+
+    def test_once_drains_due_tasks(self):
+        """Test --once runs every due task and exits"""
+        CALLS.clear()
+        for value in 'abc':
+            Task.objects.create(name='tasks.tests.record', args=[value])
+        Task.objects.create(name='tasks.tests.explode', max_attempts=1)
+        out = StringIO()
+        with self.assertLogs('tasks', 'ERROR'):
+            call_command('taskworker', once=True, concurrency=1, stdout=out)
+        self.assertEqual(sorted(CALLS), ['a', 'b', 'c'])
+        self.assertIn('3 succeeded, 0 to retry, 1 failed', out.getvalue())
+        self.assertFalse(Task.objects.filter(status__in=['pending', 'running']).exists())
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class NotificationTaskTest(TestCase):
+    """Test the order and booking email tasks"""
+
+    def setUp(self):
+        self.service = BookingService.objects.create(
+            name='Portrait Session', slug='portrait', description='Portraits',
+            duration_hours=Decimal('1.0'), price=Decimal('100.00')
+        )
+        soon = timezone.localtime() + timedelta(days=3)
+        self.booking = Booking.objects.create(
+            service=self.service, customer_name='Test User', customer_email='test@example.com',
+            customer_phone='555', booking_date=soon.date(), booking_time=soon.time().replace(microsecond=0),
+            duration_hours=Decimal('1.0'), price=Decimal('100.00')
+        )
+
+    def test_order_confirmation(self):
+        """Test the order confirmation lists the items and total"""
+        order = Order.objects.create(
+            order_number='ORD-1', customer_name='Test User', customer_email='test@example.com',
+            subtotal=Decimal('25.00'), total=Decimal('25.00')
+        )
+        OrderItem.objects.create(order=order, product_name='LUT Pack', price=Decimal('25.00'))
+        send_order_confirmation(order.pk)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['test@example.com'])
+        self.assertIn('ORD-1', mail.outbox[0].subject)
+        self.assertIn('LUT Pack x 1', mail.outbox[0].body)
+
+    def test_booking_confirmation(self):
+        """Test the booking acknowledgement email"""
+        send_booking_confirmation(self.booking.pk)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(self.booking.booking_number, mail.outbox[0].subject)
+        self.assertIn('Portrait Session', mail.outbox[0].body)
+
+    def test_confirming_schedules_reminder(self):
+        """Test the admin confirm action queues a reminder a day before the booking"""
+        request = RequestFactory().post('/')
+        admin = BookingAdmin(Booking, AdminSite())
+        admin.message_user = lambda *args, **kwargs: None
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.mark_as_confirmed(request, Booking.objects.all())
+        reminder = Task.objects.get(name='booking.tasks.send_booking_reminder')
+        self.assertEqual(reminder.args, [self.booking.pk])
+        self.assertAlmostEqual(
+            (reminder.run_at - timezone.now()).total_seconds(), 2 * 86400, delta=60
+        )
+
+    def test_confirming_many_is_constant_queries(self):
+        """Test the confirm action queues every reminder with one INSERT, for 1 or 20 bookings"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        admin = BookingAdmin(Booking, AdminSite())
+        admin.message_user = lambda *args, **kwargs: None
+
+        def confirm():
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+                admin.mark_as_confirmed(RequestFactory().post('/'), Booking.objects.filter(status='pending'))
+            return len(queries)
+
+        few = confirm()
+        for day in range(20):
+            Booking.objects.create(
+                service=self.service, customer_name='Test User', customer_email='test@example.com',
+                customer_phone='555', booking_date=self.booking.booking_date + timedelta(days=day + 1),
+                booking_time=self.booking.booking_time, duration_hours=Decimal('1.0'), price=Decimal('100.00')
+            )
+        self.assertEqual(confirm(), few)
+        self.assertEqual(Task.objects.filter(name='booking.tasks.send_booking_reminder').count(), 21)
+
+    def test_confirming_in_change_form_schedules_reminder(self):
+        """Test changing the status to confirmed in the change form queues the reminder"""
+        from django.contrib.auth import get_user_model
+        from django.forms.models import model_to_dict
+        from django.urls import reverse
+        admin_user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        data = {key: value for key, value in model_to_dict(self.booking).items() if value is not None}
+        url = reverse('admin:booking_booking_change', args=[self.booking.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {**data, 'admin_notes': 'Called back'})
+        self.assertFalse(Task.objects.filter(name='booking.tasks.send_booking_reminder').exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {**data, 'status': 'confirmed'})
+        self.assertEqual(response.status_code, 302)
+        reminder = Task.objects.get(name='booking.tasks.send_booking_reminder')
+        self.assertEqual(reminder.args, [self.booking.pk])
+        self.booking.refresh_from_db()
+        self.assertIsNotNone(self.booking.confirmed_at)
+
+    def test_reminder_skipped_unless_confirmed(self):
+        """Test reminders are not sent for cancelled bookings"""
+        Booking.objects.filter(pk=self.booking.pk).update(status='cancelled')
+        send_booking_reminder(self.booking.pk)
+        self.assertEqual(mail.outbox, [])
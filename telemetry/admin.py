@@ -0,0 +1,62 @@
+from django.contrib import admin
+from django.db.models import Max
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.dateparse import parse_date
+from core.admin import PerformanceModelAdmin
+from .models import ClientEvent, VitalRollup
+from .rollups import page_report
+
+DASHBOARD_METRICS = ('LCP', 'INP', 'CLS')
+
+
+class ReadOnlyAdmin(PerformanceModelAdmin):
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(VitalRollup)
+class VitalRollupAdmin(ReadOnlyAdmin):
+    """Daily p75 per page and metric, plus a per-page dashboard; never reads raw samples"""
+    change_list_template = 'admin/telemetry/vitalrollup/change_list.html'
+    list_display = ['day', 'page', 'metric', 'p75', 'rating', 'samples', 'good_percent']
+    list_filter = ['metric']
+    search_fields = ['page']
+    date_hierarchy = 'day'
+
+    def good_percent(self, obj):
+        return f'{obj.good * 100 / obj.samples:.0f}%' if obj.samples else '-'
+    good_percent.short_description = 'Good'
+
+    def get_urls(self):
+        urls = [
+            path('dashboard/', self.admin_site.admin_view(self.dashboard_view), name='telemetry_vitalrollup_dashboard'),
+        ]
+        return urls + super().get_urls()
+
+    def dashboard_view(self, request):
+        """p75 LCP, INP and CLS per page for one day (?day=, default the latest)"""
+        day = parse_date(request.GET.get('day', '')) or VitalRollup.objects.aggregate(day=Max('day'))['day']
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Web Vitals dashboard',
+            'day': day,
+            'metrics': DASHBOARD_METRICS,
+            'rows': page_report(day, DASHBOARD_METRICS) if day else [],
+        }
+        return TemplateResponse(request, 'admin/telemetry/vitalrollup/dashboard.html', context)
+
+
+@admin.register(ClientEvent)
+class ClientEventAdmin(ReadOnlyAdmin):
+    list_display = ['recorded_at', 'kind', 'name', 'page']
+    list_filter = ['kind']
+    search_fields = ['name', 'page']
+    date_hierarchy = 'recorded_at'
@@ -0,0 +1,158 @@
+"""
+Client telemetry: validating beacons and loading them from the spool.
+
+The browser sends batches of events with navigator.sendBeacon():
+
+    {"events": [
+        {"type": "vital", "name": "LCP", "value": 2140.5, "page": "/shop"},
+        {"type": "event", "name": "add_to_cart", "page": "/shop/luts", "params": {...}},
+        {"type": "error", "message": "...", "stack": "...", "url": "https://.../shop"}
+    ]}
+
+normalize() turns a payload into a compact spool record, dropping events
+it can't use rather than rejecting the batch. flush() moves spooled
+records into VitalSample and ClientEvent with bulk_create, a few queries
+per thousand events, then refreshes the touched rollups. It runs as a
+background task queued at most once per TELEMETRY_FLUSH_INTERVAL by the
+endpoint, or from cron with `manage.py flush_telemetry`.
+"""
+import json
+import logging
+import math
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
+
+from . import rollups, spool
+from .models import THRESHOLDS, ClientEvent, VitalSample
+
+logger = logging.getLogger(__name__)
+
+FLUSH_KEY = 'telemetry-flush'
+BATCH_SIZE = 1000
+MAX_NAME = 100
+MAX_PAGE = 200
+MAX_STACK = 4000
+MAX_DATA = 4096
+
+
+def page_path(value, default='/'):
+    """Path of a URL or path, without query string or fragment"""
+    if not isinstance(value, str) or not value:
+        return default
+    return (urlsplit(value).path or '/')[:MAX_PAGE]
+
+
+def _data(value):
+    """A JSON object small enough to store, or {}"""
+    if not isinstance(value, dict):
+        return {}
+    try:
+        # Python's parser turns 1e400 into inf, which isn't valid JSON to store
+        size = len(json.dumps(value, allow_nan=False))
+    except ValueError:
+        return {}
+    return value if size <= MAX_DATA else {}
+
+
+def normalize(payload, default_page='/', now=None):
+    """
+    Spool record for a beacon payload, or None if it holds nothing usable:
+    {'t': received, 'v': [[page, metric, value]], 'e': [[kind, name, page, data]]}.
+    """
+    events = payload.get('events') if isinstance(payload, dict) else payload
+    if not isinstance(events, list):
+        return None
+    vitals, others = [], []
+    for event in events[:settings.TELEMETRY_MAX_EVENTS]:
+        if not isinstance(event, dict):
+            continue
+        kind = event.get('type')
+        page = page_path(event.get('page') or event.get('url'), default_page)
+        if kind == 'vital':
+            metric, value = event.get('name'), event.get('value')
+            if (metric in THRESHOLDS and isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and math.isfinite(value) and 0 <= value < 1e6):
+                vitals.append([page, metric, float(value)])
+        elif kind == 'event':
+            name = event.get('name')
+            if isinstance(name, str) and name:
+                others.append(['event', name[:MAX_NAME], page, _data(event.get('params'))])
+        elif kind == 'error':
+            message = event.get('message')
+            if isinstance(message, str) and message:
+                data = _data(event.get('info'))
+                if isinstance(event.get('stack'), str):
+                    data = {**data, 'stack': event['stack'][:MAX_STACK]}
+                others.append(['error', message[:MAX_NAME], page, data])
+    if not vitals and not others:
+        return None
+    return {'t': int((now or timezone.now()).timestamp()), 'v': vitals, 'e': others}
+
+
+def schedule_flush():
+    """Queue a flush unless one is already due within TELEMETRY_FLUSH_INTERVAL"""
+    from .tasks import flush_telemetry
+
+    interval = settings.TELEMETRY_FLUSH_INTERVAL
+    if cache.add(FLUSH_KEY, True, interval):
+        flush_telemetry.schedule(timezone.now() + timedelta(seconds=interval))
+
+
+def _save(samples, events, saved):
+    VitalSample.objects.bulk_create(samples, batch_size=BATCH_SIZE)
+    ClientEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+    saved['vitals'] += len(samples)
+    saved['events'] += len(events)
+    samples.clear()
+    events.clear()
+
+
+def _load(path):
+    """Load one spool file; returns (saved counts, touched (day, page)) or None if it was taken"""
+    saved = Counter()
+    touched = set()
+    with spool.claim(path) as records:
+        if records is None:
+            return None
+        samples, events = [], []
+        with transaction.atomic():
+            for record in records:
+                recorded_at = datetime.fromtimestamp(record['t'], tz=dt_timezone.utc)
+                day = timezone.localdate(recorded_at)
+                for page, metric, value in record['v']:
+                    samples.append(VitalSample(recorded_at=recorded_at, page=page, metric=metric, value=value))
+                    touched.add((day, page))
+                for kind, name, page, data in record['e']:
+                    events.append(ClientEvent(recorded_at=recorded_at, kind=kind, name=name, page=page, data=data))
+                if len(samples) + len(events) >= BATCH_SIZE:
+                    _save(samples, events, saved)
+            _save(samples, events, saved)
+    return saved, touched
+
+
+def flush():
+    """Load every spooled batch, refresh the rollups they touch and prune old rows"""
+    spool.rotate()
+    saved = Counter()
+    touched = set()
+    for path in spool.batches():
+        try:
+            loaded = _load(path)
+        except (IntegrityError, DataError, ValueError, TypeError, KeyError):
+            # Bad data would fail every retry and hold up every later file;
+            # anything else (the database being down) is left to the next flush
+            logger.exception('Could not load telemetry batch %s, moved aside', path.name)
+            spool.set_aside(path)
+            continue
+        if loaded is not None:
+            saved.update(loaded[0])
+            touched |= loaded[1]
+    saved['rollups'] = rollups.refresh(touched)
+    rollups.prune()
+    return saved
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from telemetry import rollups
+from telemetry.ingest import flush
+
+
+class Command(BaseCommand):
+    help = 'Load spooled client telemetry into the database and refresh the Web Vitals rollups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Afterwards recompute the rollups of every day that still has raw samples',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        saved = flush()
+        self.stdout.write(
+            f"Saved {saved['vitals']} vitals and {saved['events']} events, "
+            f"refreshed {saved['rollups']} rollups"
+        )
+        if options['rebuild']:
+            self.stdout.write(f'Rebuilt {rollups.rebuild()} rollups')
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.monotonic() - started:.2f}s'))
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VitalSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(db_index=True)),
+                ('page', models.CharField(help_text='URL path, without query string', max_length=200)),
+                ('metric', models.CharField(choices=[('LCP', 'Largest Contentful Paint'), ('INP', 'Interaction to Next Paint'), ('CLS', 'Cumulative Layout Shift'), ('FCP', 'First Contentful Paint'), ('TTFB', 'Time to First Byte')], max_length=4)),
+                ('value', models.FloatField()),
+            ],
+            options={
+                'ordering': ['-recorded_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ClientEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(db_index=True)),
+                ('kind', models.CharField(choices=[('event', 'Event'), ('error', 'Error')], max_length=5)),
+                ('name', models.CharField(help_text='Event name, or the error message', max_length=100)),
+                ('page', models.CharField(max_length=200)),
+                ('data', models.JSONField(blank=True, default=dict, help_text="Event parameters, or the error's stack and context")),
+            ],
+            options={
+                'ordering': ['-recorded_at'],
+                'indexes': [models.Index(fields=['kind', 'recorded_at'], name='telemetry_c_kind_263a8b_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VitalRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('page', models.CharField(max_length=200)),
+                ('metric', models.CharField(choices=[('LCP', 'Largest Contentful Paint'), ('INP', 'Interaction to Next Paint'), ('CLS', 'Cumulative Layout Shift'), ('FCP', 'First Contentful Paint'), ('TTFB', 'Time to First Byte')], max_length=4)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('good', models.PositiveIntegerField(default=0, help_text="Samples within the 'good' threshold")),
+                ('p75', models.FloatField()),
+            ],
+            options={
+                'ordering': ['-day', 'page', 'metric'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'page', 'metric'), name='telemetry_rollup_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,93 @@
+from django.db import models
+
+
+METRIC_CHOICES = [
+    ('LCP', 'Largest Contentful Paint'),
+    ('INP', 'Interaction to Next Paint'),
+    ('CLS', 'Cumulative Layout Shift'),
+    ('FCP', 'First Contentful Paint'),
+    ('TTFB', 'Time to First Byte'),
+]
+
+# p75 at or below the first bound is good, above the second poor
+# (https://web.dev/articles/vitals). Milliseconds, except CLS.
+THRESHOLDS = {
+    'LCP': (2500, 4000),
+    'INP': (200, 500),
+    'CLS': (0.1, 0.25),
+    'FCP': (1800, 3000),
+    'TTFB': (800, 1800),
+}
+
+
+def rate(metric, value):
+    good, poor = THRESHOLDS[metric]
+    if value <= good:
+        return 'good'
+    if value <= poor:
+        return 'needs-improvement'
+    return 'poor'
+
+
+class VitalSample(models.Model):
+    """One Web Vitals measurement from a browser. Kept for TELEMETRY_RETENTION_DAYS."""
+    recorded_at = models.DateTimeField(db_index=True)
+    page = models.CharField(max_length=200, help_text="URL path, without query string")
+    metric = models.CharField(max_length=4, choices=METRIC_CHOICES)
+    value = models.FloatField()
+
+    class Meta:
+        ordering = ['-recorded_at']
+
+    def __str__(self):
+        return f"{self.metric} {self.value:g} on {self.page}"
+
+
+class ClientEvent(models.Model):
+    """An analytics event or a JavaScript error reported by the frontend"""
+    KIND_CHOICES = [
+        ('event', 'Event'),
+        ('error', 'Error'),
+    ]
+
+    recorded_at = models.DateTimeField(db_index=True)
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    name = models.CharField(max_length=100, help_text="Event name, or the error message")
+    page = models.CharField(max_length=200)
+    data = models.JSONField(default=dict, blank=True, help_text="Event parameters, or the error's stack and context")
+
+    class Meta:
+        ordering = ['-recorded_at']
+        indexes = [
+            models.Index(fields=['kind', 'recorded_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.name}"
+
+
+class VitalRollup(models.Model):
+    """
+    Daily 75th percentile of one metric on one page, the figure Web Vitals
+    are assessed on. Built from VitalSample by telemetry.rollups and kept
+    after the samples are pruned.
+    """
+    day = models.DateField()
+    page = models.CharField(max_length=200)
+    metric = models.CharField(max_length=4, choices=METRIC_CHOICES)
+    samples = models.PositiveIntegerField(default=0)
+    good = models.PositiveIntegerField(default=0, help_text="Samples within the 'good' threshold")
+    p75 = models.FloatField()
+
+    class Meta:
+        ordering = ['-day', 'page', 'metric']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'page', 'metric'], name='telemetry_rollup_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.page} {self.metric} p75={self.p75:g}"
+
+    @property
+    def rating(self):
+        return rate(self.metric, self.p75)
@@ -0,0 +1,102 @@
+"""
+Daily p75 rollups (VitalRollup) built from the raw vitals samples.
+
+A rollup is recomputed whole from that day's samples for the page, so it
+stays exact when late batches arrive. The flusher refreshes only the (day,
+page) pairs it just loaded; `manage.py flush_telemetry --rebuild` redoes
+every day that still has samples. Raw samples and events are pruned after
+TELEMETRY_RETENTION_DAYS, the rollups are kept.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import THRESHOLDS, ClientEvent, VitalRollup, VitalSample
+
+CHUNK = 500
+
+
+def day_range(day):
+    """Aware datetimes bounding local ``day``"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def refresh(day_pages):
+    """Recompute the rollups for an iterable of (day, page)"""
+    pages_by_day = defaultdict(set)
+    for day, page in day_pages:
+        pages_by_day[day].add(page)
+    written = 0
+    for day, pages in sorted(pages_by_day.items()):
+        pages = sorted(pages)
+        for start in range(0, len(pages), CHUNK):
+            written += _refresh_day(day, pages[start:start + CHUNK])
+    return written
+
+
+def _refresh_day(day, pages):
+    lower, upper = day_range(day)
+    samples = (
+        VitalSample.objects.filter(recorded_at__gte=lower, recorded_at__lt=upper, page__in=pages)
+        .order_by('page', 'metric', 'value')
+        .values_list('page', 'metric', 'value')
+        .iterator(chunk_size=5000)
+    )
+    rollups = []
+    for (page, metric), rows in groupby(samples, key=lambda row: row[:2]):
+        values = [value for *_, value in rows]
+        rollups.append(VitalRollup(
+            day=day, page=page, metric=metric, samples=len(values),
+            good=sum(1 for value in values if value <= THRESHOLDS[metric][0]),
+            p75=percentile(values, 0.75),
+        ))
+    with transaction.atomic():
+        VitalRollup.objects.filter(day=day, page__in=pages).delete()
+        VitalRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def rebuild():
+    """Recompute the rollups of every day that still has raw samples"""
+    return refresh(
+        VitalSample.objects.annotate(day=TruncDate('recorded_at'))
+        .values_list('day', 'page')
+        .distinct()
+        .order_by()
+    )
+
+
+def prune(now=None):
+    """Delete raw samples and events older than TELEMETRY_RETENTION_DAYS"""
+    cutoff = (now or timezone.now()) - timedelta(days=settings.TELEMETRY_RETENTION_DAYS)
+    VitalSample.objects.filter(recorded_at__lt=cutoff).delete()
+    ClientEvent.objects.filter(recorded_at__lt=cutoff).delete()
+
+
+def page_report(day, metrics=('LCP', 'INP', 'CLS'), limit=100):
+    """
+    Rollups for ``day`` pivoted to one row per page, busiest first:
+    [{'page', 'samples', 'cells': [VitalRollup or None per metric]}].
+    """
+    pages = defaultdict(dict)
+    for rollup in VitalRollup.objects.filter(day=day, metric__in=metrics):
+        pages[rollup.page][rollup.metric] = rollup
+    rows = [
+        {'page': page, 'samples': sum(r.samples for r in by_metric.values()),
+         'cells': [by_metric.get(metric) for metric in metrics]}
+        for page, by_metric in pages.items()
+    ]
+    rows.sort(key=lambda row: (-row['samples'], row['page']))
+    return rows[:limit]
@@ -0,0 +1,115 @@
+"""
+Append-only spool for incoming telemetry batches.
+
+The ingest endpoint writes each accepted batch as one JSON line to
+``current.jsonl`` in TELEMETRY_SPOOL_DIR: a single append, no database
+work. Web workers in separate processes can share the directory; writes
+are serialized with flock().
+
+The flusher rotates ``current.jsonl`` to ``batch-<ns>.jsonl`` and claims
+each rotated file in turn. Claiming takes the same lock, so it waits for a
+writer that opened the file just before the rotation, and a writer that
+finds its file was rotated from under it reopens the new path. A claimed
+file is deleted once its events are saved; a file that fails to load stays
+on disk and is retried by the next flush, unless its data can never load,
+in which case it is renamed to ``failed-<name>`` for inspection.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: no locking, fine for a single dev server
+    fcntl = None
+
+CURRENT = 'current.jsonl'
+
+
+def spool_dir():
+    path = Path(settings.TELEMETRY_SPOOL_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _lock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+def append(events):
+    """Add one batch of normalized events to the spool"""
+    line = json.dumps(events, separators=(',', ':')).encode() + b'\n'
+    path = spool_dir() / CURRENT
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            _lock(fd)
+            try:
+                rotated = os.fstat(fd).st_ino != os.stat(path).st_ino
+            except FileNotFoundError:
+                rotated = True
+            if not rotated:
+                os.write(fd, line)
+                return
+        finally:
+            os.close(fd)
+
+
+def rotate():
+    """Move the current file aside for flushing; new batches start a new file"""
+    path = spool_dir() / CURRENT
+    try:
+        os.rename(path, path.with_name(f'batch-{time.time_ns()}.jsonl'))
+    except FileNotFoundError:
+        pass
+
+
+def batches():
+    """Rotated files waiting to be flushed, oldest first"""
+    return sorted(spool_dir().glob('batch-*.jsonl'))
+
+
+def set_aside(path):
+    """Rename a file that can't be loaded so later flushes skip it"""
+    try:
+        os.rename(path, path.with_name(f'failed-{path.name}'))
+    except FileNotFoundError:
+        pass
+
+
+def _read(f):
+    for line in f:
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # A line cut short by a crash mid-write
+            continue
+
+
+@contextmanager
+def claim(path):
+    """
+    Lock a rotated file and yield its batches (lists of events); the file
+    is deleted if the block succeeds. Yields None if another flusher got to
+    it first.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        yield None
+        return
+    try:
+        _lock(fd)
+        if os.fstat(fd).st_nlink == 0:
+            yield None
+            return
+        with os.fdopen(os.dup(fd), 'rb') as f:
+            yield _read(f)
+        os.unlink(path)
+    finally:
+        os.close(fd)
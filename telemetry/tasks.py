@@ -0,0 +1,9 @@
+from tasks.queue import task
+
+from . import ingest
+
+
+@task
+def flush_telemetry():
+    """Load spooled telemetry into the event tables and refresh the rollups"""
+    ingest.flush()
@@ -0,0 +1,203 @@
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from . import rollups, spool
+from .ingest import flush, normalize
+from .models import ClientEvent, VitalRollup, VitalSample
+
+
+class SpoolTestMixin:
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.spool_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(TELEMETRY_SPOOL_DIR=self.spool_dir)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+        super().tearDown()
+
+    def beacon(self, *events, content_type='application/json', **extra):
+        return self.client.post(reverse('telemetry'), json.dumps({'events': list(events)}),
+                                content_type=content_type, **extra)
+
+
+class IngestTest(SpoolTestMixin, APITestCase):
+    """Test the beacon endpoint and the spool"""
+
+    def test_beacon_is_spooled_without_queries(self):
+        """Test POST /api/telemetry/ appends to the spool and leaves the database alone"""
+        with self.assertNumQueries(0):
+            response = self.beacon(
+                {'type': 'vital', 'name': 'LCP', 'value': 1800, 'page': '/shop?sort=price'},
+                {'type': 'event', 'name': 'add_to_cart', 'page': '/shop/luts', 'params': {'id': 3}},
+            )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(VitalSample.objects.count(), 0)
+        with open(f'{self.spool_dir}/{spool.CURRENT}') as f:
+            record = json.loads(f.readline())
+        self.assertEqual(record['v'], [['/shop', 'LCP', 1800.0]])
+        self.assertEqual(record['e'], [['event', 'add_to_cart', '/shop/luts', {'id': 3}]])
+
+    def test_text_plain_beacon(self):
+        """Test that sendBeacon's text/plain bodies are parsed as JSON"""
+        response = self.beacon({'type': 'vital', 'name': 'CLS', 'value': 0.02}, content_type='text/plain',
+                               HTTP_REFERER='https://example.com/portfolio/reel?x=1')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        flush()
+        self.assertEqual(VitalSample.objects.get().page, '/portfolio/reel')
+
+    def test_rejects_unusable_and_oversized_payloads(self):
+        """Test 400 for batches without valid events and 413 past TELEMETRY_MAX_BODY_BYTES"""
+        response = self.beacon({'type': 'vital', 'name': 'FID', 'value': 10}, {'type': 'vital', 'name': 'LCP'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('telemetry'), '"hello"', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(TELEMETRY_MAX_BODY_BYTES=100):
+            response = self.beacon(*[{'type': 'vital', 'name': 'LCP', 'value': 1}] * 10)
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_normalize(self):
+        """Test that bad events are dropped and oversized fields trimmed"""
+        record = normalize([
+            {'type': 'vital', 'name': 'INP', 'value': True},
+            {'type': 'vital', 'name': 'INP', 'value': float('nan')},
+            {'type': 'vital', 'name': 'INP', 'value': 120},
+            {'type': 'error', 'message': 'x' * 500, 'stack': 'at App', 'url': 'https://example.com/a#b'},
+            {'type': 'event', 'name': 'play', 'params': {'blob': 'x' * 10000}},
+            'junk',
+        ], default_page='/home')
+        self.assertEqual(record['v'], [['/home', 'INP', 120.0]])
+        self.assertEqual(record['e'], [
+            ['error', 'x' * 100, '/a', {'stack': 'at App'}],
+            ['event', 'play', '/home', {}],
+        ])
+        with self.settings(TELEMETRY_MAX_EVENTS=2):
+            self.assertEqual(len(normalize([{'type': 'event', 'name': 'a'}] * 5)['e']), 2)
+
+    def test_non_finite_params_dropped(self):
+        """Test that params holding numbers too big for JSON (1e400 parses as inf) are dropped"""
+        body = '{"events": [{"type": "event", "name": "play", "params": {"a": 1e400}}]}'
+        response = self.client.post(reverse('telemetry'), body, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(flush()['events'], 1)
+        self.assertEqual(ClientEvent.objects.get().data, {})
+
+    def test_flush_is_queued_once_per_interval(self):
+        """Test that beacons queue at most one flush task"""
+        from tasks.models import Task
+        with self.captureOnCommitCallbacks(execute=True):
+            self.beacon({'type': 'vital', 'name': 'LCP', 'value': 1})
+            self.beacon({'type': 'vital', 'name': 'LCP', 'value': 2})
+        task = Task.objects.get(name='telemetry.tasks.flush_telemetry')
+        self.assertGreater(task.run_at, timezone.now())
+
+
+class FlushTest(SpoolTestMixin, TestCase):
+    """Test loading the spool and the p75 rollups"""
+
+    def spool(self, *vitals, page='/shop', now=None):
+        spool.append(normalize([{'type': 'vital', 'name': m, 'value': v, 'page': page} for m, v in vitals], now=now))
+
+    def test_flush_loads_events_and_rolls_up_p75(self):
+        """Test that flush bulk-loads the spool and computes nearest-rank p75 per page"""
+        self.spool(('LCP', 4000), ('LCP', 1000), ('CLS', 0.3))
+        self.spool(('LCP', 3000), ('LCP', 2000), page='/shop')
+        self.spool(('LCP', 900), page='/')
+        spool.append(normalize([{'type': 'error', 'message': 'boom', 'page': '/shop'}]))
+        saved = flush()
+        self.assertEqual((saved['vitals'], saved['events'], saved['rollups']), (6, 1, 3))
+        lcp = VitalRollup.objects.get(page='/shop', metric='LCP')
+        self.assertEqual((lcp.samples, lcp.good, lcp.p75, lcp.rating), (4, 2, 3000, 'needs-improvement'))
+        self.assertEqual(VitalRollup.objects.get(page='/shop', metric='CLS').rating, 'poor')
+        self.assertEqual(ClientEvent.objects.get().kind, 'error')
+        self.assertEqual(spool.batches(), [])
+
+    def test_late_batches_recompute_the_day(self):
+        """Test that a second flush folds new samples into the existing rollup"""
+        self.spool(('INP', 100))
+        flush()
+        self.spool(('INP', 600), ('INP', 700))
+        flush()
+        inp = VitalRollup.objects.get()
+        self.assertEqual((inp.samples, inp.p75), (3, 700))
+
+    def test_writes_after_rotation_go_to_a_new_file(self):
+        """Test that rotating leaves earlier batches claimable and later ones in current.jsonl"""
+        self.spool(('LCP', 1000))
+        spool.rotate()
+        self.spool(('LCP', 2000))
+        self.assertEqual(len(spool.batches()), 1)
+        with spool.claim(spool.batches()[0]) as records:
+            self.assertEqual([record['v'] for record in records], [[['/shop', 'LCP', 1000.0]]])
+        self.assertEqual(spool.batches(), [])
+        self.assertEqual(flush()['vitals'], 1)
+
+    def test_failed_flush_keeps_the_file(self):
+        """Test that a batch whose load fails stays in the spool for the next flush"""
+        from unittest import mock
+        self.spool(('LCP', 1000))
+        with mock.patch.object(VitalSample.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                flush()
+        self.assertEqual(len(spool.batches()), 1)
+        self.assertEqual(flush()['vitals'], 1)
+
+    def test_unloadable_file_set_aside(self):
+        """Test that a file whose data can't be stored is moved aside and later files still load"""
+        spool.append({'t': int(timezone.now().timestamp()), 'v': [], 'e': [['event', 'x', '/', {'a': float('inf')}]]})
+        spool.rotate()
+        self.spool(('LCP', 1000))
+        with self.assertLogs('telemetry.ingest', 'ERROR'):
+            saved = flush()
+        self.assertEqual((saved['vitals'], saved['events']), (1, 0))
+        self.assertEqual(spool.batches(), [])
+        self.assertEqual(len(list(spool.spool_dir().glob('failed-batch-*.jsonl'))), 1)
+        self.spool(('LCP', 2000))
+        self.assertEqual(flush()['vitals'], 1)
+        self.assertEqual(VitalSample.objects.count(), 2)
+
+    def test_prune_keeps_rollups(self):
+        """Test that raw rows past TELEMETRY_RETENTION_DAYS are deleted and rollups kept"""
+        old = timezone.now() - timedelta(days=30)
+        self.spool(('LCP', 1000), now=old)
+        flush()
+        self.assertEqual(VitalSample.objects.count(), 0)
+        self.assertEqual(VitalRollup.objects.get().day, timezone.localdate(old))
+        self.assertEqual(rollups.rebuild(), 0)
+
+
+class VitalsDashboardTest(SpoolTestMixin, TestCase):
+    """Test the admin Web Vitals dashboard"""
+
+    def test_dashboard_reads_only_rollups(self):
+        """Test the dashboard shows p75 per page without touching raw samples"""
+        spool.append(normalize([
+            {'type': 'vital', 'name': 'LCP', 'value': 5000, 'page': '/shop'},
+            {'type': 'vital', 'name': 'INP', 'value': 80, 'page': '/shop'},
+        ]))
+        flush()
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:telemetry_vitalrollup_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<span class="poor">5000</span>', html=False)
+        self.assertContains(response, '<span class="good">80</span>', html=False)
+        self.assertFalse(any('telemetry_vitalsample' in query['sql'] for query in queries))
+        response = self.client.get(reverse('admin:telemetry_vitalrollup_changelist'))
+        self.assertEqual(response.status_code, 200)
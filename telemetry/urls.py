@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import TelemetryView
+
+urlpatterns = [
+    path('', TelemetryView.as_view(), name='telemetry'),
+]
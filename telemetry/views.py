@@ -0,0 +1,39 @@
+from rest_framework import permissions, status, views
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+from django.conf import settings
+
+from . import spool
+from .ingest import normalize, page_path, schedule_flush
+
+
+class BeaconParser(JSONParser):
+    """sendBeacon() with a string body is sent as text/plain"""
+    media_type = 'text/plain'
+
+
+class TelemetryView(views.APIView):
+    """
+    Sink for batched browser telemetry (see telemetry.ingest for the
+    payload). Accepted events are appended to the spool file and loaded by
+    the background flusher; the request itself never writes to the
+    database.
+    """
+    authentication_classes = []  # Beacons carry cookies but not the CSRF token
+    permission_classes = [permissions.AllowAny]
+    parser_classes = [JSONParser, BeaconParser]
+    throttle_scope = 'telemetry'
+
+    def post(self, request):
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length > settings.TELEMETRY_MAX_BODY_BYTES:
+            return Response({'error': 'Payload too large'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        record = normalize(request.data, default_page=page_path(request.META.get('HTTP_REFERER')))
+        if record is None:
+            return Response({'error': 'No valid events'}, status=status.HTTP_400_BAD_REQUEST)
+        spool.append(record)
+        schedule_flush()
+        return Response(status=status.HTTP_204_NO_CONTENT)